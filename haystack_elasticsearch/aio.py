@@ -0,0 +1,364 @@
+"""Asyncio API for the backend. Requires Python 3.5+ and aiohttp.
+"""
+import asyncio
+import time
+import uuid
+
+import haystack
+from haystack.exceptions import MissingDependency
+from haystack.utils import get_identifier, get_model_ct
+from haystack.models import SearchResult
+
+try:
+    import aiohttp
+except ImportError:
+    raise MissingDependency("The asyncio API requires the installation of 'aiohttp'.")
+
+import elasticsearch
+from elasticsearch.exceptions import HTTP_EXCEPTIONS
+from elasticsearch.helpers import BulkIndexError, expand_action
+from elasticsearch.serializer import JSONSerializer
+
+from haystack_elasticsearch.backends import BULK_CHUNK_SIZE
+from haystack_elasticsearch.resilience import is_failure
+
+
+class AsyncSearchBackend(object):
+    """Non-blocking version of backend search, update, remove and multi search. Requests are sent through a pool
+    of persistent HTTP connections, while building requests and processing results is shared with the backend of
+    the connection, as well as its circuit breakers and hedged searches.
+
+    :param using: Haystack connection alias.
+    :type using: str
+    :param url: Elasticsearch URL, connection's URL is used if None.
+    :type url: str
+    :param pool_size: Max number of simultaneous connections.
+    :type pool_size: int
+    """
+    def __init__(self, using='default', url=None, pool_size=10):
+        self.backend = haystack.connections[using].get_backend()
+
+        if url is None:
+            url = haystack.connections[using].options['URL']
+            if isinstance(url, (list, tuple)):
+                url = url[0]
+        self.url = url.rstrip('/')
+
+        self.pool_size = pool_size
+        self.serializer = JSONSerializer()
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.backend.timeout),
+            )
+
+        return self._session
+
+    async def close(self):
+        """Close all connections of the pool.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def perform_request(self, method, path, body=None, params=None, ignore=(), timeout=None):
+        """Send a request to Elasticsearch.
+
+        :param method: HTTP method.
+        :type method: str
+        :param path: URL path.
+        :type path: str
+        :param body: Request body, a list is sent as newline delimited JSON.
+        :param params: Query params.
+        :type params: dict
+        :param ignore: HTTP status codes that won't raise an error.
+        :type ignore: tuple
+        :param timeout: Seconds to wait for the response, connection's TIMEOUT is used if None.
+        :type timeout: float
+        :return: Response body.
+        :rtype: dict
+        :raise: elasticsearch.TransportError if the request fails.
+        """
+        data = None
+        if isinstance(body, list):
+            data = ''.join('%s\n' % self.serializer.dumps(line) for line in body)
+        elif body is not None:
+            data = self.serializer.dumps(body)
+
+        request_kwargs = {}
+        if timeout is not None:
+            request_kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+
+        try:
+            async with self._get_session().request(method, self.url + path, data=data, params=params,
+                                                   **request_kwargs) as response:
+                status = response.status
+                raw_data = await response.text()
+        except asyncio.TimeoutError as e:
+            raise elasticsearch.ConnectionTimeout('TIMEOUT', str(e), e)
+        except aiohttp.ClientError as e:
+            raise elasticsearch.ConnectionError('N/A', str(e), e)
+
+        if not 200 <= status < 300 and status not in ignore:
+            error_message = raw_data
+            additional_info = None
+            try:
+                additional_info = self.serializer.loads(raw_data)
+                error_message = additional_info.get('error', error_message)
+            except (ValueError, TypeError, AttributeError):
+                pass
+
+            raise HTTP_EXCEPTIONS.get(status, elasticsearch.TransportError)(status, error_message, additional_info)
+
+        return self.serializer.loads(raw_data) if raw_data else {}
+
+    async def guarded_call(self, circuit_breaker, func, *args, **kwargs):
+        """Await a coroutine function that sends requests to Elasticsearch through a circuit breaker, if enabled.
+
+        :param circuit_breaker: Circuit breaker of searches or writes of the backend.
+        :type circuit_breaker: CircuitBreaker
+        :param func: Coroutine function to call.
+        :type func: callable
+        :return: Function result.
+        :raise: CircuitOpenError if the circuit is open.
+        """
+        if circuit_breaker is None:
+            return await func(*args, **kwargs)
+
+        probe = circuit_breaker.before_call()
+        start = time.time()
+
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            circuit_breaker.record(probe, is_failure(e), time.time() - start)
+            raise
+
+        circuit_breaker.record(probe, False, time.time() - start)
+        return result
+
+    async def send_search(self, path, body, params, timeout=None):
+        """Send a search request through the circuit breaker, hedged as backend searches with HEDGED_SEARCHES.
+
+        :param path: URL path.
+        :type path: str
+        :param body: Search body.
+        :type body: dict
+        :param params: Query params.
+        :type params: dict
+        :param timeout: Seconds to wait for the response.
+        :type timeout: float
+        :return: Raw results.
+        :rtype: dict
+        """
+        if self.backend.hedged_search is None or 'preference' in params:
+            return await self.guarded_call(self.backend.circuit_breaker, self.perform_request, 'POST', path,
+                                           body=body, params=params, timeout=timeout)
+
+        return await self.guarded_call(self.backend.circuit_breaker, self._hedged_search, path, body, params,
+                                       timeout)
+
+    async def _hedged_search(self, path, body, params, timeout):
+        hedged_search = self.backend.hedged_search
+
+        async def primary():
+            # Only first requests are measured, hedges returning earlier would lower the delay.
+            start = time.time()
+            result = await self.perform_request('POST', path, body=body, params=params, timeout=timeout)
+            hedged_search.add_latency(time.time() - start)
+            return result
+
+        pending = {asyncio.ensure_future(primary())}
+        delay = hedged_search.get_delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                hedge_params = dict(params, preference='hedge_%s' % uuid.uuid4().hex)
+                pending.add(asyncio.ensure_future(self.perform_request('POST', path, body=body, params=hedge_params,
+                                                                       timeout=timeout)))
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # The other request keeps running, so the latency of the first one is still recorded.
+                    for other in pending:
+                        other.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    return task.result()
+                error = task.exception()
+
+        raise error
+
+    async def setup(self):
+        """Run backend setup, in a thread because it's done once and it's blocking.
+        """
+        if not self.backend.setup_complete:
+            await asyncio.get_event_loop().run_in_executor(None, self.backend.setup)
+
+    async def search(self, query_string, **kwargs):
+        """Do a search in Elasticsearch.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param kwargs: Search parameters.
+        :type kwargs: dict
+        :return: Search results.
+        :rtype: dict
+        """
+        if len(query_string) == 0:
+            return {
+                'results': [],
+                'hits': 0,
+            }
+
+        await self.setup()
+
+        search_kwargs, doc_type, geo_sort = self.backend.build_search_request(query_string, **kwargs)
+        search_params = self.backend.build_search_params(search_kwargs, kwargs.get('routing'))
+
+        raw_results = None
+        result_cache = self.backend.result_cache
+        if result_cache is not None:
+            cache_key = result_cache.make_key('search', search_kwargs, doc_type, **search_params)
+            raw_results = result_cache.get(cache_key)
+
+        if raw_results is None:
+            search_index = self.backend.get_search_index(doc_type, kwargs.get('date_ranges'))
+            path = '/%s/%s/_search' % (search_index, doc_type) if doc_type else '/%s/_search' % search_index
+            try:
+                params = {key: 'true' if value is True else value for key, value in search_params.items()}
+                timeout_params = self.backend.build_timeout_params(kwargs.get('request_timeout'))
+                raw_results = await self.send_search(path, search_kwargs, params,
+                                                     timeout=timeout_params.get('request_timeout'))
+
+                if result_cache is not None and not self.backend.is_partial(raw_results):
+                    result_cache.set(cache_key, raw_results)
+            except elasticsearch.TransportError as e:
+                if not self.backend.silently_fail:
+                    raise
+
+                self.backend.log.error("Failed to query Elasticsearch using '%s': %s", query_string, e)
+                raw_results = {'timed_out': True} if isinstance(e, elasticsearch.ConnectionTimeout) else {}
+
+        return self.backend._process_results(raw_results,
+                                             highlight=kwargs.get('highlight'),
+                                             result_class=kwargs.get('result_class', SearchResult),
+                                             distance_point=kwargs.get('distance_point'), geo_sort=geo_sort)
+
+    async def multi_search(self, queries):
+        """Do several searches in a single round trip, using Elasticsearch multi search API.
+
+        :param queries: Query string and search parameters of each search.
+        :type queries: list
+        :return: Search results of each search, in the same order.
+        :rtype: list
+        """
+        await self.setup()
+
+        requests, body = self.backend.build_multi_search_request(queries)
+
+        raw_responses = []
+        if body:
+            try:
+                raw_responses = (await self.guarded_call(self.backend.circuit_breaker, self.perform_request, 'POST',
+                                                         '/_msearch', body=body)).get('responses', [])
+            except elasticsearch.TransportError as e:
+                if not self.backend.silently_fail:
+                    raise
+
+                self.backend.log.error("Failed to query Elasticsearch using multi search: %s", e)
+
+        return self.backend._process_multi_search_responses(requests, raw_responses)
+
+    async def update(self, index, iterable, commit=True):
+        """Update an index with a collection.
+
+        :param index: Index to be updated.
+        :type index: Index
+        :param iterable: Objects to update the index.
+        :type iterable: iterable
+        :param commit: Commit changes.
+        :type commit: bool
+        """
+        try:
+            await self.setup()
+        except elasticsearch.TransportError as e:
+            if not self.backend.silently_fail:
+                raise
+
+            self.backend.log.error("Failed to add documents to Elasticsearch: %s", e)
+            return
+
+        doc_type = get_model_ct(index.get_model())
+        index_name = self.backend.get_index_name(doc_type)
+
+        write_circuit_breaker = self.backend.write_circuit_breaker
+        prepped_docs = self.backend.prepare_documents(index, iterable)
+
+        for start in range(0, len(prepped_docs), BULK_CHUNK_SIZE):
+            body = []
+            for doc in prepped_docs[start:start + BULK_CHUNK_SIZE]:
+                doc.setdefault('_index', index_name)
+                doc.setdefault('_type', doc_type)
+                action, data = expand_action(doc)
+                body.extend([action, data])
+
+            response = await self.guarded_call(write_circuit_breaker, self.perform_request, 'POST', '/_bulk',
+                                               body=body)
+            if response.get('errors'):
+                errors = [item for item in response.get('items', [])
+                          if not 200 <= list(item.values())[0].get('status', 500) < 300]
+                raise BulkIndexError('%i document(s) failed to index.' % len(errors), errors)
+
+        self.backend.invalidate_result_cache([doc_type])
+
+        if commit:
+            await self.guarded_call(write_circuit_breaker, self.perform_request, 'POST', '/%s/_refresh' % index_name)
+            # Searches sent before the refresh may have cached results without the changes.
+            self.backend.invalidate_result_cache([doc_type])
+
+    async def remove(self, obj_or_string, commit=True):
+        """Remove an object from an index.
+
+        :param obj_or_string: Object to be removed.
+        :param commit: Commit changes.
+        :type commit: bool
+        """
+        doc_id = get_identifier(obj_or_string)
+        doc_type = self.backend.get_doc_type(obj_or_string)
+        index = self.backend.get_routed_index(doc_type)
+        index_name = self.backend.get_document_index_name(doc_type, obj_or_string)
+
+        write_circuit_breaker = self.backend.write_circuit_breaker
+
+        try:
+            await self.setup()
+            if self.backend.is_rollover_pattern(index_name) or (index is not None and isinstance(obj_or_string, str)):
+                # The index or shard of the document is unknown without the object, so it's deleted from every one.
+                await self.guarded_call(write_circuit_breaker, self.perform_request, 'DELETE',
+                                        '/%s/%s/_query' % (index_name, doc_type),
+                                        body={'query': {'ids': {'values': [doc_id]}}})
+            elif index is not None:
+                await self.guarded_call(write_circuit_breaker, self.perform_request, 'DELETE',
+                                        '/%s/%s/%s' % (index_name, doc_type, doc_id),
+                                        params={'routing': self.backend.prepare_routing(index, obj_or_string)},
+                                        ignore=(404,))
+            else:
+                await self.guarded_call(write_circuit_breaker, self.perform_request, 'DELETE',
+                                        '/%s/%s/%s' % (index_name, doc_type, doc_id), ignore=(404,))
+            self.backend.invalidate_result_cache([doc_type])
+
+            if commit:
+                await self.guarded_call(write_circuit_breaker, self.perform_request, 'POST',
+                                        '/%s/_refresh' % index_name)
+                # Searches sent before the refresh may have cached results without the changes.
+                self.backend.invalidate_result_cache([doc_type])
+        except elasticsearch.TransportError as e:
+            if not self.backend.silently_fail:
+                raise
+
+            self.backend.log.error("Failed to remove document '%s' from Elasticsearch: %s", doc_id, e)
@@ -1,9 +1,13 @@
+import copy
 import json
+import uuid
+import re
+from collections import OrderedDict
 import warnings
 import datetime
 
 from django.conf import settings
-from django.db.models.loading import get_model
+from django.core.exceptions import ImproperlyConfigured
 from django.utils import six
 import haystack
 from haystack.backends import log_query
@@ -11,15 +15,20 @@ from haystack.backends.elasticsearch_backend import (ElasticsearchSearchBackend
                                                      ElasticsearchSearchEngine as HaystackEngine,
                                                      ElasticsearchSearchQuery as HaystackQuery,
                                                      DEFAULT_FIELD_MAPPING,
-                                                     FIELD_MAPPINGS)
-from haystack.constants import DJANGO_ID, ID, DEFAULT_OPERATOR, DJANGO_CT
-from haystack.exceptions import MissingDependency, NotHandled
+                                                     FIELD_MAPPINGS as HAYSTACK_FIELD_MAPPINGS)
+from haystack.constants import DJANGO_ID, ID, DEFAULT_OPERATOR, DJANGO_CT, DEFAULT_ALIAS
+from haystack.exceptions import MissingDependency, MoreLikeThisError, NotHandled, SearchBackendError
+from haystack.fields import DecimalField
 from haystack.inputs import Exact, Raw, Clean, PythonData, BaseInput
 from haystack.models import SearchResult
 from haystack.utils import get_model_ct, get_identifier
 
+from haystack_elasticsearch.cache import get_result_cache
+from haystack_elasticsearch.coalescing import SingleFlight
 from haystack_elasticsearch.indexes import UnifiedIndex
-from haystack_elasticsearch.utils import check_analyzers
+from haystack_elasticsearch.resilience import CircuitOpenError, get_circuit_breaker, get_hedged_call
+from haystack_elasticsearch.transport import get_transport_kwargs
+from haystack_elasticsearch.utils import check_analyzers, get_period_start, shift_period
 
 
 try:
@@ -34,6 +43,69 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Haystack field mappings, plus the fields only supported by this backend.
+FIELD_MAPPINGS = dict(HAYSTACK_FIELD_MAPPINGS, completion={'type': 'completion'})
+# Options of completion fields copied to their mapping when set.
+COMPLETION_FIELD_OPTIONS = ('analyzer', 'search_analyzer', 'max_input_length', 'context')
+
+# Main query types that can be used for free-text search.
+QUERY_TYPES = ('query_string', 'simple_query_string', 'multi_match', 'match')
+DEFAULT_QUERY_TYPE = 'query_string'
+
+# Engines used to compute facets: legacy facets or aggregations.
+FACET_ENGINES = ('facets', 'aggregations')
+DEFAULT_FACET_ENGINE = 'facets'
+DEFAULT_FACET_SIZE = 100
+# Prefix of aggregations that group facets sharing the same scope and filter.
+FACET_GROUP = 'group'
+
+# Metrics that can be computed over numeric fields.
+AGGREGATE_METRICS = ('stats', 'extended_stats', 'percentiles', 'cardinality')
+NUMERIC_FIELD_TYPES = ('integer', 'long', 'float', 'double')
+# Subfield added to decimal fields, that are indexed as strings, so metrics can be computed over them.
+NUMERIC_SUBFIELD = 'numeric'
+
+# Options of more_like_this query that can be given to select terms of the seed documents.
+MLT_OPTIONS = ('fields', 'max_query_terms', 'min_term_freq', 'min_doc_freq', 'max_doc_freq', 'min_word_length',
+               'max_word_length', 'stop_words', 'minimum_should_match', 'boost_terms', 'include')
+
+# Periods of time based indexes and the date format of their index name suffix.
+ROLLOVER_PERIODS = {'day': '%Y.%m.%d', 'month': '%Y.%m'}
+DEFAULT_ROLLOVER_PERIOD = 'month'
+# Max number of time based indexes listed in a search, their wildcard pattern is used beyond.
+MAX_ROLLOVER_INDEXES = 100
+
+# Number of documents sent in each bulk request of an update.
+BULK_CHUNK_SIZE = 500
+
+# Subfield added to fields declared with prefix_index, used to run startswith filters without wildcards.
+PREFIX_SUBFIELD = 'prefix'
+PREFIX_SUBFIELD_MAPPINGS = {
+    'keyword': {'type': 'string', 'analyzer': 'prefix_keyword_analyzer'},
+    'edge_ngram': {'type': 'string', 'index_analyzer': 'prefix_edgengram_analyzer', 'search_analyzer': 'standard'},
+}
+PREFIX_ANALYSIS = {
+    'analyzer': {
+        'prefix_keyword_analyzer': {
+            'type': 'custom',
+            'tokenizer': 'keyword',
+            'filter': ['lowercase'],
+        },
+        'prefix_edgengram_analyzer': {
+            'type': 'custom',
+            'tokenizer': 'standard',
+            'filter': ['lowercase', 'prefix_edgengram'],
+        },
+    },
+    'filter': {
+        'prefix_edgengram': {
+            'type': 'edgeNGram',
+            'min_gram': 1,
+            'max_gram': 20,
+        },
+    },
+}
+
 
 class ElasticsearchSearchBackend(HaystackBackend):
     """
@@ -44,6 +116,12 @@ class ElasticsearchSearchBackend(HaystackBackend):
 
     def __init__(self, connection_alias, **connection_options):
         super(ElasticsearchSearchBackend, self).__init__(connection_alias, **connection_options)
+        transport_kwargs = get_transport_kwargs(connection_alias, connection_options)
+        if transport_kwargs:
+            # Replace the client built by Haystack with one using the configured transport.
+            self.conn = elasticsearch.Elasticsearch(connection_options['URL'], timeout=self.timeout,
+                                                    **transport_kwargs)
+
         user_settings = getattr(settings, 'ELASTICSEARCH_INDEX_SETTINGS', None)
         user_analyzer = getattr(settings, 'ELASTICSEARCH_DEFAULT_ANALYZER', None)
         if user_settings:
@@ -51,6 +129,37 @@ class ElasticsearchSearchBackend(HaystackBackend):
         if user_analyzer:
             setattr(self, 'DEFAULT_ANALYZER', user_analyzer)
 
+        self.document_field = getattr(settings, 'HAYSTACK_DOCUMENT_FIELD', 'text')
+        self.query_type = connection_options.get('QUERY_TYPE', DEFAULT_QUERY_TYPE)
+        if self.query_type not in QUERY_TYPES:
+            raise ImproperlyConfigured("Invalid 'QUERY_TYPE' for connection '%s', choices are: %s." % (
+                connection_alias, ', '.join(QUERY_TYPES)))
+
+        self.facet_engine = connection_options.get('FACET_ENGINE', DEFAULT_FACET_ENGINE)
+        if self.facet_engine not in FACET_ENGINES:
+            raise ImproperlyConfigured("Invalid 'FACET_ENGINE' for connection '%s', choices are: %s." % (
+                connection_alias, ', '.join(FACET_ENGINES)))
+
+        self.facet_size = connection_options.get('FACET_SIZE', DEFAULT_FACET_SIZE)
+        self.facet_shard_size = connection_options.get('FACET_SHARD_SIZE')
+        self.facet_execution_hint = connection_options.get('FACET_EXECUTION_HINT')
+
+        self.highlight_fragment_size = connection_options.get('HIGHLIGHT_FRAGMENT_SIZE')
+        self.highlight_number_of_fragments = connection_options.get('HIGHLIGHT_NUMBER_OF_FRAGMENTS')
+
+        self.result_cache = get_result_cache(connection_options.get('RESULT_CACHE'),
+                                             key_prefix='haystack_elasticsearch:%s' % self.index_name)
+        self.search_flight = SingleFlight() if connection_options.get('COALESCE_SEARCHES', False) else None
+        self.separate_indexes = connection_options.get('SEPARATE_INDEXES', False)
+
+        self.search_timeout = connection_options.get('SEARCH_TIMEOUT')
+        self.terminate_after = connection_options.get('TERMINATE_AFTER')
+        self.request_timeout = connection_options.get('REQUEST_TIMEOUT')
+
+        self.circuit_breaker = get_circuit_breaker(connection_options.get('CIRCUIT_BREAKER'))
+        self.write_circuit_breaker = get_circuit_breaker(connection_options.get('CIRCUIT_BREAKER'), writes=True)
+        self.hedged_search = get_hedged_call(connection_options.get('HEDGED_SEARCHES'))
+
     def setup(self):
         """Get the existing mapping & cache it. We'll compare it during the ``update`` and if it doesn't match,
         we'll put the new mapping.
@@ -65,14 +174,20 @@ class ElasticsearchSearchBackend(HaystackBackend):
 
         unified_index = haystack.connections[self.connection_alias].get_unified_index()
         check_analyzers(unified_index)
+        self.check_rollover(unified_index)
         current_mapping = self.build_schema(unified_index.indexes)
 
         if current_mapping != self.existing_mapping:
             try:
-                # Make sure the index is there first.
-                self.conn.indices.create(index=self.index_name, body=self.DEFAULT_SETTINGS, ignore=400)
-                for type_name, type_body in current_mapping.iteritems():
-                    self.conn.indices.put_mapping(index=self.index_name, doc_type=type_name, body=type_body)
+                physical_indexes = self.get_physical_indexes(unified_index.indexes)
+                aliased_indexes = []
+                for index_name, search_indexes in physical_indexes.items():
+                    if self.create_index(index_name, search_indexes, current_mapping):
+                        aliased_indexes.append(index_name)
+
+                if self.separate_indexes and aliased_indexes:
+                    # Searches over every model use the connection's index name as an alias.
+                    self.conn.indices.put_alias(index=','.join(aliased_indexes), name=self.index_name)
                 self.existing_mapping = current_mapping
             except Exception:
                 if not self.silently_fail:
@@ -80,6 +195,281 @@ class ElasticsearchSearchBackend(HaystackBackend):
 
         self.setup_complete = True
 
+    def create_index(self, index_name, search_indexes, mapping):
+        """Create a physical index if it doesn't exist and put the mapping of its doc types. Time based indexes are
+        created on first write, so only their template is put.
+
+        :param index_name: Index name, or pattern of time based indexes.
+        :type index_name: str
+        :param search_indexes: Search index of each doc type stored in the index.
+        :type search_indexes: dict
+        :param mapping: Mapping of each doc type.
+        :type mapping: dict
+        :return: True if the index must be added to the alias, False if its template already adds it.
+        :rtype: bool
+        """
+        index_settings = self.build_index_settings(search_indexes.values() if self.separate_indexes else None)
+
+        if self.is_rollover_pattern(index_name):
+            # Time based indexes are created on first write, from a template that adds them to the alias.
+            self.conn.indices.put_template(name=index_name[:-2], body={
+                'template': index_name,
+                'settings': index_settings.get('settings', {}),
+                'mappings': {type_name: mapping[type_name] for type_name in search_indexes},
+                'aliases': {self.index_name: {}},
+            })
+            for type_name in search_indexes:
+                self.conn.indices.put_mapping(index=index_name, doc_type=type_name, body=mapping[type_name],
+                                              ignore=404)
+            return False
+
+        # Make sure the index is there first.
+        self.conn.indices.create(index=index_name, body=index_settings, ignore=400)
+        for type_name in search_indexes:
+            self.conn.indices.put_mapping(index=index_name, doc_type=type_name, body=mapping[type_name])
+        return True
+
+    def build_index_settings(self, search_indexes=None):
+        """Build Elasticsearch index settings, adding analyzers used by prefix subfields to default settings.
+
+        :param search_indexes: Search indexes stored in the index, whose index_settings attribute, if declared, is
+            merged into the settings.
+        :type search_indexes: list
+        :return: Index settings.
+        :rtype: dict
+        """
+        index_settings = copy.deepcopy(self.DEFAULT_SETTINGS)
+        analysis = index_settings.setdefault('settings', {}).setdefault('analysis', {})
+
+        for section, definitions in PREFIX_ANALYSIS.items():
+            for name, definition in definitions.items():
+                analysis.setdefault(section, {}).setdefault(name, copy.deepcopy(definition))
+
+        for search_index in search_indexes or []:
+            index_settings['settings'].update(copy.deepcopy(getattr(search_index, 'index_settings', None) or {}))
+
+        return index_settings
+
+    def get_physical_indexes(self, indexes):
+        """Get the physical indexes used by some indexes and the doc types stored in each one.
+
+        :param indexes: Dictionary of model -> index.
+        :type indexes: dict
+        :return: Search index of each doc type, for each physical index name.
+        :rtype: OrderedDict
+        """
+        physical_indexes = OrderedDict()
+
+        for doc_type, index in sorted((get_model_ct(model), index) for model, index in indexes.items()):
+            physical_indexes.setdefault(self.get_index_name(doc_type), OrderedDict())[doc_type] = \
+                getattr(index, 'index', index)
+
+        return physical_indexes
+
+    def get_index_name(self, doc_type):
+        """Get the physical index where documents of a doc type are stored. With SEPARATE_INDEXES, each doc type is
+        stored in its own index, or in the index of its group if its search index declares index_group.
+
+        :param doc_type: Doc type.
+        :type doc_type: str
+        :return: Index name.
+        :rtype: str
+        """
+        if not self.separate_indexes:
+            return self.index_name
+
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        content_type = unified_index.get_content_type_table().get(doc_type)
+        index_group = getattr(content_type.index, 'index_group', None) if content_type is not None else None
+        index_name = '%s_%s' % (self.index_name, index_group or doc_type.replace('.', '_'))
+
+        if content_type is not None and getattr(content_type.index, 'rollover_field', None) is not None:
+            # Pattern of every time based index of the doc type.
+            return '%s-*' % index_name
+
+        return index_name
+
+    def get_search_index(self, doc_type, date_ranges=None):
+        """Get the indexes searched for some doc types. With SEPARATE_INDEXES, only the physical indexes of those
+        doc types are searched, and only the time based indexes within the date range of their rollover field.
+
+        :param doc_type: Comma separated doc types, every doc type if empty.
+        :type doc_type: str
+        :param date_ranges: Start and end dates of results for some fields, None for an open bound.
+        :type date_ranges: dict
+        :return: Comma separated index names or alias.
+        :rtype: str
+        """
+        if not self.separate_indexes or not doc_type:
+            return self.index_name
+
+        index_names = set()
+        for t in doc_type.split(','):
+            index = self.get_rollover_index(t)
+            if index is None:
+                index_names.add(self.get_index_name(t))
+            else:
+                index_names.update(self.get_rollover_index_names(t, (date_ranges or {}).get(index.rollover_field)))
+
+        return ','.join(sorted(index_names))
+
+    def get_rollover_index(self, doc_type):
+        """Get the index of a doc type if it's stored in time based indexes.
+
+        :param doc_type: Doc type.
+        :type doc_type: str
+        :return: Search index, None if the doc type isn't indexed or isn't stored in time based indexes.
+        :rtype: SearchIndex
+        """
+        if not self.separate_indexes:
+            return None
+
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        content_type = unified_index.get_content_type_table().get(doc_type)
+
+        if content_type is None or getattr(content_type.index, 'rollover_field', None) is None:
+            return None
+
+        return content_type.index
+
+    def check_rollover(self, unified_index):
+        """Check the time based index options declared by indexes.
+
+        :param unified_index: Unified index.
+        :type unified_index: UnifiedIndex
+        :raise: ImproperlyConfigured if an index declares rollover_field without SEPARATE_INDEXES, or an invalid
+            rollover_period.
+        """
+        for model in unified_index.get_indexed_models():
+            index = unified_index.get_index(model)
+            if getattr(index, 'rollover_field', None) is None:
+                continue
+
+            if not self.separate_indexes:
+                raise ImproperlyConfigured("Index '%s' declares 'rollover_field', which requires 'SEPARATE_INDEXES' "
+                                           "for connection '%s'." % (index, self.connection_alias))
+
+            if getattr(index, 'rollover_period', DEFAULT_ROLLOVER_PERIOD) not in ROLLOVER_PERIODS:
+                raise ImproperlyConfigured("Invalid 'rollover_period' of index '%s', choices are: %s." % (
+                    index, ', '.join(sorted(ROLLOVER_PERIODS))))
+
+    def is_rollover_pattern(self, index_name):
+        """Check if an index name is the pattern of time based indexes.
+
+        :param index_name: Index name.
+        :type index_name: str
+        :rtype: bool
+        """
+        return index_name.endswith('-*')
+
+    def get_rollover_index_name(self, doc_type, index, value):
+        """Get the time based index that stores documents of a doc type with a given date.
+
+        :param doc_type: Doc type.
+        :type doc_type: str
+        :param index: Search index that declares rollover_field.
+        :type index: SearchIndex
+        :param value: Date of the document, current date if None.
+        :type value: datetime.date
+        :return: Index name.
+        :rtype: str
+        """
+        if value is None:
+            value = datetime.date.today()
+
+        period_format = ROLLOVER_PERIODS[getattr(index, 'rollover_period', DEFAULT_ROLLOVER_PERIOD)]
+        return self.get_index_name(doc_type)[:-1] + value.strftime(period_format)
+
+    def get_document_index_name(self, doc_type, obj_or_string):
+        """Get the physical index of a document. Time based indexes can only be determined from the object.
+
+        :param doc_type: Doc type.
+        :type doc_type: str
+        :param obj_or_string: Object or identifier.
+        :return: Index name, or pattern of the time based indexes of the doc type for an identifier.
+        :rtype: str
+        """
+        index = self.get_rollover_index(doc_type)
+        if index is None or isinstance(obj_or_string, six.string_types):
+            return self.get_index_name(doc_type)
+
+        return self.get_rollover_index_name(doc_type, index,
+                                            self.prepare_field(index, index.rollover_field, obj_or_string))
+
+    def get_rollover_index_names(self, doc_type, date_range=None):
+        """Get the time based indexes that can contain documents of a doc type within a date range.
+
+        :param doc_type: Doc type.
+        :type doc_type: str
+        :param date_range: Start and end dates, None for an open bound.
+        :type date_range: tuple
+        :return: Index names, or their pattern if the range is open or too long.
+        :rtype: list
+        """
+        start, end = date_range or (None, None)
+        if start is None or end is None or start > end:
+            return [self.get_index_name(doc_type)]
+
+        index = self.get_rollover_index(doc_type)
+        rollover_period = getattr(index, 'rollover_period', DEFAULT_ROLLOVER_PERIOD)
+        index_names = []
+        period_start = get_period_start(start, rollover_period)
+
+        while period_start <= end:
+            if len(index_names) == MAX_ROLLOVER_INDEXES:
+                return [self.get_index_name(doc_type)]
+
+            index_names.append(self.get_rollover_index_name(doc_type, index, period_start))
+            period_start = shift_period(period_start, rollover_period, 1)
+
+        return index_names
+
+    def expire_rollover_indexes(self, today=None):
+        """Delete the time based indexes older than the retention of their search index, declared as
+        rollover_retention, the number of periods kept including the current one. Whole indexes are deleted with a
+        single request.
+
+        :param today: Current date, today if None.
+        :type today: datetime.date
+        :return: Names of the deleted indexes.
+        :rtype: list
+        """
+        today = today or datetime.date.today()
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        expired_indexes = []
+        expired_doc_types = []
+
+        for model in unified_index.get_indexed_models():
+            doc_type = get_model_ct(model)
+            index = self.get_rollover_index(doc_type)
+            retention = getattr(index, 'rollover_retention', None)
+            if index is None or not retention:
+                continue
+
+            rollover_period = getattr(index, 'rollover_period', DEFAULT_ROLLOVER_PERIOD)
+            oldest_kept = shift_period(get_period_start(today, rollover_period), rollover_period, 1 - retention)
+            oldest_kept_name = self.get_rollover_index_name(doc_type, index, oldest_kept)
+            index_pattern = self.get_index_name(doc_type)
+
+            for index_name in self.conn.indices.get_settings(index=index_pattern, ignore=404):
+                # Names of time based indexes sort in chronological order.
+                try:
+                    datetime.datetime.strptime(index_name[len(index_pattern) - 1:],
+                                               ROLLOVER_PERIODS[rollover_period])
+                except ValueError:
+                    continue
+
+                if index_name < oldest_kept_name:
+                    expired_indexes.append(index_name)
+                    if doc_type not in expired_doc_types:
+                        expired_doc_types.append(doc_type)
+
+        if expired_indexes:
+            self.guarded_write(self.conn.indices.delete, index=','.join(sorted(expired_indexes)))
+            self.invalidate_result_cache(expired_doc_types)
+
+        return sorted(expired_indexes)
+
     def build_schema(self, indexes):
         """Build Elasticsearch schema.
 
@@ -90,13 +480,17 @@ class ElasticsearchSearchBackend(HaystackBackend):
         """
         schema = {}
 
-        for model, index in indexes.iteritems():
+        for model, index in indexes.items():
             mapping_properties = {
                 DJANGO_CT: {'type': 'string', 'index': 'not_analyzed', 'include_in_all': False},
                 DJANGO_ID: {'type': 'string', 'index': 'not_analyzed', 'include_in_all': False},
             }
             for field_name, field_class in index.fields.items():
                 field_mapping = FIELD_MAPPINGS.get(field_class.field_type, DEFAULT_FIELD_MAPPING).copy()
+                if field_mapping['type'] == 'completion':
+                    mapping_properties[field_class.index_fieldname] = self.build_completion_mapping(field_class)
+                    continue
+
                 if field_class.boost != 1.0:
                     field_mapping['boost'] = field_class.boost
 
@@ -105,7 +499,7 @@ class ElasticsearchSearchBackend(HaystackBackend):
 
                 # Do this last to override `text` fields.
                 if field_mapping['type'] == 'string':
-                    if field_class.indexed is False or hasattr(field_class, 'facet_for') or getattr(field_class, 'is_multivalued', False):
+                    if not self.is_analyzed(field_class):
                         field_mapping['index'] = 'not_analyzed'
                         try:
                             del field_mapping['analyzer']
@@ -125,6 +519,15 @@ class ElasticsearchSearchBackend(HaystackBackend):
                         if hasattr(field_class, 'term_vector') and field_class.term_vector is not None:
                             field_mapping['term_vector'] = field_class.term_vector
 
+                    # Add prefix subfield
+                    prefix_index = getattr(field_class, 'prefix_index', None)
+                    if prefix_index is not None:
+                        field_mapping['fields'] = {PREFIX_SUBFIELD: PREFIX_SUBFIELD_MAPPINGS[prefix_index].copy()}
+
+                    # Add numeric subfield
+                    if isinstance(field_class, DecimalField):
+                        field_mapping.setdefault('fields', {})[NUMERIC_SUBFIELD] = {'type': 'double'}
+
                 mapping_properties[field_class.index_fieldname] = field_mapping
 
             mapping_type = {
@@ -132,10 +535,31 @@ class ElasticsearchSearchBackend(HaystackBackend):
                 '_boost': {'name': 'boost', 'null_value': 1.0},
             }
 
+            if getattr(index, 'routing_field', None) is not None:
+                # Documents of routed types can't be found by id alone, so routing is required on writes.
+                mapping_type['_routing'] = {'required': True}
+
             schema[get_model_ct(model)] = mapping_type
 
         return schema
 
+    def build_completion_mapping(self, field_class):
+        """Build the mapping of a completion field. Boost and store don't apply to completion fields.
+
+        :param field_class: Completion field.
+        :type field_class: CompletionField
+        :return: Mapping.
+        :rtype: dict
+        """
+        field_mapping = {'type': 'completion', 'payloads': bool(getattr(field_class, 'payloads', False))}
+
+        for option in COMPLETION_FIELD_OPTIONS:
+            value = getattr(field_class, option, None)
+            if value is not None:
+                field_mapping[option] = value
+
+        return field_mapping
+
     def update(self, index, iterable, commit=True):
         """Update an index with a collection.
 
@@ -156,7 +580,44 @@ class ElasticsearchSearchBackend(HaystackBackend):
                 self.log.error("Failed to add documents to Elasticsearch: %s", e)
                 return
 
+        prepped_docs = self.prepare_documents(index, iterable)
+
+        doc_type = get_model_ct(index.get_model())
+        index_name = self.get_index_name(doc_type)
+        try:
+            # Each bulk request goes through the breaker, so a long update isn't a single slow call.
+            for start in range(0, len(prepped_docs), BULK_CHUNK_SIZE):
+                self.guarded_write(bulk_index, self.conn, prepped_docs[start:start + BULK_CHUNK_SIZE],
+                                   index=index_name, doc_type=doc_type, chunk_size=BULK_CHUNK_SIZE)
+        except CircuitOpenError as e:
+            if not self.silently_fail:
+                raise
+
+            self.log.error("Failed to add documents to Elasticsearch: %s", e)
+            return
+        self.invalidate_result_cache([doc_type])
+
+        if commit:
+            self.guarded_write(self.conn.indices.refresh, index=index_name)
+            # Searches sent before the refresh may have cached results without the changes.
+            self.invalidate_result_cache([doc_type])
+
+    def prepare_documents(self, index, iterable):
+        """Prepare the documents of a collection to be sent to Elasticsearch.
+
+        :param index: Index of the objects.
+        :type index: Index
+        :param iterable: Objects to prepare.
+        :type iterable: iterable
+        :return: Documents.
+        :rtype: list
+        """
         prepped_docs = []
+        routing_fieldname = self.get_routing_fieldname(index)
+        rollover_index = None
+        if self.separate_indexes and getattr(index, 'rollover_field', None) is not None:
+            doc_type = get_model_ct(index.get_model())
+            rollover_index = self.get_rollover_index(doc_type)
 
         for obj in iterable:
             try:
@@ -168,6 +629,14 @@ class ElasticsearchSearchBackend(HaystackBackend):
                     final_data[key] = self._from_python(value)
                 final_data['_id'] = final_data[ID]
 
+                if routing_fieldname is not None and final_data.get(routing_fieldname) is not None:
+                    final_data['_routing'] = six.text_type(final_data[routing_fieldname])
+
+                if rollover_index is not None:
+                    rollover_fieldname = rollover_index.fields[rollover_index.rollover_field].index_fieldname
+                    final_data['_index'] = self.get_rollover_index_name(doc_type, rollover_index,
+                                                                        prepped_data.get(rollover_fieldname))
+
                 prepped_docs.append(final_data)
             except elasticsearch.TransportError as e:
                 if not self.silently_fail:
@@ -183,20 +652,88 @@ class ElasticsearchSearchBackend(HaystackBackend):
                     }
                 })
 
-        doc_type = get_model_ct(index.get_model())
-        bulk_index(self.conn, prepped_docs, index=self.index_name, doc_type=doc_type)
+        return prepped_docs
 
-        if commit:
-            self.conn.indices.refresh(index=self.index_name)
+    def is_analyzed(self, field_class):
+        """Check if a field is mapped as analyzed text, so its values are split into terms.
 
-    def remove(self, obj_or_string, commit=True):
-        """Remove an object from an index.
+        :param field_class: Search field.
+        :type field_class: SearchField
+        :rtype: bool
+        """
+        field_mapping = FIELD_MAPPINGS.get(field_class.field_type, DEFAULT_FIELD_MAPPING)
+        return field_mapping['type'] == 'string' and not (
+            field_class.indexed is False or hasattr(field_class, 'facet_for') or
+            getattr(field_class, 'is_multivalued', False))
 
-        :param obj_or_string: Object to be removed.
-        :param commit: Commit changes.
-        :type commit: bool
+    def get_routing_fieldname(self, index):
+        """Get the index field name of the routing field declared by an index.
+
+        :param index: Search index.
+        :type index: SearchIndex
+        :return: Index field name, None if the index doesn't declare routing_field.
+        :rtype: str
+        """
+        routing_field = getattr(index, 'routing_field', None)
+        if routing_field is None:
+            return None
+
+        return index.fields[routing_field].index_fieldname
+
+    def get_routed_index(self, doc_type):
+        """Get the index of a doc type if it declares a routing field.
+
+        :param doc_type: Doc type.
+        :type doc_type: str
+        :return: Search index, None if the doc type isn't indexed or isn't routed.
+        :rtype: SearchIndex
+        """
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        content_type = unified_index.get_content_type_table().get(doc_type)
+
+        if content_type is None or getattr(content_type.index, 'routing_field', None) is None:
+            return None
+
+        return content_type.index
+
+    def prepare_routing(self, index, obj):
+        """Prepare the routing value of an object, the same way its index prepares the routing field.
+
+        :param index: Search index that declares routing_field.
+        :type index: SearchIndex
+        :param obj: Object.
+        :return: Routing value.
+        :rtype: str
+        """
+        value = self.prepare_field(index, index.routing_field, obj)
+        if value is None:
+            return None
+
+        return six.text_type(self._from_python(value))
+
+    def prepare_field(self, index, field_name, obj):
+        """Prepare the value of a single field of an object, the same way its index does.
+
+        :param index: Search index.
+        :type index: SearchIndex
+        :param field_name: Field name.
+        :type field_name: str
+        :param obj: Object.
+        :return: Prepared value.
+        """
+        prepare_method = getattr(index, 'prepare_%s' % field_name, None)
+        if prepare_method is not None:
+            return prepare_method(obj)
+
+        return index.fields[field_name].prepare(obj)
+
+    def get_doc_type(self, obj_or_string):
+        """Get the doc type of an object or an identifier string.
+
+        :param obj_or_string: Object or identifier.
+        :return: Doc type, '*' if it cannot be determined.
+        :rtype: str
         """
-        doc_id = get_identifier(obj_or_string)
         try:
             doc_type = get_model_ct(obj_or_string)
         except:
@@ -205,6 +742,18 @@ class ElasticsearchSearchBackend(HaystackBackend):
             except:
                 doc_type = '*'
 
+        return doc_type
+
+    def remove(self, obj_or_string, commit=True):
+        """Remove an object from an index.
+
+        :param obj_or_string: Object to be removed.
+        :param commit: Commit changes.
+        :type commit: bool
+        """
+        doc_id = get_identifier(obj_or_string)
+        doc_type = self.get_doc_type(obj_or_string)
+
         if not self.setup_complete:
             try:
                 self.setup()
@@ -215,11 +764,26 @@ class ElasticsearchSearchBackend(HaystackBackend):
                 self.log.error("Failed to remove document '%s' from Elasticsearch: %s", doc_id, e)
                 return
 
+        index = self.get_routed_index(doc_type)
+        index_name = self.get_document_index_name(doc_type, obj_or_string)
+
         try:
-            self.conn.delete(index=self.index_name, doc_type=doc_type, id=doc_id, ignore=404)
+            if self.is_rollover_pattern(index_name) or \
+                    (index is not None and isinstance(obj_or_string, six.string_types)):
+                # The index or shard of the document is unknown without the object, so it's deleted from every one.
+                self.guarded_write(self.conn.delete_by_query, index=index_name, doc_type=doc_type,
+                                   body={'query': {'ids': {'values': [doc_id]}}})
+            elif index is not None:
+                self.guarded_write(self.conn.delete, index=index_name, doc_type=doc_type, id=doc_id, ignore=404,
+                                   routing=self.prepare_routing(index, obj_or_string))
+            else:
+                self.guarded_write(self.conn.delete, index=index_name, doc_type=doc_type, id=doc_id, ignore=404)
+            self.invalidate_result_cache([doc_type])
 
             if commit:
-                self.conn.indices.refresh(index=self.index_name)
+                self.guarded_write(self.conn.indices.refresh, index=index_name)
+                # Searches sent before the refresh may have cached results without the changes.
+                self.invalidate_result_cache([doc_type])
         except elasticsearch.TransportError as e:
             if not self.silently_fail:
                 raise
@@ -243,14 +807,22 @@ class ElasticsearchSearchBackend(HaystackBackend):
 
         try:
             if not models:
-                self.conn.indices.delete(index=self.index_name, ignore=404)
+                if self.separate_indexes:
+                    unified_index = haystack.connections[self.connection_alias].get_unified_index()
+                    for index_name in self.get_physical_indexes(unified_index.indexes):
+                        self.guarded_write(self.conn.indices.delete, index=index_name, ignore=404)
+                else:
+                    self.guarded_write(self.conn.indices.delete, index=self.index_name, ignore=404)
                 self.setup_complete = False
                 self.existing_mapping = {}
+                self.invalidate_result_cache()
             else:
-                # Delete by query in Elasticsearch asssumes you're dealing with
-                # a ``query`` root object. :/
-                query = {'query': {'query_string': {'query': '*'}}}
-                self.conn.delete_by_query(index=self.index_name, doc_type=doc_type, body=query)
+                doc_types = doc_type.split(',')
+                recreated_doc_types = self.recreate_indexes(doc_types)
+                remaining_doc_types = [t for t in doc_types if t not in recreated_doc_types]
+                if remaining_doc_types:
+                    self.delete_documents(','.join(remaining_doc_types), commit=commit)
+                self.invalidate_result_cache(doc_types)
         except elasticsearch.TransportError as e:
             if not self.silently_fail:
                 raise
@@ -260,13 +832,159 @@ class ElasticsearchSearchBackend(HaystackBackend):
             else:
                 self.log.error("Failed to clear Elasticsearch index: %s", e)
 
+    def recreate_indexes(self, doc_types):
+        """Drop and recreate the physical indexes that only store some doc types, which is much faster than
+        deleting their documents. Requires SEPARATE_INDEXES.
+
+        :param doc_types: Doc types cleared.
+        :type doc_types: list
+        :return: Doc types whose index was recreated.
+        :rtype: list
+        """
+        if not self.separate_indexes:
+            return []
+
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        current_mapping = None
+        recreated_doc_types = []
+
+        for index_name, search_indexes in self.get_physical_indexes(unified_index.indexes).items():
+            if not all(t in doc_types for t in search_indexes):
+                # Documents of other doc types are stored in this index.
+                continue
+
+            if current_mapping is None:
+                current_mapping = self.build_schema(unified_index.indexes)
+
+            self.guarded_write(self.conn.indices.delete, index=index_name, ignore=404)
+            if self.create_index(index_name, search_indexes, current_mapping):
+                self.guarded_write(self.conn.indices.put_alias, index=index_name, name=self.index_name)
+            recreated_doc_types.extend(search_indexes)
+
+        return recreated_doc_types
+
+    def delete_documents(self, doc_type, scroll='5m', size=500, commit=True):
+        """Delete every document of some doc types, scrolling over their ids and deleting them with bulk requests,
+        which is lighter on the cluster than delete by query. Progress is logged after each page.
+
+        :param doc_type: Comma separated doc types.
+        :type doc_type: str
+        :param scroll: How long the scroll context is kept alive between pages.
+        :type scroll: str
+        :param size: Number of documents fetched from each shard in each page.
+        :type size: int
+        :param commit: Commit changes.
+        :type commit: bool
+        :return: Number of deleted documents.
+        :rtype: int
+        """
+        index_name = self.get_search_index(doc_type)
+        search_params = self.build_request_params()
+        search_params.update({'scroll': scroll, 'size': size, 'search_type': 'scan'})
+        body = {'query': {'match_all': {}}, 'fields': ['_routing']}
+        deleted = 0
+        scroll_id = None
+
+        try:
+            raw_results = self.guarded_write(self.conn.search, body=body, index=index_name, doc_type=doc_type,
+                                             **search_params)
+            total = raw_results.get('hits', {}).get('total', 0)
+            scroll_id = raw_results.get('_scroll_id')
+
+            while scroll_id:
+                raw_results = self.guarded_write(self.conn.scroll, scroll_id=scroll_id, scroll=scroll)
+                scroll_id = raw_results.get('_scroll_id', scroll_id)
+                hits = raw_results.get('hits', {}).get('hits')
+                if not hits:
+                    break
+
+                actions = []
+                for hit in hits:
+                    action = {'_op_type': 'delete', '_index': hit['_index'], '_type': hit['_type'], '_id': hit['_id']}
+                    routing = hit.get('_routing', hit.get('fields', {}).get('_routing'))
+                    if routing is not None:
+                        action['_routing'] = routing
+                    actions.append(action)
+
+                success, failed = self.guarded_write(bulk_index, self.conn, actions, stats_only=True,
+                                                     raise_on_error=False, chunk_size=len(actions))
+                deleted += success
+                if failed:
+                    self.log.warning("Failed to delete %d documents of '%s'", failed, doc_type)
+                self.log.info("Deleted %d of %d documents of '%s'", deleted, total, doc_type)
+        finally:
+            if scroll_id is not None:
+                try:
+                    self.conn.clear_scroll(scroll_id=scroll_id)
+                except elasticsearch.TransportError as e:
+                    self.log.warning("Failed to clear Elasticsearch scroll: %s", e)
+
+        if commit:
+            self.guarded_write(self.conn.indices.refresh, index=index_name)
+
+        return deleted
+
+    def guarded_call(self, func, *args, **kwargs):
+        """Call a function that sends a read request to Elasticsearch through the circuit breaker, if enabled.
+
+        :param func: Function to call.
+        :type func: callable
+        :return: Function result.
+        :raise: CircuitOpenError if the circuit is open.
+        """
+        if self.circuit_breaker is None:
+            return func(*args, **kwargs)
+
+        return self.circuit_breaker.call(func, *args, **kwargs)
+
+    def guarded_write(self, func, *args, **kwargs):
+        """Call a function that sends a write request to Elasticsearch through the circuit breaker of writes, if
+        enabled. Writes have their own breaker, so slow bulk requests don't open the circuit of searches.
+
+        :param func: Function to call.
+        :type func: callable
+        :return: Function result.
+        :raise: CircuitOpenError if the circuit is open.
+        """
+        if self.write_circuit_breaker is None:
+            return func(*args, **kwargs)
+
+        return self.write_circuit_breaker.call(func, *args, **kwargs)
+
+    def send_search(self, **kwargs):
+        """Send a search request through the circuit breaker. With HEDGED_SEARCHES, a duplicate request with
+        another preference, so it's likely served by other shard copies, is sent if the first one is slow.
+
+        :param kwargs: Arguments of the client search method.
+        :type kwargs: dict
+        :return: Raw results.
+        :rtype: dict
+        """
+        if self.hedged_search is None or 'preference' in kwargs:
+            return self.guarded_call(self.conn.search, **kwargs)
+
+        hedge_kwargs = dict(kwargs, preference='hedge_%s' % uuid.uuid4().hex)
+        return self.guarded_call(self.hedged_search.do, lambda: self.conn.search(**kwargs),
+                                 lambda: self.conn.search(**hedge_kwargs))
+
+    def invalidate_result_cache(self, doc_types=None):
+        """Invalidate cached results of some doc types, if result cache is enabled.
+
+        :param doc_types: Doc types, all cached results are invalidated if None.
+        :type doc_types: list
+        """
+        if self.result_cache is not None:
+            self.result_cache.invalidate(doc_types)
+
     def build_search_kwargs(self, query_string, sort_by=None, start_offset=0, end_offset=None,
                             fields='', highlight=False, facets=None,
                             date_facets=None, query_facets=None,
                             narrow_queries=None, spelling_query=None,
                             within=None, dwithin=None, distance_point=None,
                             models=None, limit_to_registered_models=None,
-                            result_class=None):
+                            result_class=None, query_type=None, source_includes=None, source_excludes=None,
+                            stored_fields=None, ids_only=False, more_like_this=None, timeout=None,
+                            terminate_after=None, main_query=None):
         """Build all kwargs necessaries to perform the query.
 
         :param query_string: Query string.
@@ -278,7 +996,8 @@ class ElasticsearchSearchBackend(HaystackBackend):
         :type end_offset: int
         :param fields: Fields that will be searched for.
         :type fields: str
-        :param highlight:
+        :param highlight: True to highlight the document field, or a dict with fields, fragment_size and
+            number_of_fragments.
         :param facets:
         :param date_facets:
         :param query_facets:
@@ -292,27 +1011,31 @@ class ElasticsearchSearchBackend(HaystackBackend):
         :param limit_to_registered_models:
         :param result_class: Class used for search results.
         :type result_class: object
+        :param query_type: Main query type, connection's QUERY_TYPE is used by default.
+        :type query_type: str
+        :param source_includes: Fields of the source returned for each hit, whole source is returned if empty.
+        :type source_includes: list
+        :param source_excludes: Fields of the source not returned for each hit.
+        :type source_excludes: list
+        :param stored_fields: Stored fields returned for each hit instead of the source.
+        :type stored_fields: list
+        :param ids_only: Return only content type and id of each hit, without source.
+        :type ids_only: bool
+        :param more_like_this: Options of a more_like_this query used as main query, the query string is then used
+            as a filter.
+        :type more_like_this: dict
+        :param timeout: Time after which each shard returns the hits collected so far, e.g. '500ms'. Connection's
+            SEARCH_TIMEOUT is used if None.
+        :type timeout: str
+        :param terminate_after: Max number of documents collected by each shard. Connection's TERMINATE_AFTER is
+            used if None.
+        :type terminate_after: int
+        :param main_query: Query used instead of the one built from the query string, see
+            ElasticsearchSearchQuery.build_structured_query.
+        :type main_query: dict
         :return: Search kwargs.
         :rtype: dict
         """
-        if query_string == '*:*':
-            kwargs = {
-                'query': {
-                    "match_all": {}
-                },
-            }
-        else:
-            kwargs = {
-                'query': {
-                    'query_string': {
-                        'default_operator': DEFAULT_OPERATOR,
-                        'query': query_string,
-                        'analyze_wildcard': True,
-                        'auto_generate_phrase_queries': True,
-                    },
-                },
-            }
-
         if limit_to_registered_models is None:
             limit_to_registered_models = getattr(settings, 'HAYSTACK_LIMIT_TO_REGISTERED_MODELS', True)
 
@@ -325,16 +1048,50 @@ class ElasticsearchSearchBackend(HaystackBackend):
         else:
             model_choices = []
 
+        if main_query is not None:
+            kwargs = {
+                'query': main_query,
+            }
+        elif query_string == '*:*':
+            kwargs = {
+                'query': {
+                    "match_all": {}
+                },
+            }
+        else:
+            kwargs = {
+                'query': self.build_main_query(query_string, query_type, model_choices),
+            }
+
         kwargs['models'] = model_choices
 
         filters = []
 
+        if more_like_this:
+            # The query string only restricts similar documents, so it doesn't change their score.
+            if query_string != '*:*':
+                filters.append({'query': kwargs['query']})
+            kwargs['query'] = {'more_like_this': more_like_this}
+
         if fields:
             if isinstance(fields, (list, set)):
                 fields = " ".join(fields)
 
             kwargs['fields'] = fields
 
+        if ids_only:
+            kwargs['fields'] = [DJANGO_CT, DJANGO_ID]
+            kwargs['_source'] = False
+        elif stored_fields:
+            kwargs['fields'] = sorted(set(stored_fields) | {DJANGO_CT, DJANGO_ID})
+            kwargs['_source'] = False
+        elif source_includes or source_excludes:
+            kwargs['_source'] = {}
+            if source_includes:
+                kwargs['_source']['include'] = sorted(set(source_includes) | {DJANGO_CT, DJANGO_ID})
+            if source_excludes:
+                kwargs['_source']['exclude'] = sorted(set(source_excludes) - {DJANGO_CT, DJANGO_ID})
+
         if sort_by is not None:
             order_list = []
             for field, direction in sort_by:
@@ -359,12 +1116,8 @@ class ElasticsearchSearchBackend(HaystackBackend):
 
             kwargs['sort'] = order_list
 
-        if highlight is True:
-            kwargs['highlight'] = {
-                'fields': {
-                    '_all': {'store': 'yes'},
-                }
-            }
+        if highlight:
+            kwargs['highlight'] = self.build_highlight(highlight, model_choices)
 
         if self.include_spelling:
             kwargs['suggest'] = {
@@ -380,6 +1133,13 @@ class ElasticsearchSearchBackend(HaystackBackend):
         if narrow_queries is None:
             narrow_queries = set()
 
+        if self.facet_engine == 'aggregations':
+            aggregations = self.build_facet_aggregations(facets, date_facets, query_facets)
+            if aggregations:
+                kwargs['aggs'] = aggregations
+
+            facets = date_facets = query_facets = None
+
         if facets is not None:
             kwargs.setdefault('facets', {})
 
@@ -387,7 +1147,7 @@ class ElasticsearchSearchBackend(HaystackBackend):
                 facet_options = {
                     'terms': {
                         'field': facet_fieldname,
-                        'size': 100,
+                        'size': self.facet_size,
                     },
                 }
                 # Special cases for options applied at the facet level (not the terms level).
@@ -491,269 +1251,1867 @@ class ElasticsearchSearchBackend(HaystackBackend):
             else:
                 kwargs['query']['filtered']["filter"] = {"bool": {"must": filters}}
 
+        timeout = timeout if timeout is not None else self.search_timeout
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+
+        terminate_after = terminate_after if terminate_after is not None else self.terminate_after
+        if terminate_after is not None:
+            kwargs['terminate_after'] = terminate_after
+
         return kwargs
 
-    def _process_results_facets_section(self, raw_results):
-        """Process facets section from raw results.
+    def build_highlight(self, highlight=True, model_choices=None):
+        """Build highlighting options. Fields mapped with with_positions_offsets term vectors use the fast vector
+        highlighter, so documents don't need to be analyzed again.
 
-        :param raw_results: Result returned from ElasticSearch API.
-        :type raw_results: dict
-        :return: Facets section.
+        :param highlight: True to highlight the document field, or a dict with fields, fragment_size and
+            number_of_fragments. Connection's defaults are used for missing options.
+        :param model_choices: Content types over the query will be performed.
+        :type model_choices: list
+        :return: Highlight options.
         :rtype: dict
         """
-        # Initialize return value
-        facets = {}
-
-        # Do processing
-        if 'facets' in raw_results:
-            facets = {
-                'fields': {},
-                'dates': {},
-                'queries': {},
-            }
-
-            for facet_fieldname, facet_info in raw_results['facets'].items():
-                if facet_info.get('_type', 'terms') == 'terms':
-                    facets['fields'][facet_fieldname] = [(individual['term'], individual['count']) for individual in
-                                                         facet_info['terms']]
-                elif facet_info.get('_type', 'terms') == 'date_histogram':
-                    # Elasticsearch provides UTC timestamps with an extra three
-                    # decimals of precision, which datetime barfs on.
-                    facets['dates'][facet_fieldname] = [
-                        (datetime.datetime.utcfromtimestamp(individual['time'] / 1000), individual['count']) for
-                        individual in facet_info['entries']]
-                elif facet_info.get('_type', 'terms') == 'query':
-                    facets['queries'][facet_fieldname] = facet_info['count']
+        options = highlight if isinstance(highlight, dict) else {}
+        fragment_size = options.get('fragment_size', self.highlight_fragment_size)
+        number_of_fragments = options.get('number_of_fragments', self.highlight_number_of_fragments)
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
 
-        return facets
+        fields = {}
+        for field_name in options.get('fields') or [self.document_field]:
+            index_fieldname = field_name
+            term_vectors = set()
 
-    def _process_results_results_section(self, distance_point, geo_sort, raw_results, result_class):
-        """Process results section from raw results.
+            for class_index, fieldname in unified_index.get_index_fieldname(field_name).items():
+                field_object = class_index.fields.get(fieldname)
+                if field_object is None:
+                    continue
 
-        :param raw_results: Result returned from ElasticSearch API.
-        :type raw_results: dict
-        :return: Results section.
-        :rtype: dict
-        """
-        from haystack import connections
-        if distance_point and geo_sort:
-            from haystack.utils.geo import Distance
+                if model_choices and get_model_ct(class_index.get_model()) not in model_choices:
+                    continue
 
-        # Get result class
-        if result_class is None:
-            result_class = SearchResult
+                index_fieldname = fieldname
+                term_vectors.add(self.get_term_vector(field_object))
 
-        # Initialize return values
-        hits = raw_results.get('hits', {}).get('total', 0)
-        results = []
+            field_options = {}
+            if term_vectors == {'with_positions_offsets'}:
+                field_options['type'] = 'fvh'
+            if fragment_size is not None:
+                field_options['fragment_size'] = fragment_size
+            if number_of_fragments is not None:
+                field_options['number_of_fragments'] = number_of_fragments
 
-        # Get unified index
-        unified_index = connections[self.connection_alias].get_unified_index()
+            fields[index_fieldname] = field_options
 
-        # Do processing
-        for raw_result in raw_results.get('hits', {}).get('hits', []):
-            try:
-                source = raw_result['_source']
-                app_label, model_name = source[DJANGO_CT].split('.')
-                additional_fields = {}
-                model = get_model(app_label, model_name)
-                index = unified_index.get_index(model)
+        return {'fields': fields}
 
-                for key, value in [(k, v) for k, v in source.items() if k != DJANGO_CT and k != DJANGO_ID]:
-                    string_key = str(key)
+    def get_term_vector(self, field_class):
+        """Get the term vector a field is mapped with, following the same rules as build_schema.
 
-                    try:
-                        additional_fields[string_key] = index.fields[string_key].convert(value)
-                    except (KeyError, NameError):
+        :param field_class: Field.
+        :type field_class: SearchField
+        :return: Term vector, None if the field has no term vector.
+        :rtype: str
+        """
+        field_mapping = FIELD_MAPPINGS.get(field_class.field_type, DEFAULT_FIELD_MAPPING)
+        if field_mapping['type'] != 'string' or field_class.indexed is False or hasattr(field_class, 'facet_for') \
+                or getattr(field_class, 'is_multivalued', False) or field_class.field_type in ('ngram', 'edge_ngram'):
+            return None
+
+        return getattr(field_class, 'term_vector', None)
+
+    def build_facet_aggregations(self, facets=None, date_facets=None, query_facets=None):
+        """Build aggregations that compute facets. Aggregation names are prefixed with the kind of facet, and facets
+        sharing the same scope and filter are nested in a single global or filter aggregation.
+
+        :param facets: Field facets and their options (size, shard_size, execution_hint, global_scope, facet_filter,
+            or any other option of terms aggregation).
+        :type facets: dict
+        :param date_facets: Date facets and their options.
+        :type date_facets: dict
+        :param query_facets: Query facets.
+        :type query_facets: list
+        :return: Aggregations.
+        :rtype: dict
+        """
+        # Each facet is (name, aggregation, global scope, filter).
+        facet_aggregations = []
+
+        for facet_fieldname, extra_options in (facets or {}).items():
+            extra_options = dict(extra_options)
+            global_scope = extra_options.pop('global_scope', False)
+            facet_filter = extra_options.pop('facet_filter', None)
+
+            terms = {
+                'field': facet_fieldname,
+                'size': self.facet_size,
+            }
+            if self.facet_shard_size is not None:
+                terms['shard_size'] = self.facet_shard_size
+            if self.facet_execution_hint is not None:
+                terms['execution_hint'] = self.facet_execution_hint
+            terms.update(extra_options)
+
+            facet_aggregations.append(('fields:%s' % facet_fieldname, {'terms': terms}, global_scope, facet_filter))
+
+        for facet_fieldname, value in (date_facets or {}).items():
+            interval = value.get('gap_by').lower()
+
+            # Need to detect on amount (can't be applied on months or years).
+            if value.get('gap_amount', 1) != 1 and interval not in ('month', 'year'):
+                # Just the first character is valid for use.
+                interval = "%s%s" % (value['gap_amount'], interval[:1])
+
+            date_histogram = {
+                'date_histogram': {
+                    'field': facet_fieldname,
+                    'interval': interval,
+                },
+            }
+            date_filter = {
+                'range': {
+                    facet_fieldname: {
+                        'from': self._from_python(value.get('start_date')),
+                        'to': self._from_python(value.get('end_date')),
+                    },
+                },
+            }
+            facet_aggregations.append(('dates:%s' % facet_fieldname, date_histogram, False, date_filter))
+
+        for facet_fieldname, value in (query_facets or []):
+            query_filter = {
+                'filter': {
+                    'query': {
+                        'query_string': {
+                            'query': value,
+                        },
+                    },
+                },
+            }
+            facet_aggregations.append(('queries:%s' % facet_fieldname, query_filter, False, None))
+
+        aggregations = {}
+        groups = {}
+
+        for name, aggregation, global_scope, facet_filter in facet_aggregations:
+            if not global_scope and facet_filter is None:
+                aggregations[name] = aggregation
+                continue
+
+            group_key = json.dumps([global_scope, facet_filter], sort_keys=True, default=six.text_type)
+            if group_key not in groups:
+                group_name = '%s:%d' % (FACET_GROUP, len(groups))
+                group = {'aggs': {}}
+
+                if facet_filter is not None:
+                    group['filter'] = facet_filter
+                    if global_scope:
+                        # Filter is applied inside the global scope.
+                        aggregations[group_name] = {'global': {}, 'aggs': {group_name: group}}
+                    else:
+                        aggregations[group_name] = group
+                else:
+                    group['global'] = {}
+                    aggregations[group_name] = group
+
+                groups[group_key] = group['aggs']
+
+            groups[group_key][name] = aggregation
+
+        return aggregations
+
+    def build_main_query(self, query_string, query_type=None, model_choices=None):
+        """Build the main query used for free-text search. Types other than query_string don't support Lucene
+        syntax, so they are intended for plain text such as the one typed in a search box. Queries with field filters
+        use them only for their content, see ElasticsearchSearchQuery.build_structured_query.
+
+        :param query_string: Query string.
+        :type query_string: str
+        :param query_type: Query type, one of QUERY_TYPES. Connection's QUERY_TYPE is used if None.
+        :type query_type: str
+        :param model_choices: Content types over the query will be performed.
+        :type model_choices: list
+        :return: Query.
+        :rtype: dict
+        :raise: ValueError if query type is not valid.
+        """
+        if query_type is None:
+            query_type = self.query_type
+
+        if query_type == 'query_string':
+            query = {
+                'query_string': {
+                    'default_operator': DEFAULT_OPERATOR,
+                    'query': query_string,
+                    'analyze_wildcard': True,
+                    'auto_generate_phrase_queries': True,
+                },
+            }
+        elif query_type == 'simple_query_string':
+            query = {
+                'simple_query_string': {
+                    'default_operator': DEFAULT_OPERATOR,
+                    'query': query_string,
+                },
+            }
+        elif query_type == 'multi_match':
+            query = {
+                'multi_match': {
+                    'operator': DEFAULT_OPERATOR,
+                    'query': query_string,
+                    'fields': self.get_multi_match_fields(model_choices),
+                },
+            }
+        elif query_type == 'match':
+            query = {
+                'match': {
+                    self.document_field: {
+                        'operator': DEFAULT_OPERATOR,
+                        'query': query_string,
+                    },
+                },
+            }
+        else:
+            raise ValueError("Invalid query type '%s', choices are: %s" % (query_type, ', '.join(QUERY_TYPES)))
+
+        return query
+
+    def get_multi_match_fields(self, model_choices=None):
+        """Get full-text fields and their boosts from index definitions, to be used in a multi_match query.
+
+        :param model_choices: Content types whose indexes will be used, all indexes if empty.
+        :type model_choices: list
+        :return: Field names, with boost suffix if needed.
+        :rtype: list
+        """
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        boosts = {}
+
+        for model in unified_index.get_indexed_models():
+            if model_choices and get_model_ct(model) not in model_choices:
+                continue
+
+            for field_class in unified_index.indexes[model].fields.values():
+                field_mapping = FIELD_MAPPINGS.get(field_class.field_type, DEFAULT_FIELD_MAPPING)
+                if field_mapping['type'] != 'string' or field_class.indexed is False or \
+                        hasattr(field_class, 'facet_for') or getattr(field_class, 'is_multivalued', False):
+                    continue
+
+                field_name = field_class.index_fieldname
+                boosts[field_name] = max(boosts.get(field_name, field_class.boost), field_class.boost)
+
+        if not boosts:
+            boosts[self.document_field] = 1.0
+
+        return [field_name if boost == 1.0 else '%s^%s' % (field_name, boost)
+                for field_name, boost in sorted(boosts.items())]
+
+    def _process_results_facets_section(self, raw_results):
+        """Process facets section from raw results.
+
+        :param raw_results: Result returned from ElasticSearch API.
+        :type raw_results: dict
+        :return: Facets section.
+        :rtype: dict
+        """
+        # Initialize return value
+        facets = {}
+
+        # Do processing
+        if 'facets' in raw_results:
+            facets = {
+                'fields': {},
+                'dates': {},
+                'queries': {},
+            }
+
+            for facet_fieldname, facet_info in raw_results['facets'].items():
+                if facet_info.get('_type', 'terms') == 'terms':
+                    facets['fields'][facet_fieldname] = [(individual['term'], individual['count']) for individual in
+                                                         facet_info['terms']]
+                elif facet_info.get('_type', 'terms') == 'date_histogram':
+                    # Elasticsearch provides UTC timestamps with an extra three
+                    # decimals of precision, which datetime barfs on.
+                    facets['dates'][facet_fieldname] = [
+                        (datetime.datetime.utcfromtimestamp(individual['time'] / 1000), individual['count']) for
+                        individual in facet_info['entries']]
+                elif facet_info.get('_type', 'terms') == 'query':
+                    facets['queries'][facet_fieldname] = facet_info['count']
+
+        if 'aggregations' in raw_results:
+            aggregation_facets = {
+                'fields': {},
+                'dates': {},
+                'queries': {},
+            }
+            self._process_facet_aggregations(raw_results['aggregations'], aggregation_facets)
+
+            if any(aggregation_facets.values()):
+                for kind, values in aggregation_facets.items():
+                    facets.setdefault(kind, {}).update(values)
+
+        return facets
+
+    def _process_facet_aggregations(self, aggregations, facets):
+        """Process aggregations built by build_facet_aggregations, in the same format as legacy facets.
+
+        :param aggregations: Aggregations returned from ElasticSearch API.
+        :type aggregations: dict
+        :param facets: Facets where results are added.
+        :type facets: dict
+        """
+        for name, aggregation in aggregations.items():
+            kind, _, facet_fieldname = name.partition(':')
+
+            if kind == 'fields':
+                facets['fields'][facet_fieldname] = [(bucket['key'], bucket['doc_count']) for bucket in
+                                                     aggregation['buckets']]
+            elif kind == 'dates':
+                # Elasticsearch provides UTC timestamps with an extra three
+                # decimals of precision, which datetime barfs on.
+                facets['dates'][facet_fieldname] = [
+                    (datetime.datetime.utcfromtimestamp(bucket['key'] / 1000), bucket['doc_count']) for
+                    bucket in aggregation['buckets']]
+            elif kind == 'queries':
+                facets['queries'][facet_fieldname] = aggregation['doc_count']
+            elif kind == FACET_GROUP:
+                self._process_facet_aggregations(
+                    {k: v for k, v in aggregation.items() if isinstance(v, dict)}, facets)
+
+    def _process_results_results_section(self, distance_point, geo_sort, raw_results, result_class):
+        """Process results section from raw results.
+
+        :param raw_results: Result returned from ElasticSearch API.
+        :type raw_results: dict
+        :return: Results section.
+        :rtype: dict
+        """
+        from haystack import connections
+        if distance_point and geo_sort:
+            from haystack.utils.geo import Distance
+
+        # Get result class
+        if result_class is None:
+            result_class = SearchResult
+
+        # Initialize return values
+        hits = raw_results.get('hits', {}).get('total', 0)
+        results = []
+
+        # Lazy result classes convert fields on access
+        lazy_fields = getattr(result_class, 'lazy_fields', False)
+
+        # Get content types of the unified index
+        content_types = connections[self.connection_alias].get_unified_index().get_content_type_table()
+
+        # Do processing
+        for raw_result in raw_results.get('hits', {}).get('hits', []):
+            try:
+                source = self._get_hit_source(raw_result)
+                content_type = content_types.get(source[DJANGO_CT])
+                if content_type is None:
+                    raise NotHandled("Content type '%s' is not registered" % source[DJANGO_CT])
+
+                fields = content_type.fields
+                additional_fields = {}
+                stored_keys = set(raw_result.get('fields', {})) - set(raw_result.get('_source') or {})
+
+                for key, value in source.items():
+                    if key == DJANGO_CT or key == DJANGO_ID:
+                        continue
+
+                    string_key = str(key)
+                    field_object = fields.get(string_key)
+
+                    # Stored fields are always returned as lists.
+                    if key in stored_keys and isinstance(value, list) and len(value) == 1 and \
+                            not getattr(field_object, 'is_multivalued', False):
+                        value = value[0]
+
+                    if lazy_fields:
+                        additional_fields[string_key] = value
+                    elif field_object is None:
                         additional_fields[string_key] = self._to_python(value)
+                    else:
+                        additional_fields[string_key] = field_object.convert(value)
+
+                if lazy_fields:
+                    additional_fields = {
+                        '_raw_fields': additional_fields,
+                        '_fields': fields,
+                        '_to_python': self._to_python,
+                    }
+
+                try:
+                    additional_fields['highlighted'] = raw_result['highlight']
+                except KeyError:
+                    pass
+
+                if distance_point:
+                    additional_fields['_point_of_origin'] = distance_point
+
+                    if geo_sort:
+                        try:
+                            additional_fields['_distance'] = Distance(km=float(raw_result['sort'][0]))
+                        except KeyError:
+                            additional_fields['_distance'] = None
+
+                result = result_class(content_type.app_label, content_type.model_name, source[DJANGO_ID],
+                                      raw_result['_score'], **additional_fields)
+                results.append(result)
+            except NotHandled:
+                hits -= 1
+            except KeyError:
+                hits -= 1
+                logger.warning("Hit has no source field")
+
+        return results, hits
+
+    def _get_hit_source(self, raw_result):
+        """Get the fields returned for a hit, either in its source or as stored fields.
+
+        :param raw_result: Hit returned from ElasticSearch API.
+        :type raw_result: dict
+        :return: Fields of the hit.
+        :rtype: dict
+        :raise: KeyError if the hit has neither source nor fields.
+        """
+        if '_source' not in raw_result and 'fields' not in raw_result:
+            raise KeyError('_source')
+
+        source = dict(raw_result.get('_source') or {})
+        for key, value in raw_result.get('fields', {}).items():
+            source.setdefault(key, value)
+
+        for key in (DJANGO_CT, DJANGO_ID):
+            if isinstance(source.get(key), list):
+                source[key] = source[key][0]
+
+        return source
+
+    def _process_results_suggest_section(self, raw_results):
+        """Process suggest section from raw results.
+
+        :param raw_results: Result returned from ElasticSearch API.
+        :type raw_results: dict
+        :return: Suggestion section.
+        :rtype: dict
+        """
+        # Initialize return value
+        spelling_suggestion = None
+
+        # Do processing
+        if self.include_spelling and 'suggest' in raw_results:
+            raw_suggest = raw_results['suggest'].get('suggest')
+            if raw_suggest:
+                spelling_suggestion = ' '.join(
+                    [word['text'] if len(word['options']) == 0 else word['options'][0]['text'] for word in raw_suggest])
+
+        return spelling_suggestion
+
+    def _process_results(self, raw_results, highlight=False, result_class=None, distance_point=None, geo_sort=False):
+        """Process results from a raw dictionary obtained in a query to Elasticsearch API
+
+        :param raw_results: Raw results.
+        :type raw_results: dict
+        :param highlight: Indicates if highlighted.
+        :type highlight: bool
+        :param result_class: Class used for a result value.
+        :type result_class: object
+        :param distance_point: Initial distance.
+        :type distance_point: object
+        :param geo_sort: Indicates if sorted using geo.
+        :type geo_sort: bool
+        :return: Processed results.
+        :rtype: dict
+        """
+
+        spelling_suggestion = self._process_results_suggest_section(raw_results)
+
+        facets = self._process_results_facets_section(raw_results)
+
+        results, hits = self._process_results_results_section(distance_point, geo_sort, raw_results, result_class)
+
+        return {
+            'results': results,
+            'hits': hits,
+            'facets': facets,
+            'spelling_suggestion': spelling_suggestion,
+            'timed_out': raw_results.get('timed_out', False),
+            'terminated_early': raw_results.get('terminated_early', False),
+            'shards': raw_results.get('_shards', {}),
+        }
+
+    def is_partial(self, raw_results):
+        """Check if a search response only has some of the results, because the search timed out or some shards
+        failed. Partial responses aren't cached.
+
+        :param raw_results: Raw results.
+        :type raw_results: dict
+        :rtype: bool
+        """
+        return bool(raw_results.get('timed_out') or raw_results.get('_shards', {}).get('failed'))
+
+    @log_query
+    def search(self, query_string, **kwargs):
+        """Do a search in Elasticsearch.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param kwargs: Search parameters.
+        :type kwargs: dict
+        :return: Search results.
+        """
+        if len(query_string) == 0:
+            return {
+                'results': [],
+                'hits': 0,
+            }
+
+        if not self.setup_complete:
+            self.setup()
+
+        search_kwargs, doc_type, geo_sort = self.build_search_request(query_string, **kwargs)
+        process_kwargs = {
+            'routing': kwargs.get('routing'),
+            'date_ranges': kwargs.get('date_ranges'),
+            'request_timeout': kwargs.get('request_timeout'),
+            'highlight': kwargs.get('highlight'),
+            'result_class': kwargs.get('result_class', SearchResult),
+            'distance_point': kwargs.get('distance_point'),
+            'geo_sort': geo_sort,
+        }
+
+        if self.search_flight is not None:
+            flight_key = json.dumps([doc_type, search_kwargs, process_kwargs], sort_keys=True,
+                                    default=six.text_type)
+            return self.search_flight.do(flight_key, self._search, query_string, search_kwargs, doc_type,
+                                         **process_kwargs)
+
+        return self._search(query_string, search_kwargs, doc_type, **process_kwargs)
+
+    def build_search_request(self, query_string, **kwargs):
+        """Build the body and doc types of a search request.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param kwargs: Search parameters.
+        :type kwargs: dict
+        :return: Search body, comma separated doc types and whether results are sorted by distance.
+        :rtype: tuple
+        """
+        # Routing and date ranges select the shards and indexes searched, see build_request_params and
+        # get_search_index, and request timeout is a client option, see build_timeout_params.
+        kwargs.pop('routing', None)
+        kwargs.pop('date_ranges', None)
+        kwargs.pop('request_timeout', None)
+        search_kwargs = self.build_search_kwargs(query_string, **kwargs)
+        search_kwargs['from'] = kwargs.get('start_offset', 0)
+
+        order_fields = set()
+        for order in search_kwargs.get('sort', []):
+            for key in order.keys():
+                order_fields.add(key)
+
+        geo_sort = '_geo_distance' in order_fields
+
+        end_offset = kwargs.get('end_offset')
+        start_offset = kwargs.get('start_offset', 0)
+        if end_offset is not None and end_offset > start_offset:
+            search_kwargs['size'] = end_offset - start_offset
+
+        models = search_kwargs.pop('models', None)
+        doc_type = ','.join(models) if models else ''
+
+        return search_kwargs, doc_type, geo_sort
+
+    def build_search_params(self, search_kwargs, routing=None):
+        """Build the URL params of a search request. Whole source is requested unless the body projects it.
+
+        :param search_kwargs: Search body.
+        :type search_kwargs: dict
+        :param routing: Comma separated routing values, the search is sent to every shard if empty.
+        :type routing: str
+        :return: URL params.
+        :rtype: dict
+        """
+        search_params = self.build_request_params(routing)
+
+        if '_source' not in search_kwargs:
+            search_params['_source'] = True
+
+        return search_params
+
+    def build_request_params(self, routing=None):
+        """Build the URL params shared by search, count and aggregation requests.
+
+        :param routing: Comma separated routing values, the request is sent to every shard if empty.
+        :type routing: str
+        :return: URL params.
+        :rtype: dict
+        """
+        request_params = {}
+
+        if routing:
+            request_params['routing'] = routing
+
+        if self.separate_indexes:
+            # Physical indexes of a model, or time based indexes of a period, may not exist yet.
+            request_params['ignore_unavailable'] = True
+
+        return request_params
+
+    def build_timeout_params(self, request_timeout=None):
+        """Build the client params that limit how long a request waits for its response.
+
+        :param request_timeout: Seconds, connection's REQUEST_TIMEOUT is used if None, or TIMEOUT if not set.
+        :type request_timeout: float
+        :return: Client params.
+        :rtype: dict
+        """
+        request_timeout = request_timeout if request_timeout is not None else self.request_timeout
+        if request_timeout is None:
+            return {}
+
+        return {'request_timeout': request_timeout}
+
+    def _search(self, query_string, search_kwargs, doc_type, routing=None, date_ranges=None, request_timeout=None,
+                highlight=False, result_class=None, distance_point=None, geo_sort=False):
+        """Send a search request to Elasticsearch, or get its response from result cache, and process it.
+
+        :param query_string: The string used for querying.
+        :type query_string: str
+        :param search_kwargs: Search body.
+        :type search_kwargs: dict
+        :param doc_type: Comma separated doc types.
+        :type doc_type: str
+        :param routing: Comma separated routing values.
+        :type routing: str
+        :param date_ranges: Date range of results for some fields, used to select time based indexes.
+        :type date_ranges: dict
+        :param request_timeout: Seconds the client waits for the response.
+        :type request_timeout: float
+        :return: Search results.
+        :rtype: dict
+        """
+        search_params = self.build_search_params(search_kwargs, routing)
+
+        raw_results = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key('search', search_kwargs, doc_type, **search_params)
+            raw_results = self.result_cache.get(cache_key)
+
+        if raw_results is None:
+            try:
+                raw_results = self.send_search(body=search_kwargs, index=self.get_search_index(doc_type, date_ranges),
+                                               doc_type=doc_type, **dict(search_params,
+                                                                         **self.build_timeout_params(request_timeout)))
+
+                if self.result_cache is not None and not self.is_partial(raw_results):
+                    self.result_cache.set(cache_key, raw_results)
+            except elasticsearch.TransportError as e:
+                if not self.silently_fail:
+                    raise
+
+                self.log.error("Failed to query Elasticsearch using '%s': %s", query_string, e)
+                # A client timeout is reported as a timed out search without results.
+                raw_results = {'timed_out': True} if isinstance(e, elasticsearch.ConnectionTimeout) else {}
+
+        return self._process_results(raw_results, highlight=highlight, result_class=result_class,
+                                     distance_point=distance_point, geo_sort=geo_sort)
+
+    def count(self, query_string, **kwargs):
+        """Count the results of a search using Elasticsearch count API, so no hit is fetched nor processed. Counts
+        are cached separately from search results if result cache is enabled.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param kwargs: Search parameters, only those that affect the query are used.
+        :type kwargs: dict
+        :return: Number of results.
+        :rtype: int
+        """
+        if len(query_string) == 0:
+            return 0
+
+        if not self.setup_complete:
+            self.setup()
+
+        for key in ('start_offset', 'end_offset', 'sort_by', 'highlight', 'facets', 'date_facets', 'query_facets'):
+            kwargs.pop(key, None)
+        search_kwargs, doc_type, geo_sort = self.build_search_request(query_string, **kwargs)
+        count_kwargs = {'query': search_kwargs['query']}
+        count_params = self.build_request_params(kwargs.get('routing'))
+
+        raw_results = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key('count', count_kwargs, doc_type, **count_params)
+            raw_results = self.result_cache.get(cache_key)
+
+        if raw_results is None:
+            try:
+                raw_results = self.guarded_call(self.conn.count, body=count_kwargs,
+                                                index=self.get_search_index(doc_type, kwargs.get('date_ranges')),
+                                                doc_type=doc_type, **dict(count_params, **self.build_timeout_params(
+                                                    kwargs.get('request_timeout'))))
+
+                if self.result_cache is not None and not self.is_partial(raw_results):
+                    self.result_cache.set(cache_key, raw_results)
+            except elasticsearch.TransportError as e:
+                if not self.silently_fail:
+                    raise
+
+                self.log.error("Failed to count Elasticsearch results using '%s': %s", query_string, e)
+                raw_results = {}
+
+        return raw_results.get('count', 0)
+
+    def aggregate(self, query_string, fields, metrics=('stats',), percents=None, **kwargs):
+        """Compute metrics over numeric fields of the results of a search, using Elasticsearch aggregations, so
+        only the numbers are returned instead of the hits.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param fields: Integer, float or decimal fields.
+        :type fields: list
+        :param metrics: Metrics computed for each field, any of AGGREGATE_METRICS.
+        :type metrics: list
+        :param percents: Percents computed by percentiles metric, Elasticsearch defaults are used if None.
+        :type percents: list
+        :param kwargs: Search parameters, only those that affect the query are used.
+        :type kwargs: dict
+        :return: Value of each metric for each field.
+        :rtype: dict
+        :raise: ValueError if a metric is not valid or a field is not numeric.
+        """
+        aggregations = {}
+        for field_name in fields:
+            aggregation_field = self.get_aggregation_field(field_name)
+
+            for metric in metrics:
+                if metric not in AGGREGATE_METRICS:
+                    raise ValueError("Invalid metric '%s', choices are: %s" % (metric, ', '.join(AGGREGATE_METRICS)))
+
+                aggregation = {'field': aggregation_field}
+                if metric == 'percentiles' and percents is not None:
+                    aggregation['percents'] = list(percents)
+
+                aggregations['%s:%s' % (field_name, metric)] = {metric: aggregation}
+
+        if len(query_string) == 0 or not aggregations:
+            return {}
+
+        if not self.setup_complete:
+            self.setup()
+
+        for key in ('start_offset', 'end_offset', 'sort_by', 'highlight', 'facets', 'date_facets', 'query_facets'):
+            kwargs.pop(key, None)
+        search_kwargs, doc_type, geo_sort = self.build_search_request(query_string, **kwargs)
+        aggregate_kwargs = {'query': search_kwargs['query'], 'aggs': aggregations}
+        if 'timeout' in search_kwargs:
+            aggregate_kwargs['timeout'] = search_kwargs['timeout']
+        aggregate_params = self.build_request_params(kwargs.get('routing'))
+
+        raw_results = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key('aggregate', aggregate_kwargs, doc_type, **aggregate_params)
+            raw_results = self.result_cache.get(cache_key)
+
+        if raw_results is None:
+            try:
+                raw_results = self.guarded_call(self.conn.search, body=aggregate_kwargs,
+                                                index=self.get_search_index(doc_type, kwargs.get('date_ranges')),
+                                                doc_type=doc_type, search_type='count',
+                                                **dict(aggregate_params,
+                                                       **self.build_timeout_params(kwargs.get('request_timeout'))))
+
+                if self.result_cache is not None and not self.is_partial(raw_results):
+                    self.result_cache.set(cache_key, raw_results)
+            except elasticsearch.TransportError as e:
+                if not self.silently_fail:
+                    raise
+
+                self.log.error("Failed to aggregate Elasticsearch results using '%s': %s", query_string, e)
+                raw_results = {}
+
+        results = {}
+        for name, aggregation in raw_results.get('aggregations', {}).items():
+            field_name, _, metric = name.rpartition(':')
+
+            if metric == 'percentiles':
+                value = dict((float(percent), v) for percent, v in aggregation.get('values', {}).items())
+            elif metric == 'cardinality':
+                value = aggregation.get('value')
+            else:
+                value = aggregation
+
+            results.setdefault(field_name, {})[metric] = value
+
+        return results
+
+    def group_search(self, query_string, size=5, **kwargs):
+        """Get the top results of each model in a single search, using a terms aggregation over content type with
+        top hits for each bucket. Hits are processed the same way as search results.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param size: Number of results of each model.
+        :type size: int
+        :param kwargs: Search parameters, offsets and facets are ignored.
+        :type kwargs: dict
+        :return: Search results and number of hits of each content type, by descending number of hits.
+        :rtype: OrderedDict
+        """
+        groups = OrderedDict()
+
+        if len(query_string) == 0:
+            return groups
+
+        if not self.setup_complete:
+            self.setup()
+
+        for key in ('start_offset', 'end_offset', 'facets', 'date_facets', 'query_facets'):
+            kwargs.pop(key, None)
+        search_kwargs, doc_type, geo_sort = self.build_search_request(query_string, **kwargs)
+
+        top_hits = {'size': size}
+        for key in ('sort', 'highlight'):
+            if key in search_kwargs:
+                top_hits[key] = search_kwargs[key]
+
+        if isinstance(search_kwargs.get('fields'), list):
+            # Stored fields aren't supported by top hits, so they are taken from source.
+            top_hits['_source'] = {'include': search_kwargs['fields']}
+        elif '_source' in search_kwargs:
+            top_hits['_source'] = search_kwargs['_source']
+
+        group_kwargs = {
+            'query': search_kwargs['query'],
+            'aggs': {
+                'groups': {
+                    'terms': {'field': DJANGO_CT, 'size': 0},
+                    'aggs': {'top': {'top_hits': top_hits}},
+                },
+            },
+        }
+
+        if 'timeout' in search_kwargs:
+            group_kwargs['timeout'] = search_kwargs['timeout']
+
+        group_params = self.build_request_params(kwargs.get('routing'))
+
+        raw_results = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key('group', group_kwargs, doc_type, **group_params)
+            raw_results = self.result_cache.get(cache_key)
+
+        if raw_results is None:
+            try:
+                raw_results = self.guarded_call(self.conn.search, body=group_kwargs,
+                                                index=self.get_search_index(doc_type, kwargs.get('date_ranges')),
+                                                doc_type=doc_type, search_type='count',
+                                                **dict(group_params,
+                                                       **self.build_timeout_params(kwargs.get('request_timeout'))))
+
+                if self.result_cache is not None and not self.is_partial(raw_results):
+                    self.result_cache.set(cache_key, raw_results)
+            except elasticsearch.TransportError as e:
+                if not self.silently_fail:
+                    raise
+
+                self.log.error("Failed to group Elasticsearch results using '%s': %s", query_string, e)
+                raw_results = {}
+
+        for bucket in raw_results.get('aggregations', {}).get('groups', {}).get('buckets', []):
+            results, hits = self._process_results_results_section(
+                distance_point=kwargs.get('distance_point'), geo_sort=geo_sort, raw_results=bucket['top'],
+                result_class=kwargs.get('result_class', SearchResult))
+            groups[bucket['key']] = {
+                'results': results,
+                'hits': bucket['doc_count'],
+            }
+
+        return groups
+
+    def get_aggregation_field(self, field_name):
+        """Get the Elasticsearch field used to compute metrics over a field. Decimal fields use their numeric
+        subfield.
+
+        :param field_name: Field name.
+        :type field_name: str
+        :return: Elasticsearch field.
+        :rtype: str
+        :raise: ValueError if the field is not a numeric field in every index that contains it.
+        """
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        aggregation_fields = set()
+
+        for class_index, index_fieldname in unified_index.get_index_fieldname(field_name).items():
+            field_object = class_index.fields.get(index_fieldname)
+            if field_object is None:
+                continue
+
+            if isinstance(field_object, DecimalField):
+                aggregation_fields.add('%s.%s' % (index_fieldname, NUMERIC_SUBFIELD))
+            elif field_object.field_type in NUMERIC_FIELD_TYPES:
+                aggregation_fields.add(index_fieldname)
+            else:
+                raise ValueError("Field '%s' is not numeric" % field_name)
+
+        if len(aggregation_fields) != 1:
+            raise ValueError("Field '%s' is not indexed or has different types across indexes" % field_name)
+
+        return aggregation_fields.pop()
+
+    def suggest(self, text, field, size=5, context=None, fuzzy=None):
+        """Get completions of a text from a completion field, using Elasticsearch suggest API. Only the completion
+        suggester runs, no query is done and no result is processed. Completions are cached if result cache is
+        enabled.
+
+        :param text: Text to complete.
+        :type text: str
+        :param field: Completion field.
+        :type field: str
+        :param size: Max number of completions.
+        :type size: int
+        :param context: Context values used to filter completions, required if the field declares a context.
+        :type context: dict
+        :param fuzzy: Fuzzy options, or True for the default ones.
+        :type fuzzy: dict
+        :return: Completions, by descending score, each one with text, score and payload if any.
+        :rtype: list
+        """
+        if len(text) == 0:
+            return []
+
+        if not self.setup_complete:
+            self.setup()
+
+        completion = {'field': self.get_completion_field(field), 'size': size}
+        if context:
+            completion['context'] = context
+        if fuzzy:
+            completion['fuzzy'] = {} if fuzzy is True else fuzzy
+        body = {'completion': {'text': text, 'completion': completion}}
+
+        raw_results = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key('suggest', body, '')
+            raw_results = self.result_cache.get(cache_key)
+
+        if raw_results is None:
+            try:
+                raw_results = self.guarded_call(self.conn.suggest, body=body, index=self.index_name)
+
+                if self.result_cache is not None:
+                    self.result_cache.set(cache_key, raw_results)
+            except elasticsearch.TransportError as e:
+                if not self.silently_fail:
+                    raise
+
+                self.log.error("Failed to get Elasticsearch completions of '%s': %s", text, e)
+                raw_results = {}
+
+        options = []
+        for entry in raw_results.get('completion', []):
+            options.extend(entry.get('options', []))
+
+        return options
+
+    def get_completion_field(self, field_name):
+        """Get the Elasticsearch field of a completion field.
+
+        :param field_name: Field name.
+        :type field_name: str
+        :return: Elasticsearch field.
+        :rtype: str
+        :raise: ValueError if the field is not a completion field in every index that contains it.
+        """
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        completion_fields = set()
+
+        for class_index, index_fieldname in unified_index.get_index_fieldname(field_name).items():
+            field_object = class_index.fields.get(index_fieldname)
+            if field_object is None:
+                continue
+
+            if field_object.field_type != 'completion':
+                raise ValueError("Field '%s' is not a completion field" % field_name)
+            completion_fields.add(index_fieldname)
+
+        if len(completion_fields) != 1:
+            raise ValueError("Field '%s' is not indexed or has different names across indexes" % field_name)
+
+        return completion_fields.pop()
+
+    def multi_search(self, queries):
+        """Do several searches in a single round trip, using Elasticsearch multi search API.
+
+        :param queries: Query string and search parameters of each search.
+        :type queries: list
+        :return: Search results of each search, in the same order.
+        :rtype: list
+        """
+        if not self.setup_complete:
+            self.setup()
+
+        requests, body = self.build_multi_search_request(queries)
+        # The client waits for the slowest search, so the longest request timeout applies.
+        request_timeouts = [kwargs['request_timeout'] for query_string, kwargs in queries
+                            if kwargs.get('request_timeout') is not None]
+
+        raw_responses = []
+        if body:
+            try:
+                raw_responses = self.guarded_call(self.conn.msearch, body=body, **self.build_timeout_params(
+                    max(request_timeouts) if request_timeouts else None)).get('responses', [])
+            except elasticsearch.TransportError as e:
+                if not self.silently_fail:
+                    raise
+
+                self.log.error("Failed to query Elasticsearch using multi search: %s", e)
+
+        return self._process_multi_search_responses(requests, raw_responses)
+
+    def build_multi_search_request(self, queries):
+        """Build the body of a multi search request. Searches whose response is in result cache are not included.
+
+        :param queries: Query string and search parameters of each search.
+        :type queries: list
+        :return: Description of each search and body of the request.
+        :rtype: tuple
+        """
+        requests = []
+        body = []
+        for query_string, kwargs in queries:
+            if len(query_string) == 0:
+                requests.append(None)
+                continue
+
+            search_kwargs, doc_type, geo_sort = self.build_search_request(query_string, **kwargs)
+            request = {
+                'query_string': query_string,
+                'kwargs': kwargs,
+                'geo_sort': geo_sort,
+                'raw_results': None,
+            }
+
+            search_params = self.build_search_params(search_kwargs, kwargs.get('routing'))
+            if self.result_cache is not None:
+                request['cache_key'] = self.result_cache.make_key('search', search_kwargs, doc_type, **search_params)
+                request['raw_results'] = self.result_cache.get(request['cache_key'])
+
+            if request['raw_results'] is None:
+                header = {'index': self.get_search_index(doc_type, kwargs.get('date_ranges'))}
+                if doc_type:
+                    header['type'] = doc_type
+                for key in ('routing', 'ignore_unavailable'):
+                    if key in search_params:
+                        header[key] = search_params[key]
+                body.extend([header, search_kwargs])
+
+            requests.append(request)
+
+        return requests, body
+
+    def _process_multi_search_responses(self, requests, raw_responses):
+        """Process the responses of a multi search request.
+
+        :param requests: Description of each search, as built by build_multi_search_request.
+        :type requests: list
+        :param raw_responses: Responses returned from ElasticSearch API.
+        :type raw_responses: list
+        :return: Search results of each search.
+        :rtype: list
+        """
+        raw_responses = iter(raw_responses)
+
+        for request in [r for r in requests if r is not None and r['raw_results'] is None]:
+            raw_results = next(raw_responses, {})
+
+            if 'error' in raw_results:
+                if not self.silently_fail:
+                    raise SearchBackendError("Failed to query Elasticsearch using '%s': %s" % (
+                        request['query_string'], raw_results['error']))
+
+                self.log.error("Failed to query Elasticsearch using '%s': %s", request['query_string'],
+                               raw_results['error'])
+                raw_results = {}
+            elif raw_results and self.result_cache is not None and not self.is_partial(raw_results):
+                self.result_cache.set(request['cache_key'], raw_results)
+
+            request['raw_results'] = raw_results
+
+        results = []
+        for request in requests:
+            if request is None:
+                results.append({
+                    'results': [],
+                    'hits': 0,
+                })
+            else:
+                kwargs = request['kwargs']
+                results.append(self._process_results(request['raw_results'],
+                                                     highlight=kwargs.get('highlight'),
+                                                     result_class=kwargs.get('result_class', SearchResult),
+                                                     distance_point=kwargs.get('distance_point'),
+                                                     geo_sort=request['geo_sort']))
+
+        return results
+
+    def scan(self, query_string, scroll='5m', size=500, **kwargs):
+        """Iterate over every result of a search using Elasticsearch scroll API, so results are fetched lazily one page
+        at a time instead of sorting and skipping deeper on every page.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param scroll: How long the scroll context is kept alive between pages.
+        :type scroll: str
+        :param size: Number of results fetched in each page.
+        :type size: int
+        :param kwargs: Search parameters, offsets are ignored.
+        :type kwargs: dict
+        :return: Search results.
+        :rtype: generator
+        """
+        for results in self.scan_pages(query_string, scroll=scroll, size=size, **kwargs):
+            for result in results:
+                yield result
+
+    def scan_pages(self, query_string, scroll='5m', size=500, **kwargs):
+        """Iterate over the pages of a search using Elasticsearch scroll API. Unsorted searches use scan search type,
+        that skips scoring and sorting, while sorted ones keep their order. Scroll context is cleared when the
+        iteration finishes or the generator is closed.
+
+        :param query_string: The string that will be used for querying.
+        :type query_string: str
+        :param scroll: How long the scroll context is kept alive between pages.
+        :type scroll: str
+        :param size: Number of results fetched in each page.
+        :type size: int
+        :param kwargs: Search parameters, offsets are ignored.
+        :type kwargs: dict
+        :return: Search results of each page.
+        :rtype: generator
+        """
+        if len(query_string) == 0:
+            return
+
+        if not self.setup_complete:
+            self.setup()
+
+        kwargs.pop('start_offset', None)
+        kwargs.pop('end_offset', None)
+        search_kwargs, doc_type, geo_sort = self.build_search_request(query_string, **kwargs)
+
+        # Facets and suggestions don't make sense when streaming results.
+        for key in ('from', 'size', 'facets', 'suggest'):
+            search_kwargs.pop(key, None)
+
+        preserve_order = 'sort' in search_kwargs
+        search_params = self.build_search_params(search_kwargs, kwargs.get('routing'))
+        search_params.update({'scroll': scroll, 'size': size})
+        timeout_params = self.build_timeout_params(kwargs.get('request_timeout'))
+        search_params.update(timeout_params)
+        if not preserve_order:
+            # Scan search type returns no hits in the first response, and size applies to each shard.
+            search_params['search_type'] = 'scan'
+
+        process_kwargs = {
+            'distance_point': kwargs.get('distance_point'),
+            'geo_sort': geo_sort,
+            'raw_results': None,
+            'result_class': kwargs.get('result_class', SearchResult),
+        }
+
+        scroll_id = None
+        try:
+            raw_results = self.conn.search(body=search_kwargs,
+                                           index=self.get_search_index(doc_type, kwargs.get('date_ranges')),
+                                           doc_type=doc_type, **search_params)
+            scroll_id = raw_results.get('_scroll_id')
+
+            if not preserve_order:
+                raw_results = {}
+                if scroll_id:
+                    raw_results = self.conn.scroll(scroll_id=scroll_id, scroll=scroll, **timeout_params)
+                scroll_id = raw_results.get('_scroll_id', scroll_id)
+
+            while raw_results.get('hits', {}).get('hits'):
+                process_kwargs['raw_results'] = raw_results
+                results, hits = self._process_results_results_section(**process_kwargs)
+                yield results
+
+                if scroll_id is None:
+                    break
+
+                raw_results = self.conn.scroll(scroll_id=scroll_id, scroll=scroll, **timeout_params)
+                scroll_id = raw_results.get('_scroll_id', scroll_id)
+        except elasticsearch.TransportError as e:
+            if not self.silently_fail:
+                raise
 
+            self.log.error("Failed to scroll Elasticsearch using '%s': %s", query_string, e)
+        finally:
+            if scroll_id is not None:
                 try:
-                    additional_fields['highlighted'] = raw_result['highlight']
-                except KeyError:
-                    pass
+                    self.conn.clear_scroll(scroll_id=scroll_id)
+                except elasticsearch.TransportError as e:
+                    self.log.warning("Failed to clear Elasticsearch scroll: %s", e)
+
+    def more_like_this(self, model_instance, additional_query_string=None, mlt_options=None, **kwargs):
+        """Search documents similar to one or several model instances, using a more_like_this query built in the same
+        way as any other search, so models, filters, ordering, limits and result cache apply.
+
+        :param model_instance: Model instance or list of instances used as seed documents.
+        :param additional_query_string: Query string that similar documents must match.
+        :type additional_query_string: str
+        :param mlt_options: Options of the more_like_this query, any of MLT_OPTIONS. Content field of the index of
+            each instance is used if fields are not given.
+        :type mlt_options: dict
+        :param kwargs: Search parameters.
+        :type kwargs: dict
+        :return: Search results.
+        """
+        if not self.setup_complete:
+            self.setup()
 
-                if distance_point:
-                    additional_fields['_point_of_origin'] = distance_point
+        kwargs['more_like_this'] = self.build_more_like_this(model_instance, **(mlt_options or {}))
+        return self.search(additional_query_string or '*:*', **kwargs)
 
-                    if geo_sort:
-                        try:
-                            additional_fields['_distance'] = Distance(km=float(raw_result['sort'][0]))
-                        except KeyError:
-                            additional_fields['_distance'] = None
+    def build_more_like_this(self, model_instances, **options):
+        """Build the options of a more_like_this query whose seed documents are the given instances.
 
-                result = result_class(app_label, model_name, source[DJANGO_ID], raw_result['_score'],
-                                      **additional_fields)
-                results.append(result)
-            except NotHandled:
-                hits -= 1
-            except KeyError:
-                hits -= 1
-                logger.warning("Hit has no source field")
+        :param model_instances: Model instance or list of instances.
+        :param options: Options of the query, any of MLT_OPTIONS.
+        :return: more_like_this query options.
+        :rtype: dict
+        :raise: ValueError if an option is not valid.
+        :raise: MoreLikeThisError if no instance is given.
+        """
+        invalid_options = set(options) - set(MLT_OPTIONS)
+        if invalid_options:
+            raise ValueError("Invalid more like this options: %s, choices are: %s" % (
+                ', '.join(sorted(invalid_options)), ', '.join(MLT_OPTIONS)))
 
-        return results, hits
+        if not isinstance(model_instances, (list, tuple)):
+            model_instances = [model_instances]
 
-    def _process_results_suggest_section(self, raw_results):
-        """Process suggest section from raw results.
+        if not model_instances:
+            raise MoreLikeThisError("No instance was provided to determine 'More Like This' results.")
 
-        :param raw_results: Result returned from ElasticSearch API.
-        :type raw_results: dict
-        :return: Suggestion section.
-        :rtype: dict
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        docs = []
+        fields = set()
+
+        for model_instance in model_instances:
+            # Deferred models will have a different class ("RealClass_Deferred_fieldname")
+            # which won't be in our registry:
+            model_klass = model_instance._meta.concrete_model
+
+            doc_type = get_model_ct(model_klass)
+            search_index = unified_index.get_index(model_klass)
+            doc = {'_index': self.get_document_index_name(doc_type, model_instance), '_type': doc_type,
+                   '_id': get_identifier(model_instance)}
+            routing = self.prepare_routing(search_index, model_instance) \
+                if getattr(search_index, 'routing_field', None) is not None else None
+            if routing is not None:
+                # Routing is required to get documents of routed types.
+                doc['_routing'] = routing
+            docs.append(doc)
+            fields.add(search_index.get_content_field())
+
+        more_like_this = {'docs': docs, 'fields': sorted(fields)}
+        more_like_this.update(options)
+        return more_like_this
+
+
+class ElasticsearchSearchQuery(HaystackQuery):
+    """
+    Provides a way to specify search parameters and lazily load results.
+
+    This implementation changes how Query fragment is constructed, applying changes related to multi-type.
+    """
+    def __init__(self, using=DEFAULT_ALIAS):
+        super(ElasticsearchSearchQuery, self).__init__(using=using)
+        self.query_type = None
+        self.source_includes = None
+        self.source_excludes = None
+        self.stored_fields = None
+        self.ids_only = False
+        self.mlt_options = {}
+        self.search_timeout = None
+        self.terminate_after = None
+        self.request_timeout = None
+        self._search_status = None
+
+    def set_query_type(self, query_type):
+        """Set the main query type used for free-text search.
+
+        :param query_type: Query type, one of QUERY_TYPES. Connection's QUERY_TYPE is used if None.
+        :type query_type: str
         """
-        # Initialize return value
-        spelling_suggestion = None
+        if query_type is not None and query_type not in QUERY_TYPES:
+            raise ValueError("Invalid query type '%s', choices are: %s" % (query_type, ', '.join(QUERY_TYPES)))
 
-        # Do processing
-        if self.include_spelling and 'suggest' in raw_results:
-            raw_suggest = raw_results['suggest'].get('suggest')
-            if raw_suggest:
-                spelling_suggestion = ' '.join(
-                    [word['text'] if len(word['options']) == 0 else word['options'][0]['text'] for word in raw_suggest])
+        self.query_type = query_type
 
-        return spelling_suggestion
+    def set_source(self, includes=None, excludes=None):
+        """Set the fields of the source returned for each result.
 
-    def _process_results(self, raw_results, highlight=False, result_class=None, distance_point=None, geo_sort=False):
-        """Process results from a raw dictionary obtained in a query to Elasticsearch API
+        :param includes: Fields returned, whole source if empty.
+        :type includes: list
+        :param excludes: Fields not returned.
+        :type excludes: list
+        """
+        self.source_includes = list(includes) if includes else None
+        self.source_excludes = list(excludes) if excludes else None
 
-        :param raw_results: Raw results.
-        :type raw_results: dict
-        :param highlight: Indicates if highlighted.
-        :type highlight: bool
-        :param result_class: Class used for a result value.
-        :type result_class: object
-        :param distance_point: Initial distance.
-        :type distance_point: object
-        :param geo_sort: Indicates if sorted using geo.
-        :type geo_sort: bool
-        :return: Processed results.
-        :rtype: dict
+    def set_stored_fields(self, fields):
+        """Set the stored fields returned for each result instead of the source.
+
+        :param fields: Stored fields, source is returned if empty.
+        :type fields: list
         """
+        self.stored_fields = list(fields) if fields else None
 
-        spelling_suggestion = self._process_results_suggest_section(raw_results)
+    def add_highlight(self, fields=None, fragment_size=None, number_of_fragments=None):
+        """Add highlighting to the search results.
 
-        facets = self._process_results_facets_section(raw_results)
+        :param fields: Fields highlighted, document field if empty.
+        :type fields: list
+        :param fragment_size: Size of each fragment, connection's default if None.
+        :type fragment_size: int
+        :param number_of_fragments: Max number of fragments, connection's default if None.
+        :type number_of_fragments: int
+        """
+        options = {}
+        if fields:
+            options['fields'] = list(fields)
+        if fragment_size is not None:
+            options['fragment_size'] = fragment_size
+        if number_of_fragments is not None:
+            options['number_of_fragments'] = number_of_fragments
 
-        results, hits = self._process_results_results_section(distance_point, geo_sort, raw_results, result_class)
+        self.highlight = options or True
 
-        return {
-            'results': results,
-            'hits': hits,
-            'facets': facets,
-            'spelling_suggestion': spelling_suggestion,
-        }
+    def more_like_this(self, model_instance, **options):
+        """Search documents similar to one or several model instances instead of running the query. The query is
+        then used to restrict similar documents.
 
-    @log_query
-    def search(self, query_string, **kwargs):
-        """Do a search in Elasticsearch.
+        :param model_instance: Model instance or list of instances.
+        :param options: Options of the more_like_this query (fields, max_query_terms, min_doc_freq...).
+        """
+        super(ElasticsearchSearchQuery, self).more_like_this(model_instance)
+        self.mlt_options = options
+
+    def run_mlt(self, **kwargs):
+        """Run a more like this search, with every search parameter of the query.
 
-        :param query_string: The string that will be used for querying.
-        :type query_string: str
         :param kwargs: Search parameters.
         :type kwargs: dict
-        :return: Search results.
         """
-        if len(query_string) == 0:
-            return {
-                'results': [],
-                'hits': 0,
+        if self._more_like_this is False or self._mlt_instance is None:
+            raise MoreLikeThisError("No instance was provided to determine 'More Like This' results.")
+
+        final_query, search_kwargs = self.build_search(**kwargs)
+        results = self.backend.more_like_this(self._mlt_instance, final_query, mlt_options=self.mlt_options,
+                                              **search_kwargs)
+        self._results = results.get('results', [])
+        self._hit_count = results.get('hits', 0)
+        self._search_status = self.build_search_status(results)
+
+    def set_ids_only(self, ids_only=True):
+        """Set whether only content type and id of each result are returned, without source.
+
+        :param ids_only: Return only content type and id.
+        :type ids_only: bool
+        """
+        self.ids_only = ids_only
+
+    def set_timeout(self, timeout=None, terminate_after=None, request_timeout=None):
+        """Limit the time and the work spent by the search, connection's defaults are used for those not given.
+
+        :param timeout: Time after which each shard returns the hits collected so far, e.g. '500ms'.
+        :type timeout: str
+        :param terminate_after: Max number of documents collected by each shard.
+        :type terminate_after: int
+        :param request_timeout: Seconds the client waits for the response.
+        :type request_timeout: float
+        """
+        self.search_timeout = timeout
+        self.terminate_after = terminate_after
+        self.request_timeout = request_timeout
+
+    def build_params(self, spelling_query=None, **kwargs):
+        """Build the params that will be passed to backend search.
+
+        :param spelling_query: Query used for spelling suggestion.
+        :type spelling_query: str
+        :return: Search params.
+        :rtype: dict
+        """
+        search_kwargs = super(ElasticsearchSearchQuery, self).build_params(spelling_query, **kwargs)
+
+        if self.query_type:
+            search_kwargs['query_type'] = self.query_type
+
+        main_query = self.build_structured_query()
+        if main_query is not None:
+            search_kwargs['main_query'] = main_query
+
+        if self.source_includes:
+            search_kwargs['source_includes'] = self.source_includes
+
+        if self.source_excludes:
+            search_kwargs['source_excludes'] = self.source_excludes
+
+        if self.stored_fields:
+            search_kwargs['stored_fields'] = self.stored_fields
+
+        if self.ids_only:
+            search_kwargs['ids_only'] = True
+
+        if self.search_timeout is not None:
+            search_kwargs['timeout'] = self.search_timeout
+
+        if self.terminate_after is not None:
+            search_kwargs['terminate_after'] = self.terminate_after
+
+        if self.request_timeout is not None:
+            search_kwargs['request_timeout'] = self.request_timeout
+
+        routing = self.get_routing()
+        if routing:
+            search_kwargs['routing'] = routing
+
+        date_ranges = self.get_date_ranges()
+        if date_ranges:
+            search_kwargs['date_ranges'] = date_ranges
+
+        return search_kwargs
+
+    def build_structured_query(self):
+        """Build the main query from the query filter, when the query type isn't query_string or some filter is
+        sent to prefix subfields. Content filters use the query type over their plain text, startswith filters on
+        prefix indexed fields use prefix or term queries, while any other filter keeps its query_string fragment.
+
+        :return: Query, None if the main query is built from the query string.
+        :rtype: dict
+        """
+        query_type = self.query_type or self.backend.query_type
+        if not self.query_filter.children or \
+                (query_type == 'query_string' and not self.has_prefix_filters(self.query_filter)):
+            return None
+
+        query = self.build_node_query(self.query_filter, query_type) or {'match_all': {}}
+
+        if self.boost:
+            boost_list = [self.boost_fragment(boost_word, boost_value)
+                          for boost_word, boost_value in self.boost.items()]
+            query = {
+                'bool': {
+                    'must': [query],
+                    'should': [self.backend.build_main_query(' '.join(boost_list), 'query_string')],
+                },
             }
 
-        if not self.setup_complete:
-            self.setup()
+        return query
 
-        search_kwargs = self.build_search_kwargs(query_string, **kwargs)
-        search_kwargs['from'] = kwargs.get('start_offset', 0)
+    def build_node_query(self, node, query_type):
+        """Build the query of a node of the query filter.
 
-        order_fields = set()
-        for order in search_kwargs.get('sort', []):
-            for key in order.keys():
-                order_fields.add(key)
+        :param node: Query filter node.
+        :type node: SearchNode
+        :param query_type: Query type used for content filters.
+        :type query_type: str
+        :return: Query, None if the node is empty.
+        :rtype: dict
+        """
+        clauses = []
+        for child in node.children:
+            if isinstance(child, tuple):
+                field, filter_type = node.split_expression(child[0])
+                clause = self.build_filter_query(field, filter_type, child[1], query_type)
+            else:
+                clause = self.build_node_query(child, query_type)
 
-        geo_sort = '_geo_distance' in order_fields
+            if clause:
+                clauses.append(clause)
 
-        end_offset = kwargs.get('end_offset')
-        start_offset = kwargs.get('start_offset', 0)
-        if end_offset is not None and end_offset > start_offset:
-            search_kwargs['size'] = end_offset - start_offset
+        if not clauses:
+            return None
 
-        models = search_kwargs.pop('models', None)
-        doc_type = ','.join(models) if models else ''
+        if len(clauses) == 1:
+            query = clauses[0]
+        elif node.connector == node.OR:
+            query = {'bool': {'should': clauses, 'minimum_should_match': 1}}
+        else:
+            query = {'bool': {'must': clauses}}
 
-        try:
-            raw_results = self.conn.search(body=search_kwargs, index=self.index_name, doc_type=doc_type, _source=True)
-        except elasticsearch.TransportError as e:
-            if not self.silently_fail:
-                raise
+        if node.negated:
+            query = {'bool': {'must_not': [query]}}
+
+        return query
 
-            self.log.error("Failed to query Elasticsearch using '%s': %s", query_string, e)
-            raw_results = {}
+    def build_filter_query(self, field, filter_type, value, query_type):
+        """Build the query of a single filter. Text searched in content, either plain or from auto_query, uses the
+        query type, startswith filters on prefix indexed fields use their prefix subfields, while any other filter
+        uses its query_string fragment.
 
-        return self._process_results(raw_results,
-                                     highlight=kwargs.get('highlight'),
-                                     result_class=kwargs.get('result_class', SearchResult),
-                                     distance_point=kwargs.get('distance_point'), geo_sort=geo_sort)
+        :param field: Field to search.
+        :type field: str
+        :param filter_type: Filter type (contains, gt, lt...)
+        :type filter_type: str
+        :param value: Value to search.
+        :param query_type: Query type used for content filters.
+        :type query_type: str
+        :return: Query.
+        :rtype: dict
+        """
+        prefix_fields = self.get_filter_prefix_fields(field, filter_type, value)
+        if prefix_fields:
+            queries = [self.build_prefix_query(field_name, prefix_index, value)
+                       for field_name, prefix_index in sorted(prefix_fields.items())]
+            if len(queries) == 1:
+                return queries[0]
+            return {'bool': {'should': queries, 'minimum_should_match': 1}}
+
+        if field == 'content' and filter_type == 'contains' and query_type != 'query_string':
+            if isinstance(value, six.string_types):
+                text = value
+            elif getattr(value, 'input_type_name', None) in ('clean', 'auto_query'):
+                text = value.query_string
+            else:
+                text = None
 
-    def more_like_this(self, model_instance, additional_query_string=None,
-                       start_offset=0, end_offset=None, models=None,
-                       limit_to_registered_models=None, result_class=None, **kwargs):
-        """Do a 'more like this' search in Elasticsearch.
+            if text is not None:
+                model_choices = sorted(get_model_ct(model) for model in self.models) if self.models else None
+                return self.backend.build_main_query(text, query_type, model_choices)
 
-        :param model_instance: Model that will be used as a base for 'more like this'.
-        :type model_instance: object
-        :param additional_query_string:
-        :param start_offset: If query is partially done, this parameters will represents where the slice begins.
-        :type start_offset: int
-        :param end_offset: If query is partially done, this parameters will represents where the slice ends.
-        :type end_offset: int
-        :param models: Models to be searched.
-        :type models: list
-        :param limit_to_registered_models:
-        :param result_class: Class used for a result value.
-        :type result_class: object
-        :param kwargs: Search parameters.
-        :type kwargs: dict
-        :return: Search results.
+        return self.backend.build_main_query(self.build_query_fragment(field, filter_type, value), 'query_string')
+
+    def get_routing(self):
+        """Get the routing values of the query, so it's only sent to the shards that can contain its results. They
+        are taken from exact and in filters on the routing field, when every index searched declares the same
+        routing_field and results must match those filters. Plain contains filters, e.g. filter(client=7), count as
+        exact when the routing field isn't analyzed in any index.
+
+        :return: Comma separated routing values, None if the query must be sent to every shard.
+        :rtype: str
         """
-        from haystack import connections
+        unified_index = haystack.connections[self._using].get_unified_index()
+        models = self.models or unified_index.get_indexed_models()
+        routing_fields = set()
+        analyzed = False
 
-        if not self.setup_complete:
-            self.setup()
+        for model in models:
+            try:
+                search_index = unified_index.get_index(model)
+            except NotHandled:
+                return None
+
+            routing_field = getattr(search_index, 'routing_field', None)
+            routing_fields.add(routing_field)
+            if routing_field is not None:
+                field_class = search_index.fields.get(routing_field)
+                analyzed = analyzed or field_class is None or self.backend.is_analyzed(field_class)
+
+        if len(routing_fields) != 1 or None in routing_fields:
+            return None
+
+        values = self.get_routing_values(self.query_filter, routing_fields.pop(), exact_contains=not analyzed)
+        if not values:
+            return None
+
+        return ','.join(sorted(values))
+
+    def get_routing_values(self, node, routing_field, exact_contains=False):
+        """Get the values that the routing field of results must have to match a node of the query filter.
+
+        :param node: Query filter node.
+        :type node: SearchNode
+        :param routing_field: Routing field name.
+        :type routing_field: str
+        :param exact_contains: Whether contains filters of a single term match the whole value, which is the case of
+            fields that aren't analyzed.
+        :type exact_contains: bool
+        :return: Routing values, None if the node doesn't restrict the routing field.
+        :rtype: set
+        """
+        if node.negated:
+            return None
+
+        children_values = []
+        for child in node.children:
+            if isinstance(child, tuple):
+                field, filter_type = node.split_expression(child[0])
+                value = child[1]
+                if field == routing_field and filter_type == 'contains' and exact_contains and \
+                        self.is_single_term(value):
+                    filter_type = 'exact'
+
+                if field != routing_field or filter_type not in ('exact', 'in'):
+                    values = None
+                else:
+                    values = set()
+                    for v in (value if filter_type == 'in' else [value]):
+                        v = v.query_string if isinstance(v, BaseInput) else self.backend._from_python(v)
+                        values.add(six.text_type(v))
+            else:
+                values = self.get_routing_values(child, routing_field, exact_contains)
 
-        # Deferred models will have a different class ("RealClass_Deferred_fieldname")
-        # which won't be in our registry:
-        model_klass = model_instance._meta.concrete_model
+            children_values.append(values)
 
-        index = connections[self.connection_alias].get_unified_index().get_index(model_klass)
-        field_name = index.get_content_field()
-        params = {}
+        if node.connector == node.OR:
+            if not children_values or None in children_values:
+                return None
+            return set().union(*children_values)
 
-        if start_offset is not None:
-            params['search_from'] = start_offset
+        restricted_values = [values for values in children_values if values is not None]
+        if not restricted_values:
+            return None
+        return set.intersection(*restricted_values)
 
-        if end_offset is not None:
-            params['search_size'] = end_offset - start_offset
+    def is_single_term(self, value):
+        """Check if a contains filter value is searched as a single term, so it matches the whole value of fields
+        that aren't analyzed.
 
-        doc_id = get_identifier(model_instance)
+        :param value: Filter value.
+        :rtype: bool
+        """
+        input_type_name = getattr(value, 'input_type_name', None)
+        if input_type_name == 'exact':
+            return True
 
-        try:
-            raw_results = self.conn.mlt(index=self.index_name, doc_type='', id=doc_id, mlt_fields=[field_name],
-                                        **params)
-        except elasticsearch.TransportError as e:
-            if not self.silently_fail:
-                raise
+        if input_type_name not in (None, 'clean', 'python_data'):
+            return False
 
-            self.log.error("Failed to fetch More Like This from Elasticsearch for document '%s': %s", doc_id, e)
-            raw_results = {}
+        raw_value = value.query_string if isinstance(value, BaseInput) else value
+        if isinstance(raw_value, six.string_types):
+            return len(raw_value.split()) == 1
 
-        return self._process_results(raw_results, result_class=result_class)
+        return not isinstance(raw_value, (list, tuple, set))
 
+    def get_date_ranges(self):
+        """Get the date range of results for the rollover field of each index searched, so only the time based
+        indexes within that range are searched. They are taken from range filters on date values, when results
+        must match those filters.
 
-class ElasticsearchSearchQuery(HaystackQuery):
-    """
-    Provides a way to specify search parameters and lazily load results.
+        :return: Start and end dates for each rollover field, None for an open bound.
+        :rtype: dict
+        """
+        if not self.backend.separate_indexes:
+            return {}
+
+        unified_index = haystack.connections[self._using].get_unified_index()
+        rollover_fields = set()
+
+        for model in self.models or unified_index.get_indexed_models():
+            try:
+                rollover_field = getattr(unified_index.get_index(model), 'rollover_field', None)
+            except NotHandled:
+                continue
+
+            if rollover_field is not None:
+                rollover_fields.add(rollover_field)
+
+        date_ranges = {}
+        for rollover_field in rollover_fields:
+            date_range = self.get_date_range(self.query_filter, rollover_field)
+            if date_range is not None:
+                date_ranges[rollover_field] = date_range
+
+        return date_ranges
+
+    def get_date_range(self, node, field_name):
+        """Get the date range that a field of results must be within to match a node of the query filter.
+
+        :param node: Query filter node.
+        :type node: SearchNode
+        :param field_name: Date field name.
+        :type field_name: str
+        :return: Start and end dates, None for an open bound, or None if the node doesn't restrict the field.
+        :rtype: tuple
+        """
+        if node.negated:
+            return None
+
+        children_ranges = []
+        for child in node.children:
+            if isinstance(child, tuple):
+                field, filter_type = node.split_expression(child[0])
+                date_range = None
+                if field == field_name:
+                    value = child[1]
+                    if filter_type in ('gt', 'gte'):
+                        date_range = (value, None)
+                    elif filter_type in ('lt', 'lte'):
+                        date_range = (None, value)
+                    elif filter_type == 'exact':
+                        date_range = (value, value)
+                    elif filter_type == 'range' and len(value) == 2:
+                        date_range = tuple(value)
+
+                if date_range is not None:
+                    # Only date values bound the range, anything else leaves it open.
+                    date_range = tuple(
+                        (v.date() if isinstance(v, datetime.datetime) else v)
+                        if isinstance(v, datetime.date) else None
+                        for v in date_range)
+                    if date_range == (None, None):
+                        date_range = None
+            else:
+                date_range = self.get_date_range(child, field_name)
+
+            children_ranges.append(date_range)
+
+        if node.connector == node.OR:
+            if not children_ranges or None in children_ranges:
+                return None
+            starts = [start for start, end in children_ranges]
+            ends = [end for start, end in children_ranges]
+            return (None if None in starts else min(starts), None if None in ends else max(ends))
+
+        restricted_ranges = [date_range for date_range in children_ranges if date_range is not None]
+        if not restricted_ranges:
+            return None
+        starts = [start for start, end in restricted_ranges if start is not None]
+        ends = [end for start, end in restricted_ranges if end is not None]
+        return (max(starts) if starts else None, min(ends) if ends else None)
+
+    def build_search(self, spelling_query=None, **kwargs):
+        """Build the query string and params that will be passed to backend search.
+
+        :param spelling_query: Query used for spelling suggestion.
+        :type spelling_query: str
+        :return: Query string and search params.
+        :rtype: tuple
+        """
+        search_kwargs = self.build_params(spelling_query, **kwargs)
+
+        if kwargs:
+            search_kwargs.update(kwargs)
+
+        return self.build_query(), search_kwargs
+
+    def set_results(self, results):
+        """Store the results of a search done for this query.
+
+        :param results: Search results returned by backend.
+        :type results: dict
+        """
+        self._results = results.get('results', [])
+        self._hit_count = results.get('hits', 0)
+        self._facet_counts = self.post_process_facets(results)
+        self._spelling_suggestion = results.get('spelling_suggestion', None)
+        self._search_status = self.build_search_status(results)
+
+    def build_search_status(self, results):
+        """Build the status of a search, telling whether its results are partial.
+
+        :param results: Search results returned by backend.
+        :type results: dict
+        :return: timed_out, terminated_early, and shards with total, successful, failed and failures.
+        :rtype: dict
+        """
+        return {
+            'timed_out': results.get('timed_out', False),
+            'terminated_early': results.get('terminated_early', False),
+            'shards': results.get('shards', {}),
+        }
+
+    def get_search_status(self):
+        """Get the status of the search, running the query if it has not been run.
+
+        :return: Search status, see build_search_status.
+        :rtype: dict
+        """
+        if self._search_status is None:
+            self.run()
+
+        return self._search_status
+
+    def _reset(self):
+        super(ElasticsearchSearchQuery, self)._reset()
+        self._search_status = None
+
+    def run(self, spelling_query=None, **kwargs):
+        """Build and execute the query, storing its results.
+
+        :param spelling_query: Query used for spelling suggestion.
+        :type spelling_query: str
+        """
+        final_query, search_kwargs = self.build_search(spelling_query, **kwargs)
+        self.set_results(self.backend.search(final_query, **search_kwargs))
+
+    def aggregate(self, fields, metrics=('stats',), percents=None):
+        """Build the query and compute metrics over numeric fields of its results.
+
+        :param fields: Integer, float or decimal fields.
+        :type fields: list
+        :param metrics: Metrics computed for each field (stats, extended_stats, percentiles or cardinality).
+        :type metrics: list
+        :param percents: Percents computed by percentiles metric.
+        :type percents: list
+        :return: Value of each metric for each field.
+        :rtype: dict
+        """
+        final_query, search_kwargs = self.build_search()
+        return self.backend.aggregate(final_query, fields, metrics=metrics, percents=percents, **search_kwargs)
+
+    def group_search(self, size=5):
+        """Build the query and get the top results of each model in a single search.
+
+        :param size: Number of results of each model.
+        :type size: int
+        :return: Search results and number of hits of each content type.
+        :rtype: OrderedDict
+        """
+        final_query, search_kwargs = self.build_search()
+        return self.backend.group_search(final_query, size=size, **search_kwargs)
+
+    def get_count(self):
+        """Get the number of results. If the query has not been run, the count is requested to the backend without
+        fetching any result.
+
+        :return: Number of results.
+        :rtype: int
+        """
+        if self._hit_count is None and not self._more_like_this and not self._raw_query:
+            final_query, search_kwargs = self.build_search()
+            self._hit_count = self.backend.count(final_query, **search_kwargs)
+
+        return super(ElasticsearchSearchQuery, self).get_count()
+
+    def scan_pages(self, scroll='5m', size=500):
+        """Build the query and iterate over the pages of its results using scroll API. Limits are ignored.
+
+        :param scroll: How long the scroll context is kept alive between pages.
+        :type scroll: str
+        :param size: Number of results fetched in each page.
+        :type size: int
+        :return: Search results of each page.
+        :rtype: generator
+        """
+        final_query, search_kwargs = self.build_search()
+        return self.backend.scan_pages(final_query, scroll=scroll, size=size, **search_kwargs)
+
+    def _clone(self, klass=None, using=None):
+        clone = super(ElasticsearchSearchQuery, self)._clone(klass=klass, using=using)
+        clone.query_type = self.query_type
+        clone.source_includes = self.source_includes
+        clone.source_excludes = self.source_excludes
+        clone.stored_fields = self.stored_fields
+        clone.ids_only = self.ids_only
+        clone._more_like_this = self._more_like_this
+        clone._mlt_instance = self._mlt_instance
+        clone.mlt_options = self.mlt_options.copy()
+        clone.search_timeout = self.search_timeout
+        clone.terminate_after = self.terminate_after
+        clone.request_timeout = self.request_timeout
+        return clone
 
-    This implementation changes how Query fragment is constructed, applying changes related to multi-type.
-    """
     def build_query_fragment(self, field, filter_type, value):
         """Construct the query fragment based on the field that is been search for.
 
@@ -862,13 +3220,121 @@ class ElasticsearchSearchQuery(HaystackQuery):
 
         field_names = set(index_fieldnames.values())
         if field_names:
-            multiple_query_frag = ' OR '.join([u'%s:%s' % (field_name, query_frag) for field_name in field_names])
+            fields_query_frag = [u'%s:%s' % (field_name, query_frag) for field_name in field_names]
+            multiple_query_frag = ' OR '.join(fields_query_frag)
             result = "(%s)" % multiple_query_frag
         else:
             result = query_frag
 
         return result
 
+    def get_prefix_fields(self, index_fieldnames):
+        """Get fields that have a prefix subfield, and its kind. A field is only considered when every index that
+        contains it declares the same prefix_index.
+
+        :param index_fieldnames: Field name for each index.
+        :type index_fieldnames: dict
+        :return: Prefix index kind for each field name.
+        :rtype: dict
+        """
+        prefix_fields = {}
+        discarded_fields = set()
+
+        for class_index, field_name in index_fieldnames.items():
+            field_object = class_index.fields.get(field_name)
+            if field_object is None:
+                # This index doesn't contain the field, so it doesn't take part in the query.
+                continue
+
+            field_mapping = FIELD_MAPPINGS.get(field_object.field_type, DEFAULT_FIELD_MAPPING)
+            prefix_index = getattr(field_object, 'prefix_index', None)
+            if prefix_index is None or field_mapping['type'] != 'string' or \
+                    prefix_fields.get(field_name, prefix_index) != prefix_index:
+                discarded_fields.add(field_name)
+            else:
+                prefix_fields[field_name] = prefix_index
+
+        return {k: v for k, v in prefix_fields.items() if k not in discarded_fields}
+
+    def get_filter_prefix_fields(self, field, filter_type, value):
+        """Get the prefix subfields that a filter can be sent to, which is the case of startswith filters over plain
+        values on fields whose every index field declares the same prefix_index.
+
+        :param field: Field to search.
+        :type field: str
+        :param filter_type: Filter type (contains, gt, lt...)
+        :type filter_type: str
+        :param value: Value to search.
+        :return: Prefix index kind for each field name, empty if the filter doesn't use prefix subfields.
+        :rtype: dict
+        """
+        from haystack import connections
+
+        if filter_type != 'startswith' or field == 'content' or \
+                getattr(value, 'input_type_name', None) not in (None, 'clean', 'python_data'):
+            return {}
+
+        index_fieldnames = connections[self._using].get_unified_index().get_index_fieldname(field)
+        prefix_fields = self.get_prefix_fields(index_fieldnames)
+        if not prefix_fields or set(prefix_fields) != set(index_fieldnames.values()):
+            return {}
+
+        return prefix_fields
+
+    def has_prefix_filters(self, node):
+        """Check if any filter of a node of the query filter is sent to prefix subfields.
+
+        :param node: Query filter node.
+        :type node: SearchNode
+        :rtype: bool
+        """
+        for child in node.children:
+            if isinstance(child, tuple):
+                field, filter_type = node.split_expression(child[0])
+                if self.get_filter_prefix_fields(field, filter_type, child[1]):
+                    return True
+            elif self.has_prefix_filters(child):
+                return True
+
+        return False
+
+    def build_prefix_query(self, field_name, prefix_index, value):
+        """Build a startswith query against the prefix subfield of a field, so it's not analyzed nor parsed. Keyword
+        subfields use a prefix query over the whole lowercased value and edge ngram subfields a term query for each
+        word, matching nothing if the value has no word.
+
+        :param field_name: Field name.
+        :type field_name: str
+        :param prefix_index: Kind of prefix subfield (keyword or edge_ngram).
+        :type prefix_index: str
+        :param value: Value to search.
+        :return: Query.
+        :rtype: dict
+        """
+        if isinstance(value, BaseInput):
+            value = value.query_string
+
+        if isinstance(value, bool):
+            value = six.text_type(value).lower()
+        else:
+            value = six.text_type(self.backend._from_python(value)).lower()
+
+        subfield_name = u'%s.%s' % (field_name, PREFIX_SUBFIELD)
+
+        if prefix_index == 'keyword':
+            return {'prefix': {subfield_name: value}}
+
+        # Indexed grams are at most max_gram long, so longer words are matched by their longest gram.
+        max_gram = PREFIX_ANALYSIS['filter']['prefix_edgengram']['max_gram']
+        terms = [{'term': {subfield_name: word[:max_gram]}} for word in re.findall(r'\w+', value, re.UNICODE)]
+        if not terms:
+            # Values without words have no grams, so no document can start with them.
+            return {'bool': {'must_not': {'match_all': {}}}}
+        if len(terms) == 1:
+            return terms[0]
+
+        return {'bool': {'must': terms}}
+
 
 class ElasticsearchSearchEngine(HaystackEngine):
     backend = ElasticsearchSearchBackend
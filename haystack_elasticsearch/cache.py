@@ -0,0 +1,221 @@
+from __future__ import unicode_literals
+
+import abc
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils import six
+
+try:
+    from django.core.cache import caches
+
+    def get_cache(alias):
+        return caches[alias]
+except ImportError:
+    from django.core.cache import get_cache
+
+# Generation names that are not doc types.
+ALL_GENERATION = '*'
+ANY_TYPE_GENERATION = ''
+
+# Timeout for generation counters stored in Django cache, long enough to outlive any entry.
+GENERATION_TIMEOUT = 60 * 60 * 24 * 30
+
+
+class BaseResultCache(six.with_metaclass(abc.ABCMeta)):
+    """Cache for search responses, keyed on the normalized search body, doc types and params.
+
+    Invalidation is done by keeping a generation counter per doc type that is part of each key, so entries of a
+    doc type become unreachable when a write touches it, and they are evicted later by the underlying cache.
+    Subclasses implement storage of entries and generations.
+
+    :param timeout: Seconds that an entry lives.
+    :type timeout: int
+    :param key_prefix: Prefix used for all keys.
+    :type key_prefix: str
+    """
+    def __init__(self, timeout=60, key_prefix='haystack_elasticsearch'):
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Get a cached value.
+
+        :param key: Key.
+        :type key: str
+        :return: Value or None if it's not cached.
+        """
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """Cache a value.
+
+        :param key: Key.
+        :type key: str
+        :param value: Value.
+        """
+
+    @abc.abstractmethod
+    def get_generation(self, name):
+        """Get current generation of a doc type.
+
+        :param name: Doc type or generation name.
+        :type name: str
+        :return: Generation.
+        :rtype: int
+        """
+
+    @abc.abstractmethod
+    def incr_generation(self, name):
+        """Increment the generation of a doc type.
+
+        :param name: Doc type or generation name.
+        :type name: str
+        """
+
+    def make_key(self, kind, body, doc_type, **params):
+        """Build the key of a request.
+
+        :param kind: Kind of request (search, count...).
+        :type kind: str
+        :param body: Request body.
+        :type body: dict
+        :param doc_type: Comma separated doc types, empty for all types.
+        :type doc_type: str
+        :param params: Additional request params.
+        :type params: dict
+        :return: Key.
+        :rtype: str
+        """
+        doc_types = [t for t in doc_type.split(',') if t] if doc_type else []
+        generations = [self.get_generation(name) for name in [ALL_GENERATION] + (doc_types or [ANY_TYPE_GENERATION])]
+        raw_key = json.dumps([kind, body, doc_types, params, generations], sort_keys=True, default=six.text_type)
+        return '%s:%s' % (self.key_prefix, hashlib.md5(raw_key.encode('utf-8')).hexdigest())
+
+    def invalidate(self, doc_types=None):
+        """Invalidate entries of given doc types. Searches over all types are invalidated too.
+
+        :param doc_types: Doc types, all entries are invalidated if None or it contains '*'.
+        :type doc_types: list
+        """
+        if doc_types is None or ALL_GENERATION in doc_types:
+            self.incr_generation(ALL_GENERATION)
+        else:
+            for doc_type in doc_types:
+                self.incr_generation(doc_type)
+            self.incr_generation(ANY_TYPE_GENERATION)
+
+
+class LocalResultCache(BaseResultCache):
+    """In-process result cache with LRU and TTL eviction.
+
+    Generations are only incremented by writes of the current process, so with several processes, entries may be
+    stale for up to the timeout. Use DjangoResultCache with a shared cache in that case.
+
+    :param max_entries: Max number of entries.
+    :type max_entries: int
+    """
+    def __init__(self, max_entries=1000, **kwargs):
+        super(LocalResultCache, self).__init__(**kwargs)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._entries.pop(key)
+            except KeyError:
+                return None
+
+            if expires < time.time():
+                return None
+
+            # Reinsert it so it becomes the most recently used.
+            self._entries[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.timeout, value)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_generation(self, name):
+        return self._generations.get(name, 0)
+
+    def incr_generation(self, name):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+
+class DjangoResultCache(BaseResultCache):
+    """Result cache stored in one of Django's caches.
+
+    :param cache_alias: Django cache alias.
+    :type cache_alias: str
+    """
+    def __init__(self, cache_alias='default', **kwargs):
+        super(DjangoResultCache, self).__init__(**kwargs)
+        self.cache = get_cache(cache_alias)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def _generation_key(self, name):
+        return '%s:generation:%s' % (self.key_prefix, name)
+
+    def get_generation(self, name):
+        key = self._generation_key(name)
+        generation = self.cache.get(key)
+
+        if generation is None:
+            # Start from current time, so entries of an evicted generation can't be reached again.
+            generation = int(time.time() * 1000)
+            if not self.cache.add(key, generation, GENERATION_TIMEOUT):
+                generation = self.cache.get(key, generation)
+
+        return generation
+
+    def incr_generation(self, name):
+        key = self._generation_key(name)
+
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, int(time.time() * 1000), GENERATION_TIMEOUT)
+
+
+def get_result_cache(options, key_prefix='haystack_elasticsearch'):
+    """Build a result cache from connection options.
+
+    :param options: RESULT_CACHE connection option. A Django cache is used if it contains CACHE, otherwise an
+    in-process cache limited to MAX_ENTRIES. TIMEOUT sets the seconds that an entry lives.
+    :type options: dict
+    :param key_prefix: Prefix used for all keys.
+    :type key_prefix: str
+    :return: Result cache or None if options are empty.
+    :rtype: BaseResultCache
+    """
+    if not options:
+        return None
+
+    kwargs = {
+        'timeout': options.get('TIMEOUT', 60),
+        'key_prefix': key_prefix,
+    }
+
+    if 'CACHE' in options:
+        return DjangoResultCache(cache_alias=options['CACHE'], **kwargs)
+
+    return LocalResultCache(max_entries=options.get('MAX_ENTRIES', 1000), **kwargs)
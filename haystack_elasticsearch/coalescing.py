@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+
+import sys
+import threading
+
+from django.utils import six
+
+
+class Call(object):
+    """A call in flight, whose result or error is shared with every caller waiting for it.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls identified by the same key, so only one of them is executed and the rest of
+    callers wait for it and get the same result. Calls done after it finishes are executed again.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Execute a function unless there is a call in flight with the same key, in that case wait for it.
+
+        :param key: Key that identifies the call.
+        :type key: str
+        :param func: Function to call.
+        :type func: callable
+        :return: Function result.
+        :raise: Any exception raised by the function.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                six.reraise(*call.error)
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
@@ -10,14 +10,24 @@ from haystack.fields import (CharField as BaseCharField,
                              DateField as BaseDateField,
                              DateTimeField as BaseDateTimeField,
                              MultiValueField as BaseMultiValueField,
-                             FacetField as BaseFacetField)
+                             FacetField as BaseFacetField,
+                             SearchField as BaseSearchField)
+
+# Kinds of subfield that can be added to speed up startswith filters.
+PREFIX_INDEX_CHOICES = ('keyword', 'edge_ngram')
 
 
 class ConfigurableFieldMixin(object):
     """
     A mixin which allows custom settings on a per field basis.
     """
-    def __init__(self, **kwargs):
+    def __init__(self, prefix_index=None, **kwargs):
+        if prefix_index is not None and prefix_index not in PREFIX_INDEX_CHOICES:
+            raise SearchFieldError("Invalid prefix_index '{}', choices are: {}".format(
+                prefix_index, ', '.join(PREFIX_INDEX_CHOICES)))
+
+        self.prefix_index = prefix_index
+
         super(ConfigurableFieldMixin, self).__init__(**kwargs)
 
 
@@ -84,6 +94,24 @@ class FacetField(ElasticField, BaseFacetField):
     pass
 
 
+class CompletionField(ElasticField, BaseSearchField):
+    """
+    Field indexed for the completion suggester, used for autocomplete through the backend suggest API. Its value is
+    the input (a string or a list of strings) or a dict with input, output, payload, weight and context keys.
+    """
+    field_type = 'completion'
+
+    def __init__(self, analyzer=None, search_analyzer=None, payloads=False, context=None, max_input_length=None,
+                 **kwargs):
+        self.analyzer = analyzer
+        self.search_analyzer = search_analyzer
+        self.payloads = payloads
+        self.context = context
+        self.max_input_length = max_input_length
+
+        super(CompletionField, self).__init__(**kwargs)
+
+
 class BaseFacetCharField(ElasticCharField, BaseFacetField):
     pass
 
@@ -1,20 +1,26 @@
 import copy
 import inspect
+from collections import namedtuple
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.datastructures import SortedDict
 from haystack.exceptions import SearchFieldError, NotHandled
+from haystack.utils import get_model_ct
 from haystack_elasticsearch import utils
 from haystack_elasticsearch.decorators import AutoBuild
 
 
+ContentType = namedtuple('ContentType', ['app_label', 'model_name', 'model', 'index', 'fields'])
+
+
 class ClassIndex(object):
     def __init__(self, index):
         self.index = index
         self.fields = SortedDict()
         self._built = False
         self.document_field = getattr(settings, 'HAYSTACK_DOCUMENT_FIELD', 'text')
+        self.routing_field = getattr(index, 'routing_field', None)
         self._fieldnames = {}
         self._facet_fieldnames = {}
 
@@ -41,6 +47,9 @@ class ClassIndex(object):
         :return: Indexes.
         :rtype: list
         """
+        if self.routing_field is not None and self.routing_field not in self.index.fields:
+            raise SearchFieldError("Routing field '%s' is not a field of '%s'." % (self.routing_field, self.index))
+
         for fieldname, field_object in self.index.fields.items():
             if field_object.document is True:
                 if field_object.index_fieldname != self.document_field:
@@ -151,6 +160,7 @@ class UnifiedIndex(object):
         self._built = False
         self.excluded_indexes = excluded_indexes or []
         self.excluded_indexes_ids = {}
+        self._content_types = None
 
     def collect_indexes(self):
         """Collect indexes from all your applications.
@@ -181,6 +191,7 @@ class UnifiedIndex(object):
         """
         self.indexes = {}
         self._built = False
+        self._content_types = None
 
     def build(self, indexes=None):
         """Build an Unified Index.
@@ -217,7 +228,7 @@ class UnifiedIndex(object):
         :return: Indexed models.
         :rtype: list
         """
-        return self.indexes.keys()
+        return list(self.indexes.keys())
 
     @AutoBuild
     def get_index(self, model_klass):
@@ -251,4 +262,31 @@ class UnifiedIndex(object):
         :return: All fields.
         :rtype: dict
         """
-        return {index.index: index.fields for index in self.indexes.itervalues()}
\ No newline at end of file
+        return {index.index: index.fields for index in self.indexes.values()}
+
+    @AutoBuild
+    def get_content_type_table(self):
+        """Gets a table that associates each content type with its model, its index and the fields of the index by
+        index field name, so search results can be processed with a single lookup for each hit. The table is built
+        once and discarded when the unified index is reset.
+
+        :return: Content type for each content type string.
+        :rtype: dict
+        """
+        if self._content_types is None:
+            content_types = {}
+
+            for model, class_index in self.indexes.items():
+                index = class_index.index
+                fields = {}
+                for field_name, field_object in index.fields.items():
+                    if field_name == field_object.index_fieldname or field_object.index_fieldname not in fields:
+                        fields[field_object.index_fieldname] = field_object
+
+                content_type = get_model_ct(model)
+                app_label, model_name = content_type.split('.')
+                content_types[content_type] = ContentType(app_label, model_name, model, index, fields)
+
+            self._content_types = content_types
+
+        return self._content_types
@@ -0,0 +1,31 @@
+from optparse import make_option
+
+from haystack import connections
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+     Deletes the time based indexes older than the rollover_retention of their search index. Intended to be run
+     periodically, e.g. daily from cron.
+
+     >> python manage.py expire_rolling_indexes --using=default
+
+     >> Deleted index: haystack_logs-2015.01
+    """
+    help = "Deletes the time based indexes older than the retention of their search index. " \
+           "Usage: python manage.py expire_rolling_indexes [--using=<alias>]"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--using',
+                    action='store',
+                    dest='using',
+                    default='default',
+                    help='The Haystack backend to use'))
+
+    def handle(self, *args, **options):
+        backend = connections[options.get('using')].get_backend()
+
+        for index_name in backend.expire_rollover_indexes():
+            self.stdout.write("Deleted index: {}".format(index_name))
@@ -0,0 +1,321 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from haystack import connections
+from haystack.constants import DEFAULT_ALIAS
+from haystack.exceptions import NotHandled
+from haystack.query import SearchQuerySet
+
+
+def load_model_objects(model, pks, using=DEFAULT_ALIAS):
+    """Load the objects of a model in bulk. The queryset is built from index read_queryset, applying select_related
+    and prefetch_related attributes of the index if declared.
+
+    :param model: Model.
+    :param pks: Primary keys of the objects.
+    :type pks: list
+    :param using: Haystack connection alias.
+    :type using: str
+    :return: Objects by primary key.
+    :rtype: dict
+    """
+    try:
+        index = connections[using].get_unified_index().get_index(model)
+        queryset = index.read_queryset(using=using)
+    except NotHandled:
+        index = None
+        queryset = model._default_manager.all()
+
+    select_related = getattr(index, 'select_related', None)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+
+    prefetch_related = getattr(index, 'prefetch_related', None)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+
+    return queryset.in_bulk(list(pks))
+
+
+def hydrate_results(results, using=DEFAULT_ALIAS):
+    """Load the objects of several search results, with one query for each model, see load_model_objects. Results
+    keep their order and those whose object doesn't exist anymore are discarded.
+
+    :param results: Search results.
+    :type results: list
+    :param using: Haystack connection alias.
+    :type using: str
+    :return: Search results with their object loaded.
+    :rtype: list
+    """
+    pks_by_model = OrderedDict()
+
+    for result in results:
+        pks_by_model.setdefault(result.model, set()).add(result.model._meta.pk.to_python(result.pk))
+
+    objects_by_model = {model: load_model_objects(model, pks, using=using) for model, pks in pks_by_model.items()}
+
+    hydrated_results = []
+    for result in results:
+        obj = objects_by_model[result.model].get(result.model._meta.pk.to_python(result.pk))
+        if obj is not None:
+            result._object = obj
+            hydrated_results.append(result)
+
+    return hydrated_results
+
+
+def multi_search(searchquerysets, start=0, end=None):
+    """Evaluate several SearchQuerySets in a single round trip, using Elasticsearch multi search API. Results of
+    each SearchQuerySet are cached, so getting its count, its facets or its slice from start to end doesn't query
+    the backend again. More like this and raw queries are left to be evaluated lazily as usual.
+
+    :param searchquerysets: SearchQuerySets to evaluate.
+    :type searchquerysets: list
+    :param start: First result fetched for each SearchQuerySet.
+    :type start: int
+    :param end: Last result fetched for each SearchQuerySet, backend's default size is used if None.
+    :type end: int
+    :return: Evaluated SearchQuerySets.
+    :rtype: list
+    """
+    searchquerysets_by_backend = OrderedDict()
+
+    for searchqueryset in searchquerysets:
+        query = searchqueryset.query
+        if query._more_like_this or query._raw_query:
+            continue
+
+        query._reset()
+        query.set_limits(start, end)
+        searchquerysets_by_backend.setdefault(query._using, []).append(searchqueryset)
+
+    for group in searchquerysets_by_backend.values():
+        backend = group[0].query.backend
+        results = backend.multi_search([searchqueryset.query.build_search() for searchqueryset in group])
+
+        for searchqueryset, searchqueryset_results in zip(group, results):
+            searchqueryset.query.set_results(searchqueryset_results)
+
+            # Fill the SearchQuerySet result cache, as _fill_cache does.
+            searchqueryset._result_count = None
+            searchqueryset._ignored_result_count = 0
+            searchqueryset._result_cache = [None for i in range(searchqueryset.query.get_count())]
+            to_cache = searchqueryset.post_process_results(searchqueryset.query.get_results())
+            searchqueryset._result_cache[start:start + len(to_cache)] = to_cache
+
+    return searchquerysets
+
+
+class ElasticsearchSearchQuerySet(SearchQuerySet):
+    """
+    Extends the Haystack SearchQuerySet to expose ElasticSearch specific features of the search query.
+    """
+    def query_type(self, query_type):
+        """Select the main query type used for free-text search.
+
+        :param query_type: Query type (query_string, simple_query_string, multi_match or match).
+        :type query_type: str
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.set_query_type(query_type)
+        return clone
+
+    def source(self, includes=None, excludes=None):
+        """Return only some fields of the source of each result, so big fields aren't fetched and converted when
+        they are not needed. Fields not returned are None in results.
+
+        :param includes: Fields returned, whole source if empty.
+        :type includes: list
+        :param excludes: Fields not returned.
+        :type excludes: list
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.set_source(includes, excludes)
+        return clone
+
+    def stored_fields(self, *fields):
+        """Return only some stored fields of each result instead of its source.
+
+        :param fields: Stored fields.
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.set_stored_fields(fields)
+        return clone
+
+    def highlight(self, *fields, **kwargs):
+        """Add highlighting to the results.
+
+        :param fields: Fields highlighted, document field if empty.
+        :param kwargs: fragment_size and number_of_fragments.
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.add_highlight(fields, **kwargs)
+        return clone
+
+    def ids_only(self):
+        """Return only content type and id of each result, without source. Intended to be used with load_all, so
+        objects are loaded from database in bulk.
+
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.set_ids_only()
+        return clone
+
+    def timeout(self, timeout=None, terminate_after=None, request_timeout=None):
+        """Limit the time and the work spent by the search, so a slow query returns partial results instead of
+        holding the request. Connection's SEARCH_TIMEOUT, TERMINATE_AFTER and REQUEST_TIMEOUT are used for those not
+        given. Use search_status to know whether results are partial.
+
+        :param timeout: Time after which each shard returns the hits collected so far, e.g. '500ms'.
+        :type timeout: str
+        :param terminate_after: Max number of documents collected by each shard.
+        :type terminate_after: int
+        :param request_timeout: Seconds the client waits for the response.
+        :type request_timeout: float
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.set_timeout(timeout, terminate_after, request_timeout)
+        return clone
+
+    def search_status(self):
+        """Get whether results are partial, because the search timed out, terminated early or some shards failed.
+        Runs the query if it has not been run.
+
+        :return: timed_out, terminated_early, and shards with total, successful, failed and failures.
+        :rtype: dict
+        """
+        if self.query.has_run():
+            return self.query.get_search_status()
+
+        clone = self._clone()
+        return clone.query.get_search_status()
+
+    def more_like_this(self, *model_instances, **options):
+        """Find documents similar to one or several model instances. Filters, models and ordering of the
+        SearchQuerySet restrict similar documents.
+
+        :param model_instances: Model instances used as seed documents.
+        :param options: Options of the more_like_this query (fields, max_query_terms, min_term_freq, min_doc_freq,
+            max_doc_freq, min_word_length, max_word_length, stop_words, minimum_should_match, boost_terms, include).
+        :return: SearchQuerySet.
+        :rtype: ElasticsearchSearchQuerySet
+        """
+        clone = self._clone()
+        clone.query.more_like_this(list(model_instances), **options)
+        return clone
+
+    def _load_model_objects(self, model, pks):
+        """Load the objects of a model for load_all, applying select_related and prefetch_related of its index. It's
+        the hook of Haystack 2.5+ post_process_results.
+
+        :param model: Model.
+        :param pks: Primary keys of the objects.
+        :type pks: list
+        :return: Objects by primary key.
+        :rtype: dict
+        """
+        return load_model_objects(model, pks, using=self.query._using)
+
+    def post_process_results(self, results):
+        """Load objects of results in bulk if load_all is used.
+
+        :param results: Search results.
+        :type results: list
+        :return: Search results.
+        :rtype: list
+        """
+        if not self._load_all or hasattr(SearchQuerySet, '_load_model_objects'):
+            return super(ElasticsearchSearchQuerySet, self).post_process_results(results)
+
+        # Haystack < 2.5 loads objects without a hook for each model.
+        to_cache = hydrate_results(results, using=self.query._using)
+        self._ignored_result_count += len(results) - len(to_cache)
+        return to_cache
+
+    def aggregate(self, *fields, **kwargs):
+        """Compute metrics over integer, float or decimal fields of every result, in Elasticsearch.
+
+        :param fields: Numeric fields.
+        :param kwargs: metrics (stats by default, extended_stats, percentiles or cardinality) and percents.
+        :return: Value of each metric for each field, e.g. {'amount': {'stats': {'min': 1.0, 'max': 3.0, ...}}}.
+        :rtype: dict
+        """
+        return self.query.aggregate(fields, **kwargs)
+
+    def group_by_model(self, size=5):
+        """Get the top results of each model in a single round trip, instead of one search per model. Objects are
+        loaded in bulk if load_all is used.
+
+        :param size: Number of results of each model.
+        :type size: int
+        :return: Search results of each content type, by descending number of hits.
+        :rtype: OrderedDict
+        """
+        groups = OrderedDict()
+
+        for content_type, group in self.query.group_search(size=size).items():
+            groups[content_type] = self.post_process_results(group['results'])
+
+        return groups
+
+    def suggest(self, text, field, size=5, context=None, fuzzy=None):
+        """Get completions of a text from a completion field, without running any search. Filters of the
+        SearchQuerySet don't apply, use context to restrict completions.
+
+        :param text: Text to complete.
+        :type text: str
+        :param field: Completion field.
+        :type field: str
+        :param size: Max number of completions.
+        :type size: int
+        :param context: Context values used to filter completions.
+        :type context: dict
+        :param fuzzy: Fuzzy options, or True for the default ones.
+        :type fuzzy: dict
+        :return: Completions, each one with text, score and payload if any.
+        :rtype: list
+        """
+        return self.query.backend.suggest(text, field, size=size, context=context, fuzzy=fuzzy)
+
+    def multi_search(self, *searchquerysets, **kwargs):
+        """Evaluate this SearchQuerySet together with others in a single round trip.
+
+        :param searchquerysets: Other SearchQuerySets to evaluate.
+        :param kwargs: start and end of results fetched for each SearchQuerySet.
+        :return: Evaluated SearchQuerySets, this one first.
+        :rtype: list
+        """
+        return multi_search([self] + list(searchquerysets), **kwargs)
+
+    def scan(self, scroll='5m', size=500):
+        """Iterate over every result lazily using scroll API, in constant memory. Results aren't cached and slicing
+        is ignored. Objects are loaded one page at a time if load_all is used.
+
+        :param scroll: How long the scroll context is kept alive between pages.
+        :type scroll: str
+        :param size: Number of results fetched in each page.
+        :type size: int
+        :return: Search results.
+        :rtype: generator
+        """
+        pages = self.query.scan_pages(scroll=scroll, size=size)
+        try:
+            for results in pages:
+                for result in self.post_process_results(results):
+                    yield result
+        finally:
+            pages.close()
@@ -0,0 +1,324 @@
+from __future__ import unicode_literals
+
+import logging
+import sys
+import threading
+import time
+from collections import deque
+
+from django.utils import six
+from django.utils.six.moves import queue
+from haystack.exceptions import MissingDependency
+
+try:
+    import elasticsearch
+except ImportError:
+    raise MissingDependency(
+        "The 'elasticsearch' backend requires the installation of 'elasticsearch'. Please refer to the documentation.")
+
+logger = logging.getLogger(__name__)
+
+# States of a circuit breaker.
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(elasticsearch.ConnectionError):
+    """Raised instead of sending a request while the circuit breaker is open. It's a connection error, so backend
+    calls handle it as any other failure, honouring SILENTLY_FAIL.
+    """
+
+
+def is_failure(error):
+    """Check if an error means that the cluster is unhealthy, rather than the request being wrong.
+
+    :param error: Exception raised by a call.
+    :type error: Exception
+    :rtype: bool
+    """
+    if isinstance(error, elasticsearch.ConnectionError):
+        return True
+
+    status_code = getattr(error, 'status_code', None)
+    return isinstance(error, elasticsearch.TransportError) and isinstance(status_code, six.integer_types) and \
+        (status_code >= 500 or status_code == 429)
+
+
+class CircuitBreaker(object):
+    """Stops sending requests to Elasticsearch while too many of the recent ones failed or were slow, so callers fail
+    fast instead of piling up on an unhealthy cluster. After open_timeout, a single probe call is let through: the
+    circuit closes if it succeeds quickly, and opens again otherwise.
+
+    :param failure_rate: Rate of failed calls within the window that opens the circuit.
+    :type failure_rate: float
+    :param slow_call_duration: Seconds after which a call is slow, calls are never slow if None.
+    :type slow_call_duration: float
+    :param slow_call_rate: Rate of slow calls within the window that opens the circuit.
+    :type slow_call_rate: float
+    :param window_size: Number of recent calls considered.
+    :type window_size: int
+    :param minimum_calls: Min number of calls in the window before the circuit can open.
+    :type minimum_calls: int
+    :param open_timeout: Seconds the circuit stays open before letting a probe call through.
+    :type open_timeout: float
+    """
+    def __init__(self, failure_rate=0.5, slow_call_duration=None, slow_call_rate=1.0, window_size=20,
+                 minimum_calls=10, open_timeout=30):
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.open_timeout = open_timeout
+
+        self.state = CLOSED
+        self._calls = deque(maxlen=window_size)
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """Execute a function unless the circuit is open.
+
+        :param func: Function to call.
+        :type func: callable
+        :return: Function result.
+        :raise: CircuitOpenError if the circuit is open, or any exception raised by the function.
+        """
+        probe = self.before_call()
+        start = time.time()
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record(probe, is_failure(e), time.time() - start)
+            raise
+
+        self.record(probe, False, time.time() - start)
+        return result
+
+    def before_call(self):
+        """Check that a call can be done, moving from open to half open state once open_timeout has elapsed.
+
+        :return: Whether the call is the probe of half open state.
+        :rtype: bool
+        :raise: CircuitOpenError if the circuit is open, or half open with a probe in flight.
+        """
+        with self._lock:
+            if self.state == OPEN and time.time() - self._opened_at >= self.open_timeout:
+                self.state = HALF_OPEN
+
+            if self.state == CLOSED:
+                return False
+
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+        raise CircuitOpenError('N/A', 'Circuit breaker is open', None)
+
+    def record(self, probe, failed, duration):
+        """Record the outcome of a call, opening or closing the circuit if needed.
+
+        :param probe: Whether the call was the probe of half open state.
+        :type probe: bool
+        :param failed: Whether the call failed.
+        :type failed: bool
+        :param duration: Seconds the call took.
+        :type duration: float
+        """
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+
+        with self._lock:
+            if probe:
+                self._probing = False
+                if failed or slow:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info("Circuit breaker closed")
+                return
+
+            if self.state != CLOSED:
+                return
+
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.minimum_calls:
+                return
+
+            failures = sum(1 for f, s in self._calls if f)
+            slow_calls = sum(1 for f, s in self._calls if s)
+            if failures >= self.failure_rate * len(self._calls) or \
+                    (self.slow_call_duration is not None and slow_calls >= self.slow_call_rate * len(self._calls)):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.time()
+        self._calls.clear()
+        logger.warning("Circuit breaker opened for %s seconds", self.open_timeout)
+
+
+class HedgedCall(object):
+    """Sends a duplicate request when the first one takes longer than usual, returning whichever response comes
+    first, so a single slow node doesn't delay the caller. The delay is a percentile of the latency of recent first
+    requests.
+
+    Requests run in a pool of at most max_workers threads, so abandoned requests are bounded too. When every worker
+    is busy, the request runs in the calling thread and isn't hedged.
+
+    :param delay: Seconds before sending the duplicate until enough latencies are known, never sent if None.
+    :type delay: float
+    :param percentile: Percentile of recent latencies used as delay.
+    :type percentile: float
+    :param min_samples: Min number of recent latencies before the percentile is used.
+    :type min_samples: int
+    :param window_size: Number of recent latencies kept.
+    :type window_size: int
+    :param max_workers: Max number of threads running requests.
+    :type max_workers: int
+    """
+    def __init__(self, delay=None, percentile=95, min_samples=20, window_size=100, max_workers=10):
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._latencies = deque(maxlen=window_size)
+        self._tasks = queue.Queue()
+        self._workers = 0
+        self._idle_workers = 0
+        self._lock = threading.Lock()
+
+    def get_delay(self):
+        """Get the seconds to wait before sending the duplicate request.
+
+        :return: Percentile of recent latencies, or default delay.
+        :rtype: float
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+        if len(latencies) < self.min_samples:
+            return self.delay
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100.0))]
+
+    def do(self, func, hedge_func):
+        """Execute a function, and another one if the first hasn't returned after the delay. The first result is
+        returned, an error is raised only if every call fails.
+
+        :param func: Function to call.
+        :type func: callable
+        :param hedge_func: Function called as duplicate, e.g. the same request with another preference.
+        :type hedge_func: callable
+        :return: Result of the first call to return.
+        :raise: Exception raised by the last call to fail.
+        """
+        delay = self.get_delay()
+        outcomes = queue.Queue()
+
+        if delay is None or not self._submit(lambda: self._call_primary(func), outcomes):
+            return self._call_primary(func)
+
+        pending = 1
+        try:
+            result, error = outcomes.get(timeout=delay)
+        except queue.Empty:
+            if self._submit(hedge_func, outcomes):
+                pending += 1
+            result, error = outcomes.get()
+
+        if error is not None and pending > 1:
+            # The other call may still succeed.
+            result, error = outcomes.get()
+
+        if error is not None:
+            six.reraise(*error)
+
+        return result
+
+    def add_latency(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _call_primary(self, func):
+        # Only first requests are measured, hedges returning earlier would lower the delay.
+        start = time.time()
+        result = func()
+        self.add_latency(time.time() - start)
+        return result
+
+    def _submit(self, func, outcomes):
+        """Run a function in a worker thread, starting one if none is idle.
+
+        :return: Whether a worker runs the function, False if every worker is busy.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._idle_workers:
+                self._idle_workers -= 1
+            elif self._workers < self.max_workers:
+                self._workers += 1
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+            else:
+                return False
+
+        self._tasks.put((func, outcomes))
+        return True
+
+    def _work(self):
+        while True:
+            func, outcomes = self._tasks.get()
+            try:
+                outcomes.put((func(), None))
+            except Exception:
+                outcomes.put((None, sys.exc_info()))
+
+            with self._lock:
+                self._idle_workers += 1
+
+
+def get_circuit_breaker(options, writes=False):
+    """Build a circuit breaker from connection options.
+
+    :param options: CIRCUIT_BREAKER connection option, with FAILURE_RATE, SLOW_CALL_DURATION,
+        WRITE_SLOW_CALL_DURATION, SLOW_CALL_RATE, WINDOW_SIZE, MINIMUM_CALLS and OPEN_TIMEOUT.
+    :type options: dict
+    :param writes: Build the breaker of write requests, whose calls are slow after WRITE_SLOW_CALL_DURATION.
+    :type writes: bool
+    :return: Circuit breaker or None if options are empty.
+    :rtype: CircuitBreaker
+    """
+    if not options:
+        return None
+
+    return CircuitBreaker(failure_rate=options.get('FAILURE_RATE', 0.5),
+                          slow_call_duration=options.get('WRITE_SLOW_CALL_DURATION' if writes else
+                                                         'SLOW_CALL_DURATION'),
+                          slow_call_rate=options.get('SLOW_CALL_RATE', 1.0),
+                          window_size=options.get('WINDOW_SIZE', 20),
+                          minimum_calls=options.get('MINIMUM_CALLS', 10),
+                          open_timeout=options.get('OPEN_TIMEOUT', 30))
+
+
+def get_hedged_call(options):
+    """Build hedged calls from connection options.
+
+    :param options: HEDGED_SEARCHES connection option, with DELAY, PERCENTILE, MIN_SAMPLES, WINDOW_SIZE and
+        MAX_WORKERS.
+    :type options: dict
+    :return: Hedged calls or None if options are empty.
+    :rtype: HedgedCall
+    """
+    if not options:
+        return None
+
+    return HedgedCall(delay=options.get('DELAY'),
+                      percentile=options.get('PERCENTILE', 95),
+                      min_samples=options.get('MIN_SAMPLES', 20),
+                      window_size=options.get('WINDOW_SIZE', 100),
+                      max_workers=options.get('MAX_WORKERS', 10))
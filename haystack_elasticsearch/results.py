@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+from haystack.models import SearchResult
+
+
+class LazySearchResult(SearchResult):
+    """Search result that keeps the raw values returned by Elasticsearch and converts each field the first time it's
+    accessed, memoizing the value. Intended for big pages where only a few fields of each result are read. Use it
+    through result_class, e.g. SearchQuerySet().result_class(LazySearchResult).
+    """
+    # Tells the backend to pass raw values and field objects instead of converted values.
+    lazy_fields = True
+
+    def __init__(self, app_label, model_name, pk, score, _raw_fields=None, _fields=None, _to_python=None, **kwargs):
+        super(LazySearchResult, self).__init__(app_label, model_name, pk, score, **kwargs)
+        self._fields = _fields or {}
+        self._to_python = _to_python
+        self._raw_fields = {}
+
+        for key, value in (_raw_fields or {}).items():
+            if key not in self.__dict__:
+                self._raw_fields[key] = value
+                self._additional_fields.append(key)
+
+    def __getattr__(self, attr):
+        raw_fields = self.__dict__.get('_raw_fields')
+        if not raw_fields or attr not in raw_fields:
+            return super(LazySearchResult, self).__getattr__(attr)
+
+        value = raw_fields.pop(attr)
+        field_object = self._fields.get(attr)
+        if field_object is not None:
+            value = field_object.convert(value)
+        elif self._to_python is not None:
+            value = self._to_python(value)
+
+        self.__dict__[attr] = value
+        return value
+
+    def __getstate__(self):
+        """Convert every pending field so the result can be pickled without field objects and backend references.
+        """
+        for key in list(self._raw_fields):
+            getattr(self, key)
+
+        ret_dict = super(LazySearchResult, self).__getstate__()
+        ret_dict['_fields'] = {}
+        ret_dict['_to_python'] = None
+        return ret_dict
@@ -0,0 +1,126 @@
+import gzip
+import io
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import six
+from haystack.exceptions import MissingDependency
+from haystack.utils.loading import import_class
+
+try:
+    from elasticsearch import Urllib3HttpConnection
+except ImportError:
+    raise MissingDependency(
+        "The 'elasticsearch' backend requires the installation of 'elasticsearch'. Please refer to the documentation.")
+
+# Connection options passed to Elasticsearch transport, connection pool and connections, with their argument name.
+TRANSPORT_OPTIONS = (
+    ('MAXSIZE', 'maxsize'),
+    ('SNIFF_ON_START', 'sniff_on_start'),
+    ('SNIFF_ON_CONNECTION_FAIL', 'sniff_on_connection_fail'),
+    ('SNIFFER_TIMEOUT', 'sniffer_timeout'),
+    ('SNIFF_TIMEOUT', 'sniff_timeout'),
+    ('DEAD_TIMEOUT', 'dead_timeout'),
+    ('MAX_RETRIES', 'max_retries'),
+    ('RETRY_ON_TIMEOUT', 'retry_on_timeout'),
+)
+
+# Request bodies smaller than this number of bytes are sent uncompressed.
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+
+
+def compress(body):
+    """Compress a request body with gzip.
+
+    :param body: Request body.
+    :type body: str
+    :return: Compressed body.
+    :rtype: bytes
+    """
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(body)
+    return buf.getvalue()
+
+
+class CompressedPool(object):
+    """Wraps an urllib3 connection pool so request bodies are sent compressed with gzip, with their header.
+
+    :param pool: Connection pool.
+    :type pool: urllib3.HTTPConnectionPool
+    :param compress_min_size: Request bodies smaller than this number of bytes are sent uncompressed.
+    :type compress_min_size: int
+    """
+    def __init__(self, pool, compress_min_size=DEFAULT_COMPRESS_MIN_SIZE):
+        self.pool = pool
+        self.compress_min_size = compress_min_size
+
+    def urlopen(self, method, url, body=None, headers=None, **kwargs):
+        if body is not None and len(body) >= self.compress_min_size:
+            body = compress(body)
+            headers = dict(headers or {}, **{'content-encoding': 'gzip'})
+
+        return self.pool.urlopen(method, url, body, headers=headers, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+class CompressedHttpConnection(Urllib3HttpConnection):
+    """Urllib3 connection that compresses request bodies with gzip, which Elasticsearch decompresses, so big bulk
+    bodies take less bandwidth. Compressed responses are accepted and decoded too, they are sent if http.compression
+    is enabled in Elasticsearch. Requests are sent and logged by Urllib3HttpConnection, only its pool compresses
+    bodies.
+
+    :param compress_min_size: Request bodies smaller than this number of bytes are sent uncompressed.
+    :type compress_min_size: int
+    """
+    def __init__(self, compress_min_size=DEFAULT_COMPRESS_MIN_SIZE, **kwargs):
+        super(CompressedHttpConnection, self).__init__(**kwargs)
+        # Headers are native strings, otherwise Python 2 httplib fails to join them with a binary body.
+        self.headers['accept-encoding'] = 'gzip,deflate'
+        self.pool = CompressedPool(self.pool, compress_min_size)
+
+
+def get_transport_kwargs(connection_alias, connection_options):
+    """Build the arguments of Elasticsearch client that configure its transport from connection options. Arguments
+    given in KWARGS take precedence.
+
+    :param connection_alias: Haystack connection alias.
+    :type connection_alias: str
+    :param connection_options: Connection options.
+    :type connection_options: dict
+    :return: Client arguments, empty if no transport option is set.
+    :rtype: dict
+    :raise: ImproperlyConfigured if both CONNECTION_CLASS and HTTP_COMPRESS are set, or CONNECTION_CLASS can't be
+        imported.
+    """
+    kwargs = {}
+
+    for option, argument in TRANSPORT_OPTIONS:
+        if connection_options.get(option) is not None:
+            kwargs[argument] = connection_options[option]
+
+    connection_class = connection_options.get('CONNECTION_CLASS')
+    if connection_options.get('HTTP_COMPRESS', False):
+        if connection_class is not None:
+            raise ImproperlyConfigured("'HTTP_COMPRESS' can't be used with 'CONNECTION_CLASS' for connection '%s'."
+                                       % connection_alias)
+
+        kwargs['connection_class'] = CompressedHttpConnection
+        if connection_options.get('HTTP_COMPRESS_MIN_SIZE') is not None:
+            kwargs['compress_min_size'] = connection_options['HTTP_COMPRESS_MIN_SIZE']
+    elif isinstance(connection_class, six.string_types):
+        try:
+            kwargs['connection_class'] = import_class(connection_class)
+        except (ImportError, ValueError) as e:
+            raise ImproperlyConfigured("Invalid 'CONNECTION_CLASS' for connection '%s': %s" % (connection_alias, e))
+    elif connection_class is not None:
+        kwargs['connection_class'] = connection_class
+
+    if kwargs:
+        kwargs.update(connection_options.get('KWARGS', {}))
+
+    return kwargs
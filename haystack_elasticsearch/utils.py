@@ -1,3 +1,4 @@
+import datetime
 import importlib
 import warnings
 
@@ -49,4 +50,42 @@ def import_search_indexes(app):
                 raise
             else:
                 search_index_module = None
-    return search_index_module
\ No newline at end of file
+    return search_index_module
+
+
+def get_period_start(value, period):
+    """Get the first day of the period that contains a date.
+
+    :param value: Date or datetime.
+    :type value: datetime.date
+    :param period: Period, day or month.
+    :type period: str
+    :return: First day of the period.
+    :rtype: datetime.date
+    """
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+
+    if period == 'month':
+        return value.replace(day=1)
+
+    return value
+
+
+def shift_period(period_start, period, count):
+    """Get the first day of the period that is some periods after or before another one.
+
+    :param period_start: First day of a period.
+    :type period_start: datetime.date
+    :param period: Period, day or month.
+    :type period: str
+    :param count: Number of periods, negative to go back.
+    :type count: int
+    :return: First day of the period.
+    :rtype: datetime.date
+    """
+    if period == 'month':
+        months = period_start.year * 12 + period_start.month - 1 + count
+        return datetime.date(months // 12, months % 12 + 1, 1)
+
+    return period_start + datetime.timedelta(days=count)
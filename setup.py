@@ -44,6 +44,9 @@ setup(
     ],
     include_package_data=True,
     install_requires=requires,
+    extras_require={
+        'aio': ['aiohttp>=3.3'],
+    },
     license=haystack_elasticsearch.__license__,
     zip_safe=False,
     keywords='python, django, search, index, haystack, elasticsearch',
@@ -0,0 +1,208 @@
+from __future__ import unicode_literals
+
+import json
+import sys
+import threading
+from unittest import skipIf
+
+import elasticsearch
+from django.test import TestCase
+from django.utils.six.moves import BaseHTTPServer, socketserver
+from mock import patch, MagicMock
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+ASYNC_AVAILABLE = sys.version_info >= (3, 5) and aiohttp is not None
+
+if ASYNC_AVAILABLE:
+    import asyncio
+    from haystack_elasticsearch.aio import AsyncSearchBackend
+
+from haystack_elasticsearch.resilience import CircuitBreaker, CircuitOpenError, HedgedCall
+
+
+class StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def do_DELETE(self):
+        self.respond()
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        path = self.path.split('?')[0]
+        self.server.requests.append((self.command, path, body))
+
+        status, response = self.server.responses.get((self.command, path), (200, {}))
+        data = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@skipIf(not ASYNC_AVAILABLE, 'asyncio API requires Python 3.5+ and aiohttp')
+class AsyncSearchBackendTestCase(TestCase):
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), StubRequestHandler)
+        self.server.requests = []
+        self.server.responses = {}
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.async_backend = AsyncSearchBackend(url='http://127.0.0.1:%d/' % self.server.server_port)
+        self.async_backend.backend.setup_complete = True
+        self.index_name = self.async_backend.backend.index_name
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_search(self):
+        self.server.responses[('POST', '/%s/_search' % self.index_name)] = (200, {'hits': {'total': 2, 'hits': []}})
+
+        results = self.run_async(self.async_backend.search('foo', limit_to_registered_models=False))
+
+        method, path, body = self.server.requests[0]
+        self.assertEqual(results['hits'], 2)
+        self.assertIn('query_string', json.loads(body)['query'])
+
+    def test_setup(self):
+        self.async_backend.backend.setup_complete = False
+        conn = elasticsearch.Elasticsearch('http://127.0.0.1:%d/' % self.server.server_port)
+
+        with patch.object(self.async_backend.backend, 'conn', conn):
+            self.run_async(self.async_backend.setup())
+
+        self.assertTrue(self.async_backend.backend.setup_complete)
+        self.assertIn(('GET', '/%s/_mapping' % self.index_name), [r[:2] for r in self.server.requests])
+
+    def test_search_empty(self):
+        results = self.run_async(self.async_backend.search(''))
+
+        self.assertEqual(results, {'results': [], 'hits': 0})
+        self.assertEqual(self.server.requests, [])
+
+    def test_search_concurrent(self):
+        self.server.responses[('POST', '/%s/_search' % self.index_name)] = (200, {'hits': {'total': 2, 'hits': []}})
+        searches = [self.async_backend.search('foo', limit_to_registered_models=False) for _ in range(5)]
+
+        results = self.run_async(asyncio.gather(*searches))
+
+        self.assertEqual([r['hits'] for r in results], [2] * 5)
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_search_error(self):
+        self.async_backend.backend.silently_fail = False
+        self.server.responses[('POST', '/%s/_search' % self.index_name)] = (400, {'error': 'foo'})
+
+        self.assertRaises(elasticsearch.RequestError, self.run_async,
+                          self.async_backend.search('foo', limit_to_registered_models=False))
+
+    def open_circuit(self):
+        circuit_breaker = CircuitBreaker()
+        circuit_breaker._open()
+        self.async_backend.backend.silently_fail = False
+        return circuit_breaker
+
+    def test_search_open_circuit(self):
+        self.async_backend.backend.circuit_breaker = self.open_circuit()
+
+        self.assertRaises(CircuitOpenError, self.run_async,
+                          self.async_backend.search('foo', limit_to_registered_models=False))
+        self.assertEqual(self.server.requests, [])
+
+    def test_hedged_search(self):
+        hedged_search = HedgedCall(delay=0.01)
+        self.async_backend.backend.hedged_search = hedged_search
+
+        def perform_request(method, path, body=None, params=None, timeout=None):
+            if 'preference' not in params:
+                return asyncio.sleep(0.2, result={'hits': {'total': 1, 'hits': []}})
+            return asyncio.sleep(0, result={'hits': {'total': 2, 'hits': []}})
+
+        with patch.object(self.async_backend, 'perform_request', side_effect=perform_request) as request:
+            results = self.run_async(self.async_backend.search('foo', limit_to_registered_models=False))
+
+            self.assertEqual(results['hits'], 2)
+            self.assertEqual(request.call_count, 2)
+            self.assertTrue(request.call_args[1]['params']['preference'].startswith('hedge_'))
+
+            # Only the latency of the first request is recorded, once it returns.
+            self.assertEqual(len(hedged_search._latencies), 0)
+            self.run_async(asyncio.sleep(0.3))
+            self.assertEqual(len(hedged_search._latencies), 1)
+
+    def test_multi_search(self):
+        self.server.responses[('POST', '/_msearch')] = (200, {'responses': [
+            {'hits': {'total': 1, 'hits': []}},
+            {'hits': {'total': 4, 'hits': []}},
+        ]})
+
+        results = self.run_async(self.async_backend.multi_search([
+            ('foo', {'limit_to_registered_models': False}),
+            ('bar', {'limit_to_registered_models': False}),
+        ]))
+
+        method, path, body = self.server.requests[0]
+        self.assertEqual([r['hits'] for r in results], [1, 4])
+        self.assertEqual(len(body.splitlines()), 4)
+
+    @patch('haystack_elasticsearch.aio.get_model_ct', return_value='app.foo')
+    def test_update(self, get_model_ct):
+        self.server.responses[('POST', '/_bulk')] = (200, {'errors': False, 'items': []})
+        documents = [{'id': 'app.foo.1', '_id': 'app.foo.1', 'text': 'foo'}]
+
+        with patch.object(self.async_backend.backend, 'prepare_documents', return_value=documents):
+            self.run_async(self.async_backend.update(MagicMock(), [MagicMock()]))
+
+        bulk_request, refresh_request = self.server.requests
+        action, document = [json.loads(line) for line in bulk_request[2].splitlines()]
+        self.assertEqual(action, {'index': {'_index': self.index_name, '_type': 'app.foo', '_id': 'app.foo.1'}})
+        self.assertEqual(document, {'id': 'app.foo.1', 'text': 'foo'})
+        self.assertEqual(refresh_request[:2], ('POST', '/%s/_refresh' % self.index_name))
+
+    @patch('haystack_elasticsearch.aio.get_model_ct', return_value='app.foo')
+    def test_update_open_circuit(self, get_model_ct):
+        self.async_backend.backend.write_circuit_breaker = self.open_circuit()
+        documents = [{'id': 'app.foo.1', '_id': 'app.foo.1', 'text': 'foo'}]
+
+        with patch.object(self.async_backend.backend, 'prepare_documents', return_value=documents):
+            self.assertRaises(CircuitOpenError, self.run_async,
+                              self.async_backend.update(MagicMock(), [MagicMock()]))
+
+        self.assertEqual(self.server.requests, [])
+
+    def test_remove(self):
+        self.server.responses[('DELETE', '/%s/app.foo/app.foo.1' % self.index_name)] = (404, {'found': False})
+
+        with patch.object(self.async_backend.backend, 'get_routed_index', return_value=None):
+            self.run_async(self.async_backend.remove('app.foo.1', commit=False))
+
+        self.assertEqual(self.server.requests[0][:2], ('DELETE', '/%s/app.foo/app.foo.1' % self.index_name))
+
+    def tearDown(self):
+        self.run_async(self.async_backend.close())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.server.shutdown()
+        self.server.server_close()
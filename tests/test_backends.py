@@ -1,6 +1,25 @@
 from __future__ import unicode_literals
 
+import datetime
+import time
+
+import elasticsearch
+from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
+from haystack import indexes
+from haystack.inputs import AutoQuery
+from haystack.query import SQ
+from haystack.exceptions import SearchFieldError, SearchBackendError
+from mock import patch, MagicMock
+
+from haystack_elasticsearch.backends import ElasticsearchSearchBackend, ElasticsearchSearchQuery
+from haystack_elasticsearch.fields import (CharField, CompletionField, DateTimeField, DecimalField, FacetCharField,
+                                           IntegerField)
+from haystack_elasticsearch.indexes import ClassIndex, UnifiedIndex
+from haystack_elasticsearch.resilience import CircuitOpenError
+from haystack_elasticsearch.results import LazySearchResult
+from haystack_elasticsearch.transport import CompressedHttpConnection
+from tests.test_indexes import Dummy, DummyIndex
 
 
 def side_effect_list(returns, *args):
@@ -10,6 +29,48 @@ def side_effect_list(returns, *args):
     return result
 
 
+class PrefixDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    reference = CharField(prefix_index='keyword')
+    name = CharField(prefix_index='edge_ngram')
+
+    def get_model(self):
+        return Dummy
+
+
+class AmountDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    quantity = IntegerField()
+    amount = DecimalField()
+    currency = CharField()
+
+    def get_model(self):
+        return Dummy
+
+
+class TitleDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    title = CharField(index_fieldname='title_text', boost=2.0)
+
+    def get_model(self):
+        return Dummy
+
+
+def get_unified_index(*search_indexes):
+    unified_index = UnifiedIndex()
+    unified_index.build([ClassIndex(search_index) for search_index in search_indexes])
+    return unified_index
+
+
+def get_backend(**options):
+    connection_options = {
+        'URL': 'http://127.0.0.1:9200/',
+        'INDEX_NAME': 'test_index',
+    }
+    connection_options.update(options)
+    return ElasticsearchSearchBackend('default', **connection_options)
+
+
 class ElasticsearchBackendTestCase(TestCase):
     def setUp(self):
         pass
@@ -43,3 +104,1538 @@ class ElasticsearchBackendTestCase(TestCase):
 
     def tearDown(self):
         pass
+
+
+@patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+@patch('haystack_elasticsearch.backends.bulk_index', return_value=(2, 0))
+class ClearTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'_scroll_id': 's1', 'hits': {'total': 2, 'hits': []}}
+        self.backend.conn.scroll.side_effect = [
+            {'_scroll_id': 's2', 'hits': {'hits': [
+                {'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.1'},
+                {'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.2', 'fields': {'_routing': '7'}},
+            ]}},
+            {'_scroll_id': 's3', 'hits': {'hits': []}},
+        ]
+
+    def test_clear_models(self, bulk_index, get_model_ct):
+        self.backend.clear(models=[Dummy])
+
+        self.assertFalse(self.backend.conn.delete_by_query.called)
+        self.assertFalse(self.backend.conn.indices.delete.called)
+        self.assertEqual(self.backend.conn.search.call_args[1]['search_type'], 'scan')
+        self.assertEqual(self.backend.conn.search.call_args[1]['doc_type'], 'tests.dummy')
+        self.assertEqual(bulk_index.call_args[0][1], [
+            {'_op_type': 'delete', '_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.1'},
+            {'_op_type': 'delete', '_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.2',
+             '_routing': '7'},
+        ])
+        self.backend.conn.clear_scroll.assert_called_once_with(scroll_id='s3')
+        self.backend.conn.indices.refresh.assert_called_once_with(index='test_index')
+
+    def test_delete_documents_without_commit(self, bulk_index, get_model_ct):
+        deleted = self.backend.delete_documents('tests.dummy', commit=False)
+
+        self.assertEqual(deleted, 2)
+        self.assertFalse(self.backend.conn.indices.refresh.called)
+
+    def test_clear_models_error(self, bulk_index, get_model_ct):
+        self.backend.conn.search.side_effect = elasticsearch.TransportError(500, 'error')
+
+        self.backend.clear(models=[Dummy])
+
+        self.assertFalse(bulk_index.called)
+
+    def test_clear_models_error_not_silent(self, bulk_index, get_model_ct):
+        self.backend.silently_fail = False
+        self.backend.conn.search.side_effect = elasticsearch.TransportError(500, 'error')
+
+        self.assertRaises(elasticsearch.TransportError, self.backend.clear, models=[Dummy])
+
+
+class TransportTestCase(TestCase):
+    def test_default_transport(self):
+        backend = get_backend()
+
+        self.assertIsNot(backend.conn.transport.connection_class, CompressedHttpConnection)
+
+    def test_transport_options(self):
+        # A single URL gets a pool of one connection, that is never left out, so pool options need several hosts.
+        backend = get_backend(URL=['http://127.0.0.1:9200/', 'http://127.0.0.2:9200/'], HTTP_COMPRESS=True,
+                              DEAD_TIMEOUT=30, MAXSIZE=25)
+
+        self.assertIs(backend.conn.transport.connection_class, CompressedHttpConnection)
+        self.assertEqual(backend.conn.transport.connection_pool.dead_timeout, 30)
+        self.assertEqual(backend.conn.transport.kwargs['maxsize'], 25)
+
+
+class TimeoutTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(SEARCH_TIMEOUT='500ms', TERMINATE_AFTER=1000, REQUEST_TIMEOUT=2,
+                                   RESULT_CACHE={'MAX_ENTRIES': 10, 'TIMEOUT': 60})
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+
+    def test_connection_defaults(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        call_kwargs = self.backend.conn.search.call_args[1]
+        self.assertEqual(call_kwargs['body']['timeout'], '500ms')
+        self.assertEqual(call_kwargs['body']['terminate_after'], 1000)
+        self.assertEqual(call_kwargs['request_timeout'], 2)
+
+    def test_no_defaults(self):
+        kwargs = get_backend().build_search_kwargs('foo', limit_to_registered_models=False)
+
+        self.assertNotIn('timeout', kwargs)
+        self.assertNotIn('terminate_after', kwargs)
+        self.assertEqual(get_backend().build_timeout_params(), {})
+
+    def test_query_overrides(self):
+        self.backend.search('foo', limit_to_registered_models=False, timeout='100ms', terminate_after=10,
+                            request_timeout=0.5)
+
+        call_kwargs = self.backend.conn.search.call_args[1]
+        self.assertEqual(call_kwargs['body']['timeout'], '100ms')
+        self.assertEqual(call_kwargs['body']['terminate_after'], 10)
+        self.assertNotIn('request_timeout', call_kwargs['body'])
+        self.assertEqual(call_kwargs['request_timeout'], 0.5)
+
+    def test_partial_results(self):
+        shards = {'total': 5, 'successful': 4, 'failed': 1, 'failures': [{'shard': 2, 'reason': 'foo'}]}
+        self.backend.conn.search.return_value = {'timed_out': True, '_shards': shards,
+                                                 'hits': {'total': 0, 'hits': []}}
+
+        results = self.backend.search('foo', limit_to_registered_models=False)
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertTrue(results['timed_out'])
+        self.assertFalse(results['terminated_early'])
+        self.assertEqual(results['shards'], shards)
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+    def test_client_timeout(self):
+        self.backend.conn.search.side_effect = elasticsearch.ConnectionTimeout('TIMEOUT', 'timed out', None)
+
+        results = self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertTrue(results['timed_out'])
+        self.assertEqual(results['hits'], 0)
+
+    @patch('haystack_elasticsearch.backends.haystack')
+    def test_query_timeout(self, haystack):
+        query = ElasticsearchSearchQuery()
+        query.set_timeout('100ms', terminate_after=10, request_timeout=0.5)
+
+        params = query._clone().build_params()
+
+        self.assertEqual(params['timeout'], '100ms')
+        self.assertEqual(params['terminate_after'], 10)
+        self.assertEqual(params['request_timeout'], 0.5)
+
+    def test_query_search_status(self):
+        query = ElasticsearchSearchQuery()
+        query.set_results({'results': [], 'hits': 0, 'timed_out': True, 'shards': {'total': 1, 'failed': 0}})
+
+        self.assertEqual(query.get_search_status(),
+                         {'timed_out': True, 'terminated_early': False, 'shards': {'total': 1, 'failed': 0}})
+
+
+class ResilienceTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(CIRCUIT_BREAKER={'MINIMUM_CALLS': 2, 'WINDOW_SIZE': 2, 'OPEN_TIMEOUT': 60},
+                                   HEDGED_SEARCHES={'DELAY': 0.05})
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+
+    def test_disabled(self):
+        backend = get_backend()
+
+        self.assertIsNone(backend.circuit_breaker)
+        self.assertIsNone(backend.write_circuit_breaker)
+        self.assertIsNone(backend.hedged_search)
+
+    def test_open_circuit(self):
+        self.backend.conn.search.side_effect = elasticsearch.ConnectionError('N/A', 'refused', None)
+
+        for _ in range(3):
+            results = self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(results['hits'], 0)
+        self.assertEqual(self.backend.circuit_breaker.state, 'open')
+        # Two failed calls opened the circuit, the third one isn't sent.
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+    def open_circuit(self, circuit_breaker):
+        circuit_breaker.state = 'open'
+        circuit_breaker._opened_at = time.time()
+        self.backend.silently_fail = False
+
+    def test_open_circuit_suggest(self):
+        self.open_circuit(self.backend.circuit_breaker)
+
+        with patch.object(self.backend, 'get_completion_field', return_value='title_suggest'):
+            self.assertRaises(CircuitOpenError, self.backend.suggest, 'fo', 'title_suggest')
+
+        self.assertFalse(self.backend.conn.suggest.called)
+
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_open_circuit_update(self, get_model_ct):
+        self.open_circuit(self.backend.write_circuit_breaker)
+
+        with patch('haystack_elasticsearch.backends.bulk_index') as bulk_index, \
+                patch.object(self.backend, 'prepare_documents', return_value=[{'id': 'tests.dummy.1'}]):
+            self.assertRaises(CircuitOpenError, self.backend.update, DummyIndex(), [])
+
+        self.assertFalse(bulk_index.called)
+
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_update_open_search_circuit(self, get_model_ct):
+        self.open_circuit(self.backend.circuit_breaker)
+
+        with patch('haystack_elasticsearch.backends.bulk_index') as bulk_index, \
+                patch.object(self.backend, 'prepare_documents', return_value=[{'id': 'tests.dummy.1'}]):
+            self.backend.update(DummyIndex(), [])
+
+        self.assertTrue(bulk_index.called)
+
+    @patch('haystack_elasticsearch.backends.BULK_CHUNK_SIZE', 2)
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_update_guards_each_bulk_request(self, get_model_ct):
+        docs = [{'id': 'tests.dummy.%s' % i} for i in range(5)]
+
+        with patch('haystack_elasticsearch.backends.bulk_index') as bulk_index, \
+                patch.object(self.backend, 'prepare_documents', return_value=docs), \
+                patch.object(self.backend.write_circuit_breaker, 'record') as record:
+            self.backend.update(DummyIndex(), [])
+
+        self.assertEqual([c[0][1] for c in bulk_index.call_args_list], [docs[:2], docs[2:4], docs[4:]])
+        # Three bulk requests and the refresh.
+        self.assertEqual(record.call_count, 4)
+
+    def test_write_failures(self):
+        self.backend.conn.delete.side_effect = elasticsearch.ConnectionError('N/A', 'refused', None)
+
+        with patch.object(self.backend, 'get_routed_index', return_value=None):
+            for _ in range(2):
+                self.backend.remove('tests.dummy.1')
+
+        self.assertEqual(self.backend.write_circuit_breaker.state, 'open')
+        self.assertEqual(self.backend.circuit_breaker.state, 'closed')
+
+    def test_open_circuit_remove(self):
+        self.open_circuit(self.backend.write_circuit_breaker)
+
+        with patch.object(self.backend, 'get_routed_index', return_value=None):
+            self.assertRaises(CircuitOpenError, self.backend.remove, 'tests.dummy.1')
+
+        self.assertFalse(self.backend.conn.delete.called)
+
+    def test_open_circuit_clear(self):
+        self.open_circuit(self.backend.write_circuit_breaker)
+
+        self.assertRaises(CircuitOpenError, self.backend.clear)
+
+        self.assertFalse(self.backend.conn.indices.delete.called)
+
+    def test_hedged_search(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        call_kwargs = self.backend.conn.search.call_args[1]
+        self.assertNotIn('preference', call_kwargs)
+
+    def test_hedged_search_slow(self):
+        def search(**kwargs):
+            if 'preference' not in kwargs:
+                time.sleep(0.5)
+            return {'hits': {'total': 1 if 'preference' in kwargs else 0, 'hits': []}}
+
+        self.backend.conn.search.side_effect = search
+
+        results = self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(results['hits'], 1)
+        preferences = [call[1].get('preference') for call in self.backend.conn.search.call_args_list]
+        self.assertIsNone(preferences[0])
+        self.assertTrue(preferences[1].startswith('hedge_'))
+
+
+class QueryTypeTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+
+    def test_default_query_type(self):
+        kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False)
+
+        self.assertIn('query_string', kwargs['query'])
+        self.assertTrue(kwargs['query']['query_string']['analyze_wildcard'])
+
+    def test_connection_query_type(self):
+        backend = get_backend(QUERY_TYPE='simple_query_string')
+
+        kwargs = backend.build_search_kwargs('foo', limit_to_registered_models=False)
+
+        self.assertEqual(kwargs['query']['simple_query_string']['query'], 'foo')
+
+    def test_connection_query_type_invalid(self):
+        self.assertRaises(ImproperlyConfigured, get_backend, QUERY_TYPE='foo')
+
+    def test_query_type_match(self):
+        kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False, query_type='match')
+
+        self.assertEqual(kwargs['query']['match'][self.backend.document_field]['query'], 'foo')
+
+    def test_query_type_multi_match(self):
+        with patch.object(ElasticsearchSearchBackend, 'get_multi_match_fields', return_value=['text', 'title^2.0']):
+            kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False,
+                                                      query_type='multi_match')
+
+        self.assertEqual(kwargs['query']['multi_match']['fields'], ['text', 'title^2.0'])
+
+    def test_query_type_match_all(self):
+        kwargs = self.backend.build_search_kwargs('*:*', limit_to_registered_models=False, query_type='match')
+
+        self.assertEqual(kwargs['query'], {'match_all': {}})
+
+    def test_query_type_invalid(self):
+        self.assertRaises(ValueError, self.backend.build_main_query, 'foo', 'foo')
+
+    @patch('haystack_elasticsearch.backends.haystack')
+    def test_get_multi_match_fields(self, haystack):
+        unified_index = UnifiedIndex()
+        unified_index.build([ClassIndex(DummyIndex())])
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = unified_index
+
+        fields = self.backend.get_multi_match_fields()
+
+        self.assertEqual(fields, ['char_field', 'text'])
+
+    @patch('haystack_elasticsearch.backends.haystack')
+    def test_get_multi_match_fields_index_fieldname(self, haystack):
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = \
+            get_unified_index(TitleDummyIndex())
+
+        fields = self.backend.get_multi_match_fields()
+
+        self.assertEqual(fields, ['text', 'title_text^2.0'])
+
+    def build_query_params(self, query_type, *filters):
+        query = ElasticsearchSearchQuery()
+        query.set_query_type(query_type)
+        for sq in filters:
+            query.add_filter(sq)
+        with patch('haystack.connections') as connections:
+            connections.__getitem__.return_value.get_unified_index.return_value = get_unified_index(DummyIndex())
+            return query.build_params()
+
+    def test_structured_query_not_needed(self):
+        params = self.build_query_params(None, SQ(content='foo'), SQ(char_field='bar'))
+
+        self.assertNotIn('main_query', params)
+
+    def test_structured_query(self):
+        params = self.build_query_params('match', SQ(content='foo bar'), SQ(char_field='bar'))
+
+        must = params['main_query']['bool']['must']
+        self.assertEqual(must[0], self.backend.build_main_query('foo bar', 'match'))
+        self.assertEqual(must[1]['query_string']['query'], '(char_field:("bar"))')
+
+    def test_structured_query_auto_query(self):
+        params = self.build_query_params('simple_query_string', SQ(content=AutoQuery('"foo bar" -baz')))
+
+        self.assertEqual(params['main_query']['simple_query_string']['query'], '"foo bar" -baz')
+
+    def test_structured_query_or_not(self):
+        params = self.build_query_params('match', SQ(content='foo') | ~SQ(char_field='bar'))
+
+        should = params['main_query']['bool']['should']
+        self.assertEqual(should[0], self.backend.build_main_query('foo', 'match'))
+        self.assertEqual(should[1]['bool']['must_not'][0]['query_string']['query'], '(char_field:("bar"))')
+
+    def test_main_query(self):
+        kwargs = self.backend.build_search_kwargs('(content:foo)', limit_to_registered_models=False,
+                                                  query_type='match', main_query={'match_all': {}})
+
+        self.assertEqual(kwargs['query'], {'match_all': {}})
+
+
+class PrefixIndexTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.unified_index = get_unified_index(PrefixDummyIndex())
+
+    def test_field_invalid_prefix_index(self):
+        self.assertRaises(SearchFieldError, CharField, prefix_index='foo')
+
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_build_schema(self, get_model_ct):
+        schema = self.backend.build_schema(self.unified_index.indexes)
+        properties = schema['tests.dummy']['properties']
+
+        self.assertEqual(properties['reference']['fields']['prefix']['analyzer'], 'prefix_keyword_analyzer')
+        self.assertEqual(properties['name']['fields']['prefix']['index_analyzer'], 'prefix_edgengram_analyzer')
+        self.assertNotIn('fields', properties['text'])
+
+    def test_build_index_settings(self):
+        analysis = self.backend.build_index_settings()['settings']['analysis']
+
+        self.assertIn('prefix_keyword_analyzer', analysis['analyzer'])
+        self.assertIn('prefix_edgengram_analyzer', analysis['analyzer'])
+        self.assertIn('prefix_edgengram', analysis['filter'])
+        self.assertNotIn('prefix_edgengram', self.backend.DEFAULT_SETTINGS['settings']['analysis']['filter'])
+
+    def build_query_fragment(self, field, filter_type, value):
+        query = ElasticsearchSearchQuery()
+        with patch('haystack.connections') as connections:
+            connections.__getitem__.return_value.get_unified_index.return_value = self.unified_index
+            return query.build_query_fragment(field, filter_type, value)
+
+    def build_main_query(self, *filters):
+        query = ElasticsearchSearchQuery()
+        for sq in filters:
+            query.add_filter(sq)
+        with patch('haystack.connections') as connections:
+            connections.__getitem__.return_value.get_unified_index.return_value = self.unified_index
+            return query.build_params().get('main_query')
+
+    def test_prefix_query_keyword(self):
+        main_query = self.build_main_query(SQ(reference__startswith='AB 12'))
+
+        self.assertEqual(main_query, {'prefix': {'reference.prefix': 'ab 12'}})
+
+    def test_prefix_query_edge_ngram(self):
+        main_query = self.build_main_query(SQ(name__startswith='Foo bar-baz'))
+
+        self.assertEqual(main_query, {'bool': {'must': [{'term': {'name.prefix': 'foo'}},
+                                                        {'term': {'name.prefix': 'bar'}},
+                                                        {'term': {'name.prefix': 'baz'}}]}})
+
+    def test_prefix_query_edge_ngram_without_words(self):
+        for value in ('-', '  '):
+            main_query = self.build_main_query(SQ(name__startswith=value))
+
+            self.assertEqual(main_query, {'bool': {'must_not': {'match_all': {}}}})
+
+    def test_prefix_query_with_other_filters(self):
+        main_query = self.build_main_query(SQ(content='foo'), SQ(name__startswith='bar'))
+
+        must = main_query['bool']['must']
+        self.assertEqual(must[0]['query_string']['query'], '("foo")')
+        self.assertEqual(must[1], {'term': {'name.prefix': 'bar'}})
+
+    def test_prefix_query_not_needed(self):
+        self.assertIsNone(self.build_main_query(SQ(reference='foo'), SQ(text__startswith='bar')))
+
+    def test_build_query_fragment_prefix_index(self):
+        fragment = self.build_query_fragment('reference', 'startswith', 'foo')
+
+        self.assertEqual(fragment, '(reference:("foo*"))')
+
+    def test_build_query_fragment_without_prefix_index(self):
+        fragment = self.build_query_fragment('text', 'startswith', 'foo')
+
+        self.assertEqual(fragment, '(text:("foo*"))')
+
+    def test_build_query_fragment_contains(self):
+        fragment = self.build_query_fragment('reference', 'contains', 'foo')
+
+        self.assertEqual(fragment, '(reference:("foo"))')
+
+
+class ResultCacheTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(RESULT_CACHE={'MAX_ENTRIES': 10, 'TIMEOUT': 60})
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+
+    def test_search_cached(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(self.backend.conn.search.call_count, 1)
+
+    def test_search_different_offsets(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.backend.search('foo', limit_to_registered_models=False, start_offset=10, end_offset=20)
+
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+    def test_search_invalidated_on_remove(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.backend.remove('app.foo.1')
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+    def test_search_invalidated_after_refresh(self):
+        # A search sent between the write and the refresh caches results without the change.
+        self.backend.conn.indices.refresh.side_effect = \
+            lambda **kwargs: self.backend.search('foo', limit_to_registered_models=False)
+
+        self.backend.remove('app.foo.1')
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+    def test_search_invalidated_on_clear(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.backend.clear()
+        self.backend.setup_complete = True
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+    def test_search_without_cache(self):
+        self.backend.result_cache = None
+
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(self.backend.conn.search.call_count, 2)
+
+
+class CoalesceSearchesTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(COALESCE_SEARCHES=True)
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+
+    def test_search(self):
+        with patch.object(self.backend.search_flight, 'do', wraps=self.backend.search_flight.do) as do:
+            results = self.backend.search('foo', limit_to_registered_models=False)
+
+        self.assertEqual(do.call_count, 1)
+        self.assertEqual(results['hits'], 0)
+        self.assertEqual(self.backend.conn.search.call_count, 1)
+
+    def test_search_same_key(self):
+        with patch.object(self.backend.search_flight, 'do', wraps=self.backend.search_flight.do) as do:
+            self.backend.search('foo', limit_to_registered_models=False)
+            self.backend.search('foo', limit_to_registered_models=False)
+            self.backend.search('bar', limit_to_registered_models=False)
+
+        keys = [call[0][0] for call in do.call_args_list]
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+
+    def test_disabled(self):
+        backend = get_backend()
+
+        self.assertIsNone(backend.search_flight)
+
+
+class MultiSearchTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.msearch.return_value = {
+            'responses': [
+                {'hits': {'total': 3, 'hits': []}},
+                {'hits': {'total': 5, 'hits': []}},
+            ]
+        }
+
+    def test_multi_search(self):
+        results = self.backend.multi_search([
+            ('foo', {'limit_to_registered_models': False}),
+            ('', {}),
+            ('bar', {'limit_to_registered_models': False, 'start_offset': 10, 'end_offset': 20}),
+        ])
+
+        body = self.backend.conn.msearch.call_args[1]['body']
+        self.assertEqual(len(body), 4)
+        self.assertEqual(body[0], {'index': 'test_index'})
+        self.assertEqual(body[3]['from'], 10)
+        self.assertEqual(body[3]['size'], 10)
+        self.assertEqual([r['hits'] for r in results], [3, 0, 5])
+
+    def test_multi_search_cached(self):
+        self.backend.result_cache = get_backend(RESULT_CACHE={'TIMEOUT': 60}).result_cache
+        queries = [('foo', {'limit_to_registered_models': False}), ('bar', {'limit_to_registered_models': False})]
+        self.backend.multi_search(queries)
+
+        results = self.backend.multi_search(queries)
+
+        self.assertEqual(self.backend.conn.msearch.call_count, 1)
+        self.assertEqual([r['hits'] for r in results], [3, 5])
+
+    def test_multi_search_error(self):
+        self.backend.conn.msearch.return_value = {'responses': [{'error': 'foo'}]}
+
+        results = self.backend.multi_search([('foo', {'limit_to_registered_models': False})])
+
+        self.assertEqual(results[0]['hits'], 0)
+
+    def test_multi_search_error_not_silently(self):
+        self.backend.silently_fail = False
+        self.backend.conn.msearch.return_value = {'responses': [{'error': 'foo'}]}
+
+        self.assertRaises(SearchBackendError, self.backend.multi_search,
+                          [('foo', {'limit_to_registered_models': False})])
+
+
+def process_hit_ids(raw_results, **kwargs):
+    return [hit['_id'] for hit in raw_results['hits']['hits']], raw_results['hits']['total']
+
+
+class ScanTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'_scroll_id': 's0', 'hits': {'total': 3, 'hits': []}}
+        self.backend.conn.scroll.side_effect = [
+            {'_scroll_id': 's1', 'hits': {'total': 3, 'hits': [{'_id': 'a'}, {'_id': 'b'}]}},
+            {'_scroll_id': 's2', 'hits': {'total': 3, 'hits': [{'_id': 'c'}]}},
+            {'_scroll_id': 's3', 'hits': {'total': 3, 'hits': []}},
+        ]
+
+    @patch.object(ElasticsearchSearchBackend, '_process_results_results_section', side_effect=process_hit_ids)
+    def test_scan(self, process):
+        results = list(self.backend.scan('foo', size=2, limit_to_registered_models=False, start_offset=10,
+                                         end_offset=20))
+
+        search_kwargs = self.backend.conn.search.call_args[1]
+        self.assertEqual(results, ['a', 'b', 'c'])
+        self.assertEqual(search_kwargs['search_type'], 'scan')
+        self.assertEqual(search_kwargs['size'], 2)
+        self.assertNotIn('from', search_kwargs['body'])
+        self.backend.conn.clear_scroll.assert_called_once_with(scroll_id='s3')
+
+    @patch.object(ElasticsearchSearchBackend, '_process_results_results_section', side_effect=process_hit_ids)
+    def test_scan_sorted(self, process):
+        self.backend.conn.search.return_value = {'_scroll_id': 's0', 'hits': {'total': 3, 'hits': [{'_id': 'x'}]}}
+
+        results = list(self.backend.scan('foo', sort_by=[('name', 'asc')], limit_to_registered_models=False))
+
+        self.assertEqual(results, ['x', 'a', 'b', 'c'])
+        self.assertNotIn('search_type', self.backend.conn.search.call_args[1])
+
+    @patch.object(ElasticsearchSearchBackend, '_process_results_results_section', side_effect=process_hit_ids)
+    def test_scan_abandoned(self, process):
+        results = self.backend.scan('foo', limit_to_registered_models=False)
+        next(results)
+
+        results.close()
+
+        self.backend.conn.clear_scroll.assert_called_once_with(scroll_id='s1')
+
+    def test_scan_error(self):
+        self.backend.conn.search.side_effect = elasticsearch.TransportError(500, 'foo')
+
+        self.assertEqual(list(self.backend.scan('foo', limit_to_registered_models=False)), [])
+        self.assertFalse(self.backend.conn.clear_scroll.called)
+
+    def test_scan_query(self):
+        query = ElasticsearchSearchQuery()
+        query.backend = self.backend
+        query.set_limits(10, 20)
+
+        with patch.object(self.backend, 'scan_pages', return_value=iter([['a']])) as scan_pages:
+            self.assertEqual(list(query.scan_pages(size=100)), [['a']])
+
+        self.assertEqual(scan_pages.call_args[1]['size'], 100)
+        self.assertEqual(scan_pages.call_args[1]['start_offset'], 10)
+
+
+class ProjectionTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+
+    def test_source_includes(self):
+        kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False,
+                                                  source_includes=['title'], source_excludes=['django_id', 'text'])
+
+        self.assertEqual(kwargs['_source'], {'include': ['django_ct', 'django_id', 'title'], 'exclude': ['text']})
+
+    def test_stored_fields(self):
+        kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False, stored_fields=['title'])
+
+        self.assertEqual(kwargs['fields'], ['django_ct', 'django_id', 'title'])
+        self.assertFalse(kwargs['_source'])
+
+    def test_search_params(self):
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.assertTrue(self.backend.conn.search.call_args[1]['_source'])
+
+        self.backend.search('foo', limit_to_registered_models=False, source_includes=['title'])
+        self.assertNotIn('_source', self.backend.conn.search.call_args[1])
+
+    @patch('haystack_elasticsearch.indexes.get_model_ct', return_value='tests.dummy')
+    @patch('haystack.connections')
+    def test_process_stored_fields(self, connections, get_model_ct):
+        connections.__getitem__.return_value.get_unified_index.return_value = get_unified_index(DummyIndex())
+        raw_results = {'hits': {'total': 1, 'hits': [{
+            '_score': 1.0,
+            'fields': {'django_ct': ['tests.dummy'], 'django_id': ['1'], 'char_field': ['foo'],
+                       'multivalue_field': [1]},
+        }]}}
+
+        results, hits = self.backend._process_results_results_section(
+            None, False, raw_results, lambda *args, **kwargs: (args, kwargs))
+
+        self.assertEqual(hits, 1)
+        self.assertEqual(results[0][0], ('tests', 'dummy', '1', 1.0))
+        self.assertEqual(results[0][1], {'char_field': 'foo', 'multivalue_field': [1]})
+
+    def test_query_params(self):
+        query = ElasticsearchSearchQuery()
+        query.set_source(includes=['title'])
+        query.set_stored_fields(['name'])
+
+        params = query._clone().build_params()
+
+        self.assertEqual(params['source_includes'], ['title'])
+        self.assertNotIn('source_excludes', params)
+        self.assertEqual(params['stored_fields'], ['name'])
+
+
+class IdsOnlyTestCase(TestCase):
+    def test_ids_only(self):
+        kwargs = get_backend().build_search_kwargs('foo', limit_to_registered_models=False, ids_only=True,
+                                                   source_includes=['title'])
+
+        self.assertEqual(kwargs['fields'], ['django_ct', 'django_id'])
+        self.assertFalse(kwargs['_source'])
+
+    def test_query_ids_only(self):
+        query = ElasticsearchSearchQuery()
+        query.set_ids_only()
+
+        self.assertTrue(query._clone().build_params()['ids_only'])
+
+
+class ContentTypeTableTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+
+    @patch('haystack_elasticsearch.indexes.get_model_ct', return_value='tests.dummy')
+    @patch('haystack.connections')
+    def test_process_results(self, connections, get_model_ct):
+        connections.__getitem__.return_value.get_unified_index.return_value = get_unified_index(DummyIndex())
+        raw_results = {'hits': {'total': 2, 'hits': [
+            {'_score': 2.0, '_source': {'django_ct': 'tests.dummy', 'django_id': '1', 'int_field': '3',
+                                        'other_field': 'foo'}},
+            {'_score': 1.0, '_source': {'django_ct': 'tests.other', 'django_id': '1'}},
+        ]}}
+
+        results, hits = self.backend._process_results_results_section(
+            None, False, raw_results, lambda *args, **kwargs: (args, kwargs))
+
+        self.assertEqual(hits, 1)
+        self.assertEqual(results, [(('tests', 'dummy', '1', 2.0), {'int_field': 3, 'other_field': 'foo'})])
+
+    @patch('haystack_elasticsearch.indexes.get_model_ct', return_value='tests.dummy')
+    @patch('haystack.connections')
+    def test_process_results_lazy(self, connections, get_model_ct):
+        connections.__getitem__.return_value.get_unified_index.return_value = get_unified_index(DummyIndex())
+        raw_results = {'hits': {'total': 1, 'hits': [
+            {'_score': 2.0, '_source': {'django_ct': 'tests.dummy', 'django_id': '1', 'int_field': '3'}},
+        ]}}
+
+        results, hits = self.backend._process_results_results_section(None, False, raw_results, LazySearchResult)
+
+        self.assertEqual(results[0]._raw_fields, {'int_field': '3'})
+        self.assertEqual(results[0].int_field, 3)
+
+
+class CountTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.count.return_value = {'count': 42}
+
+    def test_count(self):
+        count = self.backend.count('foo', limit_to_registered_models=False, start_offset=10, end_offset=20,
+                                   sort_by=[('name', 'asc')])
+
+        body = self.backend.conn.count.call_args[1]['body']
+        self.assertEqual(count, 42)
+        self.assertEqual(list(body.keys()), ['query'])
+        self.assertFalse(self.backend.conn.search.called)
+
+    def test_count_empty(self):
+        self.assertEqual(self.backend.count(''), 0)
+        self.assertFalse(self.backend.conn.count.called)
+
+    def test_count_cached(self):
+        self.backend.result_cache = get_backend(RESULT_CACHE={'TIMEOUT': 60}).result_cache
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+
+        self.backend.count('foo', limit_to_registered_models=False)
+        self.backend.search('foo', limit_to_registered_models=False)
+        count = self.backend.count('foo', limit_to_registered_models=False)
+
+        self.assertEqual(count, 42)
+        self.assertEqual(self.backend.conn.count.call_count, 1)
+        self.assertEqual(self.backend.conn.search.call_count, 1)
+
+    def test_count_partial_not_cached(self):
+        self.backend.result_cache = get_backend(RESULT_CACHE={'TIMEOUT': 60}).result_cache
+        self.backend.conn.count.return_value = {'count': 40, '_shards': {'total': 5, 'successful': 4, 'failed': 1}}
+
+        self.backend.count('foo', limit_to_registered_models=False)
+        count = self.backend.count('foo', limit_to_registered_models=False)
+
+        self.assertEqual(count, 40)
+        self.assertEqual(self.backend.conn.count.call_count, 2)
+
+    def test_count_error(self):
+        self.backend.conn.count.side_effect = elasticsearch.TransportError(500, 'foo')
+
+        self.assertEqual(self.backend.count('foo', limit_to_registered_models=False), 0)
+
+    def test_query_get_count(self):
+        query = ElasticsearchSearchQuery()
+        query.backend = self.backend
+
+        with patch.object(self.backend, 'count', return_value=7) as count:
+            self.assertEqual(query.get_count(), 7)
+            self.assertEqual(query.get_count(), 7)
+
+        self.assertEqual(count.call_count, 1)
+        self.assertFalse(self.backend.conn.search.called)
+
+
+class FacetAggregationsTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(FACET_ENGINE='aggregations', FACET_SIZE=10, FACET_SHARD_SIZE=50)
+
+    def test_facet_engine_invalid(self):
+        self.assertRaises(ImproperlyConfigured, get_backend, FACET_ENGINE='foo')
+
+    def test_field_facets(self):
+        kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False,
+                                                  facets={'author': {}, 'tag': {'size': 5, 'execution_hint': 'map'}})
+
+        self.assertNotIn('facets', kwargs)
+        self.assertEqual(kwargs['aggs']['fields:author'], {'terms': {'field': 'author', 'size': 10, 'shard_size': 50}})
+        self.assertEqual(kwargs['aggs']['fields:tag'],
+                         {'terms': {'field': 'tag', 'size': 5, 'shard_size': 50, 'execution_hint': 'map'}})
+
+    def test_shared_filter(self):
+        facet_filter = {'term': {'published': True}}
+        facets = {'author': {'facet_filter': facet_filter}, 'tag': {'facet_filter': facet_filter}}
+
+        aggregations = self.backend.build_facet_aggregations(facets=facets)
+
+        self.assertEqual(list(aggregations.keys()), ['group:0'])
+        self.assertEqual(aggregations['group:0']['filter'], facet_filter)
+        self.assertEqual(sorted(aggregations['group:0']['aggs'].keys()), ['fields:author', 'fields:tag'])
+        self.assertEqual(facets['author'], {'facet_filter': facet_filter})
+
+    def test_global_scope(self):
+        aggregations = self.backend.build_facet_aggregations(facets={'author': {'global_scope': True}})
+
+        self.assertEqual(aggregations['group:0']['global'], {})
+        self.assertIn('fields:author', aggregations['group:0']['aggs'])
+
+    def test_date_and_query_facets(self):
+        date_facets = {'pub_date': {'gap_by': 'month', 'start_date': datetime.date(2015, 1, 1),
+                                    'end_date': datetime.date(2015, 6, 1)}}
+
+        aggregations = self.backend.build_facet_aggregations(date_facets=date_facets,
+                                                             query_facets=[('price', '[0 TO 10]')])
+
+        self.assertEqual(aggregations['group:0']['aggs']['dates:pub_date']['date_histogram']['interval'], 'month')
+        self.assertIn('range', aggregations['group:0']['filter'])
+        self.assertEqual(aggregations['queries:price']['filter']['query']['query_string']['query'], '[0 TO 10]')
+
+    def test_process_aggregations(self):
+        raw_results = {'aggregations': {
+            'fields:author': {'buckets': [{'key': 'foo', 'doc_count': 3}]},
+            'group:0': {
+                'doc_count': 8,
+                'dates:pub_date': {'buckets': [{'key': 1420070400000, 'doc_count': 2}]},
+                'group:0': {'doc_count': 4, 'fields:tag': {'buckets': [{'key': 'bar', 'doc_count': 1}]}},
+            },
+            'queries:price': {'doc_count': 5},
+        }}
+
+        facets = self.backend._process_results_facets_section(raw_results)
+
+        self.assertEqual(facets['fields'], {'author': [('foo', 3)], 'tag': [('bar', 1)]})
+        self.assertEqual(facets['dates'], {'pub_date': [(datetime.datetime(2015, 1, 1), 2)]})
+        self.assertEqual(facets['queries'], {'price': 5})
+
+
+@patch('haystack_elasticsearch.backends.haystack')
+class AggregateTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'aggregations': {
+            'quantity:stats': {'count': 2, 'min': 1.0, 'max': 3.0, 'avg': 2.0, 'sum': 4.0},
+            'amount:percentiles': {'values': {'50.0': 10.5, '99.0': 20.0}},
+            'amount:cardinality': {'value': 7},
+        }}
+        self.unified_index = get_unified_index(AmountDummyIndex())
+
+    def set_unified_index(self, haystack):
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = self.unified_index
+
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_build_schema_numeric_subfield(self, get_model_ct, haystack):
+        properties = self.backend.build_schema(self.unified_index.indexes)['tests.dummy']['properties']
+
+        self.assertEqual(properties['amount']['fields']['numeric'], {'type': 'double'})
+        self.assertNotIn('fields', properties['quantity'])
+
+    def test_aggregate(self, haystack):
+        self.set_unified_index(haystack)
+
+        results = self.backend.aggregate('foo', ['quantity', 'amount'], metrics=['stats'],
+                                         limit_to_registered_models=False, start_offset=10, end_offset=20)
+
+        search_kwargs = self.backend.conn.search.call_args[1]
+        self.assertEqual(search_kwargs['search_type'], 'count')
+        self.assertEqual(search_kwargs['body']['aggs'], {
+            'quantity:stats': {'stats': {'field': 'quantity'}},
+            'amount:stats': {'stats': {'field': 'amount.numeric'}},
+        })
+        self.assertEqual(sorted(search_kwargs['body'].keys()), ['aggs', 'query'])
+        self.assertEqual(results['quantity']['stats']['sum'], 4.0)
+        self.assertEqual(results['amount'], {'percentiles': {50.0: 10.5, 99.0: 20.0}, 'cardinality': 7})
+
+    def test_aggregate_percents(self, haystack):
+        self.set_unified_index(haystack)
+
+        self.backend.aggregate('foo', ['amount'], metrics=['percentiles'], percents=[50, 99],
+                               limit_to_registered_models=False)
+
+        aggs = self.backend.conn.search.call_args[1]['body']['aggs']
+        self.assertEqual(aggs['amount:percentiles'], {'percentiles': {'field': 'amount.numeric', 'percents': [50, 99]}})
+
+    def test_aggregate_not_numeric(self, haystack):
+        self.set_unified_index(haystack)
+
+        self.assertRaises(ValueError, self.backend.aggregate, 'foo', ['currency'])
+        self.assertRaises(ValueError, self.backend.aggregate, 'foo', ['missing'])
+
+    def test_aggregate_invalid_metric(self, haystack):
+        self.set_unified_index(haystack)
+
+        self.assertRaises(ValueError, self.backend.aggregate, 'foo', ['amount'], metrics=['foo'])
+
+    def test_aggregate_error(self, haystack):
+        self.set_unified_index(haystack)
+        self.backend.conn.search.side_effect = elasticsearch.TransportError(500, 'foo')
+
+        self.assertEqual(self.backend.aggregate('foo', ['amount'], limit_to_registered_models=False), {})
+
+
+class GroupSearchTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'aggregations': {'groups': {'buckets': [
+            {'key': 'app.foo', 'doc_count': 12, 'top': {'hits': {'total': 12, 'hits': [{'_id': 'a'}, {'_id': 'b'}]}}},
+            {'key': 'app.bar', 'doc_count': 1, 'top': {'hits': {'total': 1, 'hits': [{'_id': 'c'}]}}},
+        ]}}}
+
+    @patch.object(ElasticsearchSearchBackend, '_process_results_results_section', side_effect=process_hit_ids)
+    def test_group_search(self, process):
+        groups = self.backend.group_search('foo', size=2, limit_to_registered_models=False, sort_by=[('name', 'asc')],
+                                           start_offset=10, end_offset=20, ids_only=True)
+
+        body = self.backend.conn.search.call_args[1]['body']
+        top_hits = body['aggs']['groups']['aggs']['top']['top_hits']
+        self.assertEqual(self.backend.conn.search.call_args[1]['search_type'], 'count')
+        self.assertEqual(body['aggs']['groups']['terms']['field'], 'django_ct')
+        self.assertEqual(top_hits['size'], 2)
+        self.assertEqual(top_hits['sort'], [{'name': {'order': 'asc'}}])
+        self.assertEqual(top_hits['_source'], {'include': ['django_ct', 'django_id']})
+        self.assertEqual(list(groups.keys()), ['app.foo', 'app.bar'])
+        self.assertEqual(groups['app.foo'], {'results': ['a', 'b'], 'hits': 12})
+
+    def test_group_search_empty(self):
+        self.assertEqual(self.backend.group_search(''), {})
+        self.assertFalse(self.backend.conn.search.called)
+
+    def test_group_search_error(self):
+        self.backend.conn.search.side_effect = elasticsearch.TransportError(500, 'foo')
+
+        self.assertEqual(self.backend.group_search('foo', limit_to_registered_models=False), {})
+
+
+class HighlightDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True, term_vector='with_positions_offsets')
+    title = CharField()
+
+    def get_model(self):
+        return Dummy
+
+
+@patch('haystack_elasticsearch.backends.haystack')
+class HighlightTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(HIGHLIGHT_FRAGMENT_SIZE=80)
+
+    def set_unified_index(self, haystack):
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = \
+            get_unified_index(HighlightDummyIndex())
+
+    def test_highlight_default(self, haystack):
+        self.set_unified_index(haystack)
+
+        kwargs = self.backend.build_search_kwargs('foo', limit_to_registered_models=False, highlight=True)
+
+        self.assertEqual(kwargs['highlight'], {'fields': {'text': {'type': 'fvh', 'fragment_size': 80}}})
+
+    def test_highlight_fields(self, haystack):
+        self.set_unified_index(haystack)
+
+        highlight = self.backend.build_highlight({'fields': ['title', 'text'], 'fragment_size': 50,
+                                                  'number_of_fragments': 2})
+
+        self.assertEqual(highlight['fields']['title'], {'fragment_size': 50, 'number_of_fragments': 2})
+        self.assertEqual(highlight['fields']['text']['type'], 'fvh')
+
+    def test_query_add_highlight(self, haystack):
+        query = ElasticsearchSearchQuery()
+        query.add_highlight()
+        self.assertIs(query.build_params()['highlight'], True)
+
+        query.add_highlight(['title'], number_of_fragments=1)
+        self.assertEqual(query._clone().build_params()['highlight'], {'fields': ['title'], 'number_of_fragments': 1})
+
+
+class SuggestDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    title = CharField()
+    title_suggest = CompletionField(payloads=True, analyzer='simple', boost=2.0,
+                                    context={'color': {'type': 'category', 'path': 'color'}})
+
+    def get_model(self):
+        return Dummy
+
+
+@patch('haystack_elasticsearch.backends.haystack')
+class SuggestTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.suggest.return_value = {
+            '_shards': {'total': 5, 'successful': 5, 'failed': 0},
+            'completion': [{'text': 'fo', 'offset': 0, 'length': 2, 'options': [
+                {'text': 'foo', 'score': 2.0, 'payload': {'id': 1}},
+                {'text': 'foobar', 'score': 1.0, 'payload': {'id': 2}},
+            ]}],
+        }
+        self.unified_index = get_unified_index(SuggestDummyIndex())
+
+    def set_unified_index(self, haystack):
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = self.unified_index
+
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_build_schema(self, get_model_ct, haystack):
+        properties = self.backend.build_schema(self.unified_index.indexes)['tests.dummy']['properties']
+
+        self.assertEqual(properties['title_suggest'], {
+            'type': 'completion',
+            'payloads': True,
+            'analyzer': 'simple',
+            'context': {'color': {'type': 'category', 'path': 'color'}},
+        })
+
+    def test_multi_match_fields(self, haystack):
+        self.set_unified_index(haystack)
+
+        self.assertEqual(self.backend.get_multi_match_fields(), ['text', 'title'])
+
+    def test_suggest(self, haystack):
+        self.set_unified_index(haystack)
+
+        options = self.backend.suggest('fo', 'title_suggest', size=2, context={'color': 'red'}, fuzzy=True)
+
+        self.assertEqual(self.backend.conn.suggest.call_args[1]['body'], {'completion': {
+            'text': 'fo',
+            'completion': {'field': 'title_suggest', 'size': 2, 'context': {'color': 'red'}, 'fuzzy': {}},
+        }})
+        self.assertEqual([option['text'] for option in options], ['foo', 'foobar'])
+        self.assertEqual(options[0]['payload'], {'id': 1})
+        self.assertFalse(self.backend.conn.search.called)
+
+    def test_suggest_cached(self, haystack):
+        self.set_unified_index(haystack)
+        self.backend.result_cache = get_backend(RESULT_CACHE={'TIMEOUT': 60}).result_cache
+
+        self.backend.suggest('fo', 'title_suggest')
+        options = self.backend.suggest('fo', 'title_suggest')
+
+        self.assertEqual(len(options), 2)
+        self.assertEqual(self.backend.conn.suggest.call_count, 1)
+
+    def test_suggest_not_completion(self, haystack):
+        self.set_unified_index(haystack)
+
+        self.assertRaises(ValueError, self.backend.suggest, 'fo', 'title')
+        self.assertRaises(ValueError, self.backend.suggest, 'fo', 'missing')
+
+    def test_suggest_empty(self, haystack):
+        self.assertEqual(self.backend.suggest('', 'title_suggest'), [])
+        self.assertFalse(self.backend.conn.suggest.called)
+
+    def test_suggest_error(self, haystack):
+        self.set_unified_index(haystack)
+        self.backend.conn.suggest.side_effect = elasticsearch.TransportError(500, 'foo')
+
+        self.assertEqual(self.backend.suggest('fo', 'title_suggest'), [])
+
+
+@patch('haystack_elasticsearch.backends.get_identifier', side_effect=lambda obj: 'tests.dummy.%s' % obj.pk)
+@patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+@patch('haystack_elasticsearch.backends.haystack')
+class MoreLikeThisTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+        self.instances = [MagicMock(pk=1), MagicMock(pk=2)]
+
+    def set_unified_index(self, haystack):
+        unified_index = haystack.connections.__getitem__.return_value.get_unified_index.return_value
+        unified_index.get_index.return_value.get_content_field.return_value = 'text'
+        unified_index.get_index.return_value.routing_field = None
+
+    def test_more_like_this(self, haystack, get_model_ct, get_identifier):
+        self.set_unified_index(haystack)
+
+        self.backend.more_like_this(self.instances, '(name:foo)', mlt_options={'max_query_terms': 10},
+                                    models=[Dummy], start_offset=0, end_offset=5)
+
+        search_kwargs = self.backend.conn.search.call_args[1]
+        self.assertEqual(search_kwargs['doc_type'], 'tests.dummy')
+        self.assertEqual(search_kwargs['body']['size'], 5)
+        filtered = search_kwargs['body']['query']['filtered']
+        self.assertEqual(filtered['query'], {'more_like_this': {
+            'docs': [{'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.1'},
+                     {'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.2'}],
+            'fields': ['text'],
+            'max_query_terms': 10,
+        }})
+        self.assertEqual(filtered['filter']['query']['query_string']['query'], '(name:foo)')
+        self.assertFalse(self.backend.conn.mlt.called)
+
+    def test_more_like_this_match_all(self, haystack, get_model_ct, get_identifier):
+        self.set_unified_index(haystack)
+
+        self.backend.more_like_this(self.instances[0], '*:*', limit_to_registered_models=False)
+
+        query = self.backend.conn.search.call_args[1]['body']['query']
+        self.assertEqual(list(query.keys()), ['more_like_this'])
+
+    def test_more_like_this_invalid_option(self, haystack, get_model_ct, get_identifier):
+        self.assertRaises(ValueError, self.backend.more_like_this, self.instances, mlt_options={'foo': 1})
+
+    def test_query_run_mlt(self, haystack, get_model_ct, get_identifier):
+        self.set_unified_index(haystack)
+        self.backend.conn.search.return_value = {'hits': {'total': 1, 'hits': []}}
+        query = ElasticsearchSearchQuery()
+        query.more_like_this(self.instances, min_doc_freq=2)
+        query.add_order_by('name')
+
+        clone = query._clone()
+        clone.backend = self.backend
+        clone.run_mlt(start_offset=0, end_offset=10)
+
+        body = self.backend.conn.search.call_args[1]['body']
+        self.assertEqual(body['query'], {'more_like_this': {
+            'docs': [{'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.1'},
+                     {'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.2'}],
+            'fields': ['text'],
+            'min_doc_freq': 2,
+        }})
+        self.assertEqual(body['sort'], [{'name': {'order': 'asc'}}])
+        self.assertEqual(body['size'], 10)
+        self.assertEqual(clone.get_count(), 1)
+
+
+class RoutingDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    client = IntegerField(model_attr='client_id', index_fieldname='client_id')
+    name = CharField()
+    routing_field = 'client'
+
+    def get_model(self):
+        return Dummy
+
+
+class NameRoutingDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    name = CharField()
+    routing_field = 'name'
+
+    def get_model(self):
+        return Dummy
+
+
+class CodeRoutingDummyIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    code = FacetCharField()
+    routing_field = 'code'
+
+    def get_model(self):
+        return Dummy
+
+
+@patch('haystack_elasticsearch.backends.haystack')
+class RoutingTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+        self.index = RoutingDummyIndex()
+
+    def set_unified_index(self, haystack, *search_indexes):
+        unified_index = get_unified_index(*(search_indexes or (self.index,)))
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = unified_index
+
+    def get_query(self):
+        query = ElasticsearchSearchQuery()
+        query.backend = self.backend
+        return query
+
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_build_schema(self, get_model_ct, haystack):
+        schema = self.backend.build_schema(get_unified_index(self.index).indexes)
+
+        self.assertEqual(schema['tests.dummy']['_routing'], {'required': True})
+        self.assertNotIn('_routing', self.backend.build_schema(get_unified_index(DummyIndex()).indexes)['tests.dummy'])
+
+    def test_prepare_documents(self, haystack):
+        prepared_data = {'id': 'tests.dummy.1', 'django_ct': 'tests.dummy', 'django_id': '1', 'client_id': 7}
+
+        with patch.object(self.index, 'full_prepare', return_value=prepared_data):
+            documents = self.backend.prepare_documents(self.index, [MagicMock()])
+
+        self.assertEqual(documents[0]['_routing'], '7')
+        self.assertEqual(documents[0]['_id'], 'tests.dummy.1')
+
+    @patch('haystack_elasticsearch.backends.get_identifier', return_value='tests.dummy.1')
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_remove_object(self, get_model_ct, get_identifier, haystack):
+        with patch.object(self.backend, 'get_routed_index', return_value=self.index):
+            self.backend.remove(MagicMock(client_id=7), commit=False)
+
+        self.backend.conn.delete.assert_called_once_with(index='test_index', doc_type='tests.dummy',
+                                                         id='tests.dummy.1', ignore=404, routing='7')
+
+    def test_remove_identifier(self, haystack):
+        with patch.object(self.backend, 'get_routed_index', return_value=self.index):
+            self.backend.remove('tests.dummy.1', commit=False)
+
+        self.assertFalse(self.backend.conn.delete.called)
+        self.assertEqual(self.backend.conn.delete_by_query.call_args[1]['body'],
+                         {'query': {'ids': {'values': ['tests.dummy.1']}}})
+
+    def test_query_routing(self, haystack):
+        self.set_unified_index(haystack)
+        query = self.get_query()
+        query.add_filter(SQ(client__in=[7, 8]))
+        query.add_filter(SQ(name__exact='foo'))
+
+        self.assertEqual(query.build_params()['routing'], '7,8')
+
+        query.add_filter(SQ(client__exact=8))
+        self.assertEqual(query.build_params()['routing'], '8')
+
+    def test_query_routing_contains(self, haystack):
+        self.set_unified_index(haystack)
+        query = self.get_query()
+        query.add_filter(SQ(client=7))
+
+        self.assertEqual(query.build_params()['routing'], '7')
+
+    def test_query_no_routing_analyzed_contains(self, haystack):
+        self.set_unified_index(haystack, NameRoutingDummyIndex())
+        query = self.get_query()
+        query.add_filter(SQ(name='foo'))
+        self.assertNotIn('routing', query.build_params())
+
+        query.add_filter(SQ(name__exact='foo'))
+        self.assertEqual(query.build_params()['routing'], 'foo')
+
+    def test_query_no_routing_contains_several_terms(self, haystack):
+        self.set_unified_index(haystack, CodeRoutingDummyIndex())
+        query = self.get_query()
+        query.add_filter(SQ(code='foo bar'))
+        self.assertNotIn('routing', query.build_params())
+
+        query = self.get_query()
+        query.add_filter(SQ(code='foo'))
+        self.assertEqual(query.build_params()['routing'], 'foo')
+
+    def test_query_no_routing(self, haystack):
+        self.set_unified_index(haystack)
+        query = self.get_query()
+        query.add_filter(SQ(name__exact='foo'))
+        self.assertNotIn('routing', query.build_params())
+
+        query.add_filter(SQ(client__exact=7) | SQ(name__exact='bar'))
+        self.assertNotIn('routing', query.build_params())
+
+        query = self.get_query()
+        query.add_filter(~SQ(client__exact=7))
+        self.assertNotIn('routing', query.build_params())
+
+    def test_query_no_routing_field(self, haystack):
+        self.set_unified_index(haystack, DummyIndex())
+        query = self.get_query()
+        query.add_filter(SQ(client__exact=7))
+
+        self.assertNotIn('routing', query.build_params())
+
+    @patch('haystack_elasticsearch.backends.get_identifier', return_value='tests.dummy.1')
+    @patch('haystack_elasticsearch.backends.get_model_ct', return_value='tests.dummy')
+    def test_more_like_this(self, get_model_ct, get_identifier, haystack):
+        self.set_unified_index(haystack)
+        unified_index = haystack.connections.__getitem__.return_value.get_unified_index.return_value
+
+        with patch.object(unified_index, 'get_index', return_value=self.index):
+            more_like_this = self.backend.build_more_like_this(MagicMock(client_id=7))
+
+        self.assertEqual(more_like_this['docs'], [
+            {'_index': 'test_index', '_type': 'tests.dummy', '_id': 'tests.dummy.1', '_routing': '7'}])
+
+    def test_search_routing(self, haystack):
+        self.backend.search('foo', limit_to_registered_models=False, routing='7')
+
+        search_kwargs = self.backend.conn.search.call_args[1]
+        self.assertEqual(search_kwargs['routing'], '7')
+        self.assertNotIn('routing', search_kwargs['body'])
+
+    def test_multi_search_routing(self, haystack):
+        requests, body = self.backend.build_multi_search_request([
+            ('foo', {'limit_to_registered_models': False, 'routing': '7'}),
+            ('bar', {'limit_to_registered_models': False}),
+        ])
+
+        self.assertEqual(body[0]['routing'], '7')
+        self.assertNotIn('routing', body[2])
+
+
+class Deal(object):
+    pass
+
+
+class DealIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    index_group = 'deals'
+    index_settings = {'number_of_shards': 10}
+
+    def get_model(self):
+        return Deal
+
+
+class Log(object):
+    pass
+
+
+class LogIndex(indexes.SearchIndex, indexes.Indexable):
+    text = CharField(document=True, use_template=True)
+    created = DateTimeField(model_attr='created')
+    rollover_field = 'created'
+    rollover_retention = 3
+
+    def get_model(self):
+        return Log
+
+
+def get_test_model_ct(model):
+    return {Dummy: 'tests.dummy', Deal: 'tests.deal', Log: 'tests.log'}[model]
+
+
+@patch('haystack_elasticsearch.indexes.get_model_ct', side_effect=get_test_model_ct)
+@patch('haystack_elasticsearch.backends.get_model_ct', side_effect=get_test_model_ct)
+@patch('haystack_elasticsearch.backends.haystack')
+class SeparateIndexesTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(SEPARATE_INDEXES=True)
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+        self.unified_index = get_unified_index(DummyIndex(), DealIndex())
+
+    def set_unified_index(self, haystack):
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = self.unified_index
+
+    @patch('haystack_elasticsearch.backends.check_analyzers')
+    def test_setup(self, check_analyzers, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+
+        self.backend.setup()
+
+        created = dict((c[1]['index'], c[1]['body']) for c in self.backend.conn.indices.create.call_args_list)
+        self.assertEqual(sorted(created.keys()), ['test_index_deals', 'test_index_tests_dummy'])
+        self.assertEqual(created['test_index_deals']['settings']['number_of_shards'], 10)
+        self.assertNotIn('number_of_shards', created['test_index_tests_dummy']['settings'])
+        mappings = [(c[1]['index'], c[1]['doc_type']) for c in self.backend.conn.indices.put_mapping.call_args_list]
+        self.assertEqual(sorted(mappings), [('test_index_deals', 'tests.deal'),
+                                            ('test_index_tests_dummy', 'tests.dummy')])
+        self.backend.conn.indices.put_alias.assert_called_once_with(index='test_index_deals,test_index_tests_dummy',
+                                                                    name='test_index')
+
+    def test_search_models(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        self.backend.setup_complete = True
+
+        self.backend.search('foo', models=[Deal])
+        self.assertEqual(self.backend.conn.search.call_args[1]['index'], 'test_index_deals')
+
+        self.backend.search('foo', models=[Deal, Dummy])
+        self.assertEqual(self.backend.conn.search.call_args[1]['index'], 'test_index_deals,test_index_tests_dummy')
+
+        self.backend.search('foo', limit_to_registered_models=False)
+        self.assertEqual(self.backend.conn.search.call_args[1]['index'], 'test_index')
+
+    @patch('haystack_elasticsearch.backends.bulk_index')
+    def test_update(self, bulk_index, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        self.backend.setup_complete = True
+
+        with patch.object(self.backend, 'prepare_documents', return_value=[{'id': 'deals.deal.1'}]):
+            self.backend.update(DealIndex(), [])
+
+        self.assertEqual(bulk_index.call_args[1]['index'], 'test_index_deals')
+        self.backend.conn.indices.refresh.assert_called_once_with(index='test_index_deals')
+
+    def test_clear(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+
+        self.backend.clear()
+
+        deleted = sorted(c[1]['index'] for c in self.backend.conn.indices.delete.call_args_list)
+        self.assertEqual(deleted, ['test_index_deals', 'test_index_tests_dummy'])
+
+    @patch('haystack_elasticsearch.backends.bulk_index')
+    def test_clear_models(self, bulk_index, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+
+        self.backend.clear(models=[Deal])
+
+        self.backend.conn.indices.delete.assert_called_once_with(index='test_index_deals', ignore=404)
+        self.assertEqual(self.backend.conn.indices.create.call_args[1]['index'], 'test_index_deals')
+        self.backend.conn.indices.put_alias.assert_called_once_with(index='test_index_deals', name='test_index')
+        self.assertFalse(self.backend.conn.search.called)
+        self.assertFalse(bulk_index.called)
+
+    def test_single_index(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        backend = get_backend()
+
+        self.assertEqual(backend.get_index_name('tests.deal'), 'test_index')
+        self.assertEqual(backend.get_search_index('tests.deal,tests.dummy'), 'test_index')
+
+
+@patch('haystack_elasticsearch.indexes.get_model_ct', side_effect=get_test_model_ct)
+@patch('haystack_elasticsearch.backends.get_model_ct', side_effect=get_test_model_ct)
+@patch('haystack_elasticsearch.backends.haystack')
+class RolloverTestCase(TestCase):
+    def setUp(self):
+        self.backend = get_backend(SEPARATE_INDEXES=True)
+        self.backend.setup_complete = True
+        self.backend.conn = MagicMock()
+        self.backend.conn.search.return_value = {'hits': {'total': 0, 'hits': []}}
+        self.unified_index = get_unified_index(DummyIndex(), LogIndex())
+
+    def set_unified_index(self, haystack):
+        haystack.connections.__getitem__.return_value.get_unified_index.return_value = self.unified_index
+
+    def get_query(self):
+        query = ElasticsearchSearchQuery()
+        query.backend = self.backend
+        return query
+
+    @patch('haystack_elasticsearch.backends.check_analyzers')
+    def test_setup(self, check_analyzers, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+
+        self.backend.setup()
+
+        created = [c[1]['index'] for c in self.backend.conn.indices.create.call_args_list]
+        self.assertEqual(created, ['test_index_tests_dummy'])
+        template = self.backend.conn.indices.put_template.call_args[1]
+        self.assertEqual(template['name'], 'test_index_tests_log')
+        self.assertEqual(template['body']['template'], 'test_index_tests_log-*')
+        self.assertEqual(template['body']['aliases'], {'test_index': {}})
+        self.assertEqual(list(template['body']['mappings']), ['tests.log'])
+        self.backend.conn.indices.put_alias.assert_called_once_with(index='test_index_tests_dummy', name='test_index')
+
+    def test_setup_without_separate_indexes(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+
+        self.assertRaises(ImproperlyConfigured, get_backend().check_rollover, self.unified_index)
+
+    def test_prepare_documents(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        index = self.unified_index.get_index(Log)
+        prepared_data = {'id': 'tests.log.1', 'django_ct': 'tests.log', 'django_id': '1',
+                         'created': datetime.datetime(2015, 3, 14, 10, 30)}
+
+        with patch.object(index, 'full_prepare', return_value=prepared_data):
+            documents = self.backend.prepare_documents(index, [MagicMock()])
+
+        self.assertEqual(documents[0]['_index'], 'test_index_tests_log-2015.03')
+
+    def test_search_index(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        date_range = (datetime.date(2015, 1, 20), datetime.date(2015, 3, 2))
+
+        self.assertEqual(self.backend.get_search_index('tests.log', {'created': date_range}),
+                         'test_index_tests_log-2015.01,test_index_tests_log-2015.02,test_index_tests_log-2015.03')
+        self.assertEqual(self.backend.get_search_index('tests.log,tests.dummy', {'created': (date_range[0], None)}),
+                         'test_index_tests_dummy,test_index_tests_log-*')
+
+    def test_query_date_ranges(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        query = self.get_query()
+        query.add_filter(SQ(created__gte=datetime.datetime(2015, 1, 20, 10, 30)))
+        query.add_filter(SQ(created__lt=datetime.date(2015, 3, 2)) | SQ(created__range=['2015-01-01', '2015-02-01']))
+        query.add_filter(SQ(created__lte=datetime.date(2015, 4, 1)))
+
+        self.assertEqual(query.build_params()['date_ranges'],
+                         {'created': (datetime.date(2015, 1, 20), datetime.date(2015, 4, 1))})
+
+        query.add_filter(~SQ(created__gt=datetime.date(2015, 2, 1)))
+        query.add_filter(SQ(created__range=[datetime.date(2015, 2, 1), datetime.date(2015, 3, 1)]))
+
+        self.assertEqual(query.build_params()['date_ranges'],
+                         {'created': (datetime.date(2015, 2, 1), datetime.date(2015, 3, 1))})
+
+    def test_search(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+
+        self.backend.search('foo', models=[Log], date_ranges={'created': (datetime.date(2015, 3, 2), None)})
+
+        self.assertEqual(self.backend.conn.search.call_args[1]['index'], 'test_index_tests_log-*')
+        self.assertTrue(self.backend.conn.search.call_args[1]['ignore_unavailable'])
+        self.assertNotIn('date_ranges', self.backend.conn.search.call_args[1]['body'])
+
+    def test_expire(self, haystack, get_model_ct, indexes_get_model_ct):
+        self.set_unified_index(haystack)
+        self.backend.conn.indices.get_settings.return_value = dict.fromkeys([
+            'test_index_tests_log-2014.12', 'test_index_tests_log-2015.01', 'test_index_tests_log-2015.02',
+            'test_index_tests_log-2015.03', 'test_index_tests_log-backup'])
+
+        expired = self.backend.expire_rollover_indexes(today=datetime.date(2015, 3, 14))
+
+        self.assertEqual(expired, ['test_index_tests_log-2014.12'])
+        self.backend.conn.indices.get_settings.assert_called_once_with(index='test_index_tests_log-*', ignore=404)
+        self.backend.conn.indices.delete.assert_called_once_with(index='test_index_tests_log-2014.12')
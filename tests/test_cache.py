@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from mock import patch
+
+from haystack_elasticsearch.cache import BaseResultCache, LocalResultCache, DjangoResultCache, get_result_cache
+
+
+class BaseResultCacheTestCase(TestCase):
+    def test_abstract(self):
+        self.assertRaises(TypeError, BaseResultCache)
+
+    def test_incomplete_subclass(self):
+        class IncompleteResultCache(BaseResultCache):
+            def get(self, key):
+                return None
+
+        self.assertRaises(TypeError, IncompleteResultCache)
+
+
+class LocalResultCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = LocalResultCache(max_entries=2, timeout=60)
+
+    def test_get_not_cached(self):
+        key = self.cache.make_key('search', {'query': {'match_all': {}}}, '')
+
+        self.assertIsNone(self.cache.get(key))
+
+    def test_set_get(self):
+        key = self.cache.make_key('search', {'query': {'match_all': {}}}, '')
+        self.cache.set(key, {'hits': {}})
+
+        self.assertEqual(self.cache.get(key), {'hits': {}})
+
+    def test_make_key_normalized(self):
+        key_1 = self.cache.make_key('search', {'from': 0, 'size': 10}, 'foo.bar')
+        key_2 = self.cache.make_key('search', {'size': 10, 'from': 0}, 'foo.bar')
+        key_3 = self.cache.make_key('search', {'size': 10, 'from': 10}, 'foo.bar')
+
+        self.assertEqual(key_1, key_2)
+        self.assertNotEqual(key_1, key_3)
+
+    def test_lru_eviction(self):
+        self.cache.set('foo', 1)
+        self.cache.set('bar', 2)
+        self.cache.get('foo')
+        self.cache.set('baz', 3)
+
+        self.assertEqual(self.cache.get('foo'), 1)
+        self.assertIsNone(self.cache.get('bar'))
+        self.assertEqual(self.cache.get('baz'), 3)
+
+    @patch('haystack_elasticsearch.cache.time')
+    def test_ttl_eviction(self, time):
+        time.time.return_value = 1000
+        self.cache.set('foo', 1)
+        time.time.return_value = 1061
+
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_invalidate_doc_type(self):
+        key_foo = self.cache.make_key('search', {}, 'app.foo')
+        key_bar = self.cache.make_key('search', {}, 'app.bar')
+        key_all = self.cache.make_key('search', {}, '')
+
+        self.cache.invalidate(['app.foo'])
+
+        self.assertNotEqual(self.cache.make_key('search', {}, 'app.foo'), key_foo)
+        self.assertEqual(self.cache.make_key('search', {}, 'app.bar'), key_bar)
+        self.assertNotEqual(self.cache.make_key('search', {}, ''), key_all)
+
+    def test_invalidate_all(self):
+        key_bar = self.cache.make_key('search', {}, 'app.bar')
+
+        self.cache.invalidate()
+
+        self.assertNotEqual(self.cache.make_key('search', {}, 'app.bar'), key_bar)
+
+    def tearDown(self):
+        pass
+
+
+class DjangoResultCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = DjangoResultCache(cache_alias='default', timeout=60, key_prefix='test')
+
+    def test_set_get(self):
+        key = self.cache.make_key('search', {'query': {'match_all': {}}}, '')
+        self.cache.set(key, {'hits': {}})
+
+        self.assertEqual(self.cache.get(key), {'hits': {}})
+
+    def test_invalidate_doc_type(self):
+        key_foo = self.cache.make_key('search', {}, 'app.foo')
+        key_bar = self.cache.make_key('search', {}, 'app.bar')
+
+        self.cache.invalidate(['app.foo'])
+
+        self.assertNotEqual(self.cache.make_key('search', {}, 'app.foo'), key_foo)
+        self.assertEqual(self.cache.make_key('search', {}, 'app.bar'), key_bar)
+
+    def tearDown(self):
+        self.cache.cache.clear()
+
+
+class GetResultCacheTestCase(TestCase):
+    def test_disabled(self):
+        self.assertIsNone(get_result_cache(None))
+
+    def test_local(self):
+        cache = get_result_cache({'MAX_ENTRIES': 10, 'TIMEOUT': 5})
+
+        self.assertIsInstance(cache, LocalResultCache)
+        self.assertEqual(cache.max_entries, 10)
+        self.assertEqual(cache.timeout, 5)
+
+    def test_django(self):
+        cache = get_result_cache({'CACHE': 'default'})
+
+        self.assertIsInstance(cache, DjangoResultCache)
@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from django.test import TestCase
+
+from haystack_elasticsearch.coalescing import SingleFlight
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def blocking_call(self, result=None, error=None):
+        self.calls.append(1)
+        self.started.set()
+        self.release.wait()
+        if error is not None:
+            raise error
+        return result
+
+    def run_concurrently(self, func, number=4):
+        results = []
+
+        def target():
+            try:
+                results.append(self.flight.do('key', func))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=target) for _ in range(number)]
+        threads[0].start()
+        self.started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        # Give followers time to join the call in flight.
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_do(self):
+        result = self.flight.do('key', lambda: 'foo')
+
+        self.assertEqual(result, 'foo')
+        self.assertEqual(self.flight._calls, {})
+
+    def test_do_concurrent(self):
+        shared = {'results': []}
+
+        results = self.run_concurrently(lambda: self.blocking_call(shared))
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(results), 4)
+        for result in results:
+            self.assertIs(result, shared)
+
+    def test_do_concurrent_error(self):
+        error = ValueError('foo')
+
+        results = self.run_concurrently(lambda: self.blocking_call(error=error))
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [error] * 4)
+
+    def test_do_sequential(self):
+        self.flight.do('key', lambda: self.calls.append(1))
+        self.flight.do('key', lambda: self.calls.append(1))
+
+        self.assertEqual(len(self.calls), 2)
+
+    def tearDown(self):
+        self.release.set()
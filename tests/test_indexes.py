@@ -4,7 +4,7 @@ from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
 from django.utils.datastructures import SortedDict
 from haystack import indexes
-from haystack.exceptions import NotHandled
+from haystack.exceptions import NotHandled, SearchFieldError
 from mock import patch, MagicMock
 
 from haystack_elasticsearch.fields import *
@@ -116,6 +116,13 @@ class ClassIndexTestCase(TestCase):
 
         self.assertEqual(field_not_exists, 'not_exists')
 
+    def test_collect_fields_routing_field(self):
+        self.dummy.routing_field = 'char_field'
+        ClassIndex(self.dummy).build()
+
+        self.dummy.routing_field = 'not_exists'
+        self.assertRaises(SearchFieldError, ClassIndex(self.dummy).build)
+
     def tearDown(self):
         pass
 
@@ -240,5 +247,30 @@ class UnifiedIndexTestCase(TestCase):
         self.assertIn(DummyIndex, search_fields.keys())
         self.assertDictEqual(returned_index, fields)
 
+    @patch('haystack_elasticsearch.indexes.get_model_ct', return_value='tests.dummy')
+    def test_get_content_type_table(self, get_model_ct):
+        search_index = DummyIndex()
+        self.index.build([ClassIndex(search_index)])
+
+        content_types = self.index.get_content_type_table()
+        content_type = content_types['tests.dummy']
+
+        self.assertEqual(list(content_types.keys()), ['tests.dummy'])
+        self.assertEqual((content_type.app_label, content_type.model_name), ('tests', 'dummy'))
+        self.assertIs(content_type.model, Dummy)
+        self.assertIs(content_type.index, search_index)
+        self.assertIs(content_type.fields['int_field'], search_index.fields['int_field'])
+        self.assertIs(content_type.fields['bool_field'], search_index.fields['bool_field'])
+        self.assertIs(self.index.get_content_type_table(), content_types)
+
+    @patch('haystack_elasticsearch.indexes.get_model_ct', return_value='tests.dummy')
+    def test_get_content_type_table_reset(self, get_model_ct):
+        self.index.build([ClassIndex(DummyIndex())])
+        content_types = self.index.get_content_type_table()
+
+        self.index.build([ClassIndex(DummyIndex())])
+
+        self.assertIsNot(self.index.get_content_type_table(), content_types)
+
     def tearDown(self):
         pass
\ No newline at end of file
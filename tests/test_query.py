@@ -0,0 +1,110 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from haystack.exceptions import NotHandled
+from haystack.query import SearchQuerySet
+from mock import patch, MagicMock
+
+from haystack_elasticsearch.query import ElasticsearchSearchQuerySet, hydrate_results
+
+
+class Result(object):
+    def __init__(self, model, pk):
+        self.model = model
+        self.pk = pk
+
+
+def get_model(objects):
+    model = MagicMock()
+    model._meta.pk.to_python.side_effect = int
+    model._default_manager.all.return_value.in_bulk.return_value = objects
+    return model
+
+
+def get_index(objects, **attributes):
+    index = MagicMock(spec=['read_queryset'] + list(attributes))
+    for name, value in attributes.items():
+        setattr(index, name, value)
+    queryset = index.read_queryset.return_value
+    queryset.select_related.return_value = queryset
+    queryset.prefetch_related.return_value = queryset
+    queryset.in_bulk.return_value = objects
+    return index
+
+
+@patch('haystack_elasticsearch.query.connections')
+class HydrateResultsTestCase(TestCase):
+    def test_hydrate(self, connections):
+        foo, bar = get_model({}), get_model({})
+        indexes = {
+            foo: get_index({1: 'foo 1', 2: 'foo 2'}),
+            bar: get_index({1: 'bar 1'}),
+        }
+        connections.__getitem__.return_value.get_unified_index.return_value.get_index.side_effect = indexes.get
+        results = [Result(foo, '2'), Result(bar, '1'), Result(foo, '1')]
+
+        hydrated_results = hydrate_results(results)
+
+        self.assertEqual([r._object for r in hydrated_results], ['foo 2', 'bar 1', 'foo 1'])
+        self.assertEqual(indexes[foo].read_queryset.return_value.in_bulk.call_count, 1)
+        self.assertEqual(sorted(indexes[foo].read_queryset.return_value.in_bulk.call_args[0][0]), [1, 2])
+
+    def test_hydrate_missing_object(self, connections):
+        foo = get_model({})
+        connections.__getitem__.return_value.get_unified_index.return_value.get_index.return_value = \
+            get_index({1: 'foo 1'})
+
+        hydrated_results = hydrate_results([Result(foo, '1'), Result(foo, '2')])
+
+        self.assertEqual([r.pk for r in hydrated_results], ['1'])
+
+    def test_hydrate_related(self, connections):
+        foo = get_model({})
+        index = get_index({1: 'foo 1'}, select_related=('bar',), prefetch_related=('baz', 'qux'))
+        connections.__getitem__.return_value.get_unified_index.return_value.get_index.return_value = index
+
+        hydrate_results([Result(foo, '1')])
+
+        index.read_queryset.return_value.select_related.assert_called_once_with('bar')
+        index.read_queryset.return_value.prefetch_related.assert_called_once_with('baz', 'qux')
+
+    def test_hydrate_not_handled(self, connections):
+        foo = get_model({1: 'foo 1'})
+        connections.__getitem__.return_value.get_unified_index.return_value.get_index.side_effect = NotHandled
+
+        hydrated_results = hydrate_results([Result(foo, '1')])
+
+        self.assertEqual(hydrated_results[0]._object, 'foo 1')
+
+
+class PostProcessResultsTestCase(TestCase):
+    def setUp(self):
+        self.searchqueryset = ElasticsearchSearchQuerySet().load_all()
+
+    @patch('haystack_elasticsearch.query.load_model_objects', return_value={1: 'foo 1'})
+    def test_load_model_objects(self, load_model_objects):
+        foo = get_model({})
+
+        self.assertEqual(self.searchqueryset._load_model_objects(foo, ['1']), {1: 'foo 1'})
+        load_model_objects.assert_called_once_with(foo, ['1'], using='default')
+
+    @patch.object(SearchQuerySet, 'post_process_results', return_value=['result'])
+    def test_delegated_to_haystack_hook(self, post_process_results):
+        with patch.object(SearchQuerySet, '_load_model_objects', create=True):
+            self.assertEqual(self.searchqueryset.post_process_results([Result(get_model({}), '1')]), ['result'])
+
+        self.assertTrue(post_process_results.called)
+
+    @patch('haystack_elasticsearch.query.connections')
+    def test_without_haystack_hook(self, connections):
+        if hasattr(SearchQuerySet, '_load_model_objects'):
+            self.skipTest('Haystack loads objects through _load_model_objects')
+
+        foo = get_model({})
+        connections.__getitem__.return_value.get_unified_index.return_value.get_index.return_value = \
+            get_index({1: 'foo 1'})
+
+        results = self.searchqueryset.post_process_results([Result(foo, '1'), Result(foo, '2')])
+
+        self.assertEqual([r._object for r in results], ['foo 1'])
+        self.assertEqual(self.searchqueryset._ignored_result_count, 1)
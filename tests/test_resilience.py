@@ -0,0 +1,203 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import elasticsearch
+from django.test import TestCase
+
+from haystack_elasticsearch.resilience import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, HedgedCall,
+                                               get_circuit_breaker, get_hedged_call, is_failure)
+
+
+def fail():
+    raise elasticsearch.ConnectionError('N/A', 'refused', None)
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_rate=0.5, window_size=4, minimum_calls=4, open_timeout=60)
+
+    def test_is_failure(self):
+        self.assertTrue(is_failure(elasticsearch.ConnectionTimeout('TIMEOUT', 'timed out', None)))
+        self.assertTrue(is_failure(elasticsearch.TransportError(503, 'unavailable')))
+        self.assertTrue(is_failure(elasticsearch.TransportError(429, 'rejected')))
+        self.assertFalse(is_failure(elasticsearch.RequestError(400, 'parse error')))
+        self.assertFalse(is_failure(ValueError()))
+
+    def test_call(self):
+        self.assertEqual(self.breaker.call(lambda x: x, 'foo'), 'foo')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_open_on_failure_rate(self):
+        for _ in range(2):
+            self.breaker.call(lambda: None)
+        for _ in range(2):
+            self.assertRaises(elasticsearch.ConnectionError, self.breaker.call, fail)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.call, lambda: None)
+
+    def test_minimum_calls(self):
+        for _ in range(3):
+            self.assertRaises(elasticsearch.ConnectionError, self.breaker.call, fail)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_request_errors(self):
+        def bad_request():
+            raise elasticsearch.RequestError(400, 'parse error')
+
+        for _ in range(4):
+            self.assertRaises(elasticsearch.RequestError, self.breaker.call, bad_request)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_open_on_slow_calls(self):
+        breaker = CircuitBreaker(slow_call_duration=0.01, slow_call_rate=0.5, window_size=2, minimum_calls=2)
+
+        for _ in range(2):
+            breaker.call(time.sleep, 0.02)
+
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_half_open_success(self):
+        self.breaker._open()
+        self.breaker._opened_at -= 60
+
+        self.assertTrue(self.breaker.before_call())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # Only one probe is let through.
+        self.assertRaises(CircuitOpenError, self.breaker.before_call)
+
+        self.breaker.record(True, False, 0.1)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_failure(self):
+        self.breaker._open()
+        self.breaker._opened_at -= 60
+
+        self.assertRaises(elasticsearch.ConnectionError, self.breaker.call, fail)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.call, lambda: None)
+
+    def test_get_circuit_breaker(self):
+        self.assertIsNone(get_circuit_breaker(None))
+
+        breaker = get_circuit_breaker({'FAILURE_RATE': 0.2, 'SLOW_CALL_DURATION': 2, 'OPEN_TIMEOUT': 10})
+
+        self.assertEqual(breaker.failure_rate, 0.2)
+        self.assertEqual(breaker.slow_call_duration, 2)
+        self.assertEqual(breaker.open_timeout, 10)
+        self.assertEqual(breaker.minimum_calls, 10)
+
+    def test_get_write_circuit_breaker(self):
+        options = {'SLOW_CALL_DURATION': 2, 'WRITE_SLOW_CALL_DURATION': 30}
+
+        self.assertEqual(get_circuit_breaker(options, writes=True).slow_call_duration, 30)
+        self.assertIsNone(get_circuit_breaker({'SLOW_CALL_DURATION': 2}, writes=True).slow_call_duration)
+
+
+class HedgedCallTestCase(TestCase):
+    def test_no_delay(self):
+        hedged = HedgedCall()
+        calls = []
+
+        result = hedged.do(lambda: 'foo', lambda: calls.append(1))
+
+        self.assertEqual(result, 'foo')
+        self.assertEqual(calls, [])
+
+    def test_fast_call(self):
+        hedged = HedgedCall(delay=0.5)
+        calls = []
+
+        result = hedged.do(lambda: 'foo', lambda: calls.append(1))
+
+        self.assertEqual(result, 'foo')
+        self.assertEqual(calls, [])
+
+    def test_slow_call(self):
+        hedged = HedgedCall(delay=0.01)
+
+        def slow():
+            time.sleep(0.5)
+            return 'slow'
+
+        self.assertEqual(hedged.do(slow, lambda: 'hedge'), 'hedge')
+
+    def test_primary_latency(self):
+        hedged = HedgedCall(delay=0.01)
+
+        def slow():
+            time.sleep(0.1)
+            return 'slow'
+
+        self.assertEqual(hedged.do(slow, lambda: 'hedge'), 'hedge')
+        self.assertEqual(len(hedged._latencies), 0)
+
+        # The primary call keeps running in its worker, its latency is recorded when it returns.
+        time.sleep(0.2)
+        self.assertEqual(len(hedged._latencies), 1)
+        self.assertGreaterEqual(hedged._latencies[0], 0.1)
+
+    def test_workers_busy(self):
+        hedged = HedgedCall(delay=0.01, max_workers=1)
+        calls = []
+        release = threading.Event()
+
+        def blocked():
+            release.wait()
+            return 'blocked'
+
+        thread = threading.Thread(target=hedged.do, args=(blocked, lambda: calls.append(1)))
+        thread.start()
+        time.sleep(0.05)
+
+        # The only worker runs the first call, so this one runs in the calling thread without hedge.
+        self.assertEqual(hedged.do(lambda: 'foo', lambda: calls.append(1)), 'foo')
+        release.set()
+        thread.join()
+
+        self.assertEqual(calls, [])
+        self.assertEqual(hedged._workers, 1)
+
+    def test_hedge_failure(self):
+        hedged = HedgedCall(delay=0.01)
+
+        def slow():
+            time.sleep(0.1)
+            return 'slow'
+
+        self.assertEqual(hedged.do(slow, fail), 'slow')
+
+    def test_all_failures(self):
+        hedged = HedgedCall(delay=0.01)
+
+        def slow_fail():
+            time.sleep(0.05)
+            fail()
+
+        self.assertRaises(elasticsearch.ConnectionError, hedged.do, slow_fail, fail)
+
+    def test_percentile_delay(self):
+        hedged = HedgedCall(delay=1, percentile=90, min_samples=10)
+        for latency in range(1, 10):
+            hedged.add_latency(latency / 100.0)
+
+        self.assertEqual(hedged.get_delay(), 1)
+
+        hedged.add_latency(0.1)
+
+        self.assertEqual(hedged.get_delay(), 0.1)
+
+    def test_get_hedged_call(self):
+        self.assertIsNone(get_hedged_call({}))
+
+        hedged = get_hedged_call({'DELAY': 0.2, 'PERCENTILE': 99, 'MAX_WORKERS': 4})
+
+        self.assertEqual(hedged.delay, 0.2)
+        self.assertEqual(hedged.percentile, 99)
+        self.assertEqual(hedged.max_workers, 4)
@@ -0,0 +1,53 @@
+from __future__ import unicode_literals
+
+import pickle
+
+from django.test import TestCase
+from mock import MagicMock
+
+from haystack_elasticsearch.fields import CharField
+from haystack_elasticsearch.results import LazySearchResult
+
+
+class IntegerConverter(object):
+    def convert(self, value):
+        return int(value)
+
+
+class LazySearchResultTestCase(TestCase):
+    def setUp(self):
+        self.converter = MagicMock(wraps=IntegerConverter())
+        self.to_python = MagicMock(side_effect=lambda value: value.upper())
+        self.result = LazySearchResult('tests', 'dummy', '1', 1.0, highlighted=['foo'],
+                                       _raw_fields={'int_field': '3', 'other_field': 'foo', 'pk': '2'},
+                                       _fields={'int_field': self.converter}, _to_python=self.to_python)
+
+    def test_not_converted(self):
+        self.assertFalse(self.converter.convert.called)
+        self.assertFalse(self.to_python.called)
+        self.assertEqual(self.result.highlighted, ['foo'])
+        self.assertEqual(self.result.pk, '1')
+
+    def test_convert_on_access(self):
+        self.assertEqual(self.result.int_field, 3)
+        self.assertEqual(self.result.int_field, 3)
+        self.assertEqual(self.result.other_field, 'FOO')
+
+        self.assertEqual(self.converter.convert.call_count, 1)
+        self.assertEqual(self.to_python.call_count, 1)
+
+    def test_missing_field(self):
+        self.assertIsNone(self.result.missing_field)
+
+    def test_additional_fields(self):
+        self.assertEqual(self.result.get_additional_fields(),
+                         {'highlighted': ['foo'], 'int_field': 3, 'other_field': 'FOO'})
+
+    def test_pickle(self):
+        result = LazySearchResult('tests', 'dummy', '1', 1.0, _raw_fields={'char_field': 'foo'},
+                                  _fields={'char_field': CharField()})
+
+        unpickled_result = pickle.loads(pickle.dumps(result))
+
+        self.assertEqual(unpickled_result.char_field, 'foo')
+        self.assertEqual(unpickled_result._fields, {})
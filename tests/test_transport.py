@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from elasticsearch import RequestsHttpConnection
+from mock import MagicMock
+
+from haystack_elasticsearch.transport import CompressedHttpConnection, get_transport_kwargs
+
+
+class GetTransportKwargsTestCase(TestCase):
+    def test_no_options(self):
+        self.assertEqual(get_transport_kwargs('default', {'URL': 'http://127.0.0.1:9200/', 'KWARGS': {'foo': 1}}), {})
+
+    def test_options(self):
+        kwargs = get_transport_kwargs('default', {
+            'MAXSIZE': 25,
+            'SNIFF_ON_START': True,
+            'SNIFF_ON_CONNECTION_FAIL': True,
+            'SNIFFER_TIMEOUT': 60,
+            'DEAD_TIMEOUT': 30,
+            'KWARGS': {'maxsize': 50},
+        })
+
+        self.assertEqual(kwargs, {
+            'maxsize': 50,
+            'sniff_on_start': True,
+            'sniff_on_connection_fail': True,
+            'sniffer_timeout': 60,
+            'dead_timeout': 30,
+        })
+
+    def test_connection_class(self):
+        kwargs = get_transport_kwargs('default', {'CONNECTION_CLASS': 'elasticsearch.RequestsHttpConnection'})
+
+        self.assertIs(kwargs['connection_class'], RequestsHttpConnection)
+
+    def test_invalid_connection_class(self):
+        self.assertRaises(ImproperlyConfigured, get_transport_kwargs, 'default',
+                          {'CONNECTION_CLASS': 'elasticsearch.MissingConnection'})
+
+    def test_http_compress(self):
+        kwargs = get_transport_kwargs('default', {'HTTP_COMPRESS': True, 'HTTP_COMPRESS_MIN_SIZE': 10})
+
+        self.assertIs(kwargs['connection_class'], CompressedHttpConnection)
+        self.assertEqual(kwargs['compress_min_size'], 10)
+
+    def test_http_compress_with_connection_class(self):
+        self.assertRaises(ImproperlyConfigured, get_transport_kwargs, 'default',
+                          {'HTTP_COMPRESS': True, 'CONNECTION_CLASS': 'elasticsearch.RequestsHttpConnection'})
+
+
+class CompressedHttpConnectionTestCase(TestCase):
+    def setUp(self):
+        self.connection = CompressedHttpConnection(compress_min_size=10)
+        self.connection.pool.pool = MagicMock()
+        response = self.connection.pool.pool.urlopen.return_value
+        response.status = 200
+        response.data = b'{}'
+
+    def test_compressed_body(self):
+        body = b'{"index": {}}\n{"text": "foo"}\n'
+
+        self.connection.perform_request('POST', '/_bulk', body=body)
+
+        args, kwargs = self.connection.pool.pool.urlopen.call_args
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(args[2])).read(), body)
+        self.assertEqual(kwargs['headers']['content-encoding'], 'gzip')
+
+    def test_small_body(self):
+        self.connection.perform_request('GET', '/_search', body=b'{}')
+
+        args, kwargs = self.connection.pool.pool.urlopen.call_args
+        self.assertEqual(args[2], b'{}')
+        self.assertNotIn('content-encoding', kwargs['headers'])
+
+    def test_accept_encoding(self):
+        self.connection.perform_request('GET', '/_search')
+
+        args, kwargs = self.connection.pool.pool.urlopen.call_args
+        self.assertEqual(kwargs['headers']['accept-encoding'], 'gzip,deflate')
+        self.assertEqual(kwargs['retries'], False)
@@ -1,4 +1,6 @@
 from __future__ import unicode_literals
+
+import datetime
 from functools import partial
 
 from django.test import TestCase
@@ -71,4 +73,16 @@ class ImportSearchIndexesTestCase(TestCase):
         self.assertIsNone(search_indexes_module)
 
     def tearDown(self):
-        pass
\ No newline at end of file
+        pass
+
+
+class RolloverPeriodTestCase(TestCase):
+    def test_get_period_start(self):
+        self.assertEqual(utils.get_period_start(datetime.datetime(2015, 3, 14, 10, 30), 'day'),
+                         datetime.date(2015, 3, 14))
+        self.assertEqual(utils.get_period_start(datetime.date(2015, 3, 14), 'month'), datetime.date(2015, 3, 1))
+
+    def test_shift_period(self):
+        self.assertEqual(utils.shift_period(datetime.date(2015, 3, 1), 'day', -1), datetime.date(2015, 2, 28))
+        self.assertEqual(utils.shift_period(datetime.date(2015, 3, 1), 'month', -3), datetime.date(2014, 12, 1))
+        self.assertEqual(utils.shift_period(datetime.date(2015, 12, 1), 'month', 1), datetime.date(2016, 1, 1))